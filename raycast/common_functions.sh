@@ -48,6 +48,7 @@ readonly LIST_APPLICATIONS="$EXECUTE_SCRIPTS_DIR/list_applications.sh"
 
 # 其他工具脚本
 readonly SPLITSHEETS="$EXECUTE_SCRIPTS_DIR/splitsheets.py"
+readonly CONVERT_DAEMON="$EXECUTE_SCRIPTS_DIR/convert_daemon.py"
 
 # 比较工具脚本 (2个)
 readonly COMPARE_FILES_FOLDERS="$EXECUTE_DIR/compare/compare_files_folders.py"
@@ -210,3 +211,10 @@ check_command_exists() {
     fi
     return 0
 }
+
+# 运行Python转换脚本，优先交给已预热的常驻进程执行
+# 常驻进程未运行时按原方式启动脚本，并在后台启动常驻进程供下次使用
+# 参数: $1 = 脚本路径, 其余参数原样传给脚本
+run_converter() {
+    "$PYTHON_PATH" "$CONVERT_DAEMON" run --autostart "$@"
+}
@@ -35,7 +35,7 @@ fi
 show_processing "正在将 $(basename "$SELECTED_FILE") 转换为 TXT 格式..."
 
 # 执行Python脚本
-if "$PYTHON_PATH" "$CONVERT_CSV_TO_TXT" "$SELECTED_FILE"; then
+if run_converter "$CONVERT_CSV_TO_TXT" "$SELECTED_FILE"; then
     show_success "已将 $(basename "$SELECTED_FILE") 转换为 TXT 格式，保存在 $(basename "$FILE_DIR")"
 else
     show_error "转换失败"
@@ -53,7 +53,7 @@ do
     show_processing "正在将 $(basename "$FILE_PATH") 转换为 CSV 格式..."
     
     # 执行Python脚本处理单个文件
-    if "$PYTHON_PATH" "$CONVERT_TXT_TO_CSV" "$FILE_PATH"; then
+    if run_converter "$CONVERT_TXT_TO_CSV" "$FILE_PATH"; then
         show_success "已将 $(basename "$FILE_PATH") 转换为 CSV 格式"
         SUCCESS_COUNT=$((SUCCESS_COUNT + 1))
     else
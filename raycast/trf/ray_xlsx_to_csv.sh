@@ -33,7 +33,7 @@ safe_cd "$FILE_DIR" || exit 1
 show_processing "正在将 $(basename "$SELECTED_FILE") 的所有工作表转换为 CSV 格式..."
 
 # 执行Python脚本，添加-a参数转换所有工作表
-if "$PYTHON_PATH" "$CONVERT_XLSX_TO_CSV" "$SELECTED_FILE"; then
+if run_converter "$CONVERT_XLSX_TO_CSV" "$SELECTED_FILE"; then
     show_success "已将 $(basename "$SELECTED_FILE") 的所有工作表转换为 CSV 格式，保存在 $(basename "$FILE_DIR")"
 else
     show_error "转换失败"
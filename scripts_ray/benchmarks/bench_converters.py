@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+转换脚本性能基准 - 在确定性语料上运行各转换脚本，记录耗时、峰值内存和吞吐量
+版本: 1.0.0
+作者: tianli
+
+每次运行都把输入复制到新的临时目录，以独立子进程执行脚本，
+通过 os.wait4 取得子进程的峰值常驻内存。结果可写成 JSON，
+并与基线比较：耗时或峰值内存超过基线 (1 + 阈值) 倍时以非零状态退出。
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import fnmatch
+import argparse
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common_utils import (
+    show_success, show_error, show_warning, show_info, create_temp_dir,
+    cleanup_temp_dir, write_json_atomic
+)
+from make_corpus import SCALES, DEFAULT_SEED, build_corpus, default_corpus_dir
+
+SCRIPT_VERSION = "1.0.0"
+BASELINE_FILE = Path(__file__).resolve().parent / "converter_baseline.json"
+DEFAULT_THRESHOLD = 0.25
+# 耗时很短的用例受进程启动抖动影响较大，低于该值的差异不计为回退
+MIN_WALL_DELTA = 0.05
+
+# 用例: (名称, 脚本, 语料中的输入文件或目录, 额外参数)；参数中的 {work} 替换为本次运行的临时目录
+CASES = [
+    ('xlsx_to_csv/tall', 'convert_xlsx_to_csv.py', 'xlsx/tall.xlsx', []),
+    ('xlsx_to_csv/wide', 'convert_xlsx_to_csv.py', 'xlsx/wide.xlsx', []),
+    ('xlsx_to_csv/multi_sheet', 'convert_xlsx_to_csv.py', 'xlsx/multi_sheet.xlsx', []),
+    ('xlsx_to_parquet/tall', 'convert_xlsx_to_csv.py', 'xlsx/tall.xlsx', ['--format', 'parquet']),
+    ('xlsx_to_txt/tall', 'convert_xlsx_to_txt.py', 'xlsx/tall.xlsx', []),
+    ('xlsx_to_txt/multi_sheet', 'convert_xlsx_to_txt.py', 'xlsx/multi_sheet.xlsx', []),
+    ('csv_to_xlsx/mixed_cjk', 'convert_csv_to_xlsx.py', 'csv/mixed_cjk.csv', []),
+    ('csv_to_txt/mixed_cjk', 'convert_csv_to_txt.py', 'csv/mixed_cjk.csv', []),
+    ('txt_to_csv/mixed_cjk', 'convert_txt_to_csv.py', 'txt/mixed_cjk.txt', []),
+    ('txt_to_csv/gbk', 'convert_txt_to_csv.py', 'txt/gbk.txt', []),
+    ('txt_to_parquet/mixed_cjk', 'convert_txt_to_csv.py', 'txt/mixed_cjk.txt', ['--format', 'parquet']),
+    ('txt_to_xlsx/tabbed', 'convert_txt_to_xlsx.py', 'txt/tabbed.txt', []),
+    ('splitsheets/multi_sheet', 'splitsheets.py', 'xlsx/multi_sheet.xlsx', []),
+    ('merge_txt_to_csv/txt_dir', 'merge_txt_to_csv.py', 'txt', ['{work}/merged.csv']),
+    ('extract_tables/docx', 'extract_tables_office.py', 'docx/tables_images.docx', ['-o', '{work}/tables']),
+    ('extract_tables/pptx', 'extract_tables_office.py', 'pptx/tables_images.pptx', ['-o', '{work}/tables']),
+    ('extract_images/docx', 'extract_images_office.py', 'docx/tables_images.docx', ['-o', '{work}/images']),
+    ('pptx_to_md/pptx', 'convert_pptx_to_md.py', 'pptx/tables_images.pptx', ['-o', '{work}/md']),
+]
+
+def _maxrss_mb(rusage) -> float:
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    return rusage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else rusage.ru_maxrss / 1024
+
+def _input_bytes(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+def run_once(script: str, source: Path, extra_args: list) -> dict:
+    """在临时目录中运行一次脚本，返回耗时、峰值内存和退出码"""
+    work = create_temp_dir()
+    try:
+        target = work / source.name
+        if source.is_dir():
+            shutil.copytree(source, target)
+        else:
+            shutil.copy2(source, target)
+        args = [arg.replace('{work}', str(work)) for arg in extra_args]
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, str(SCRIPTS_DIR / script), str(target)] + args,
+                                   cwd=work, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = process.stderr.read()
+        process.stderr.close()
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return {'wall': wall, 'rss_mb': _maxrss_mb(rusage), 'returncode': process.returncode,
+                'stderr': stderr.decode('utf-8', 'replace')[-500:]}
+    finally:
+        cleanup_temp_dir(work)
+
+def run_case(name: str, script: str, source: Path, extra_args: list, repeat: int) -> dict:
+    runs = [run_once(script, source, extra_args) for _ in range(repeat)]
+    failed = [run for run in runs if run['returncode'] != 0]
+    wall = statistics.median(run['wall'] for run in runs)
+    size = _input_bytes(source)
+    result = {
+        'script': script,
+        'input': str(source.name),
+        'input_bytes': size,
+        'wall_s': round(wall, 4),
+        'walls': [round(run['wall'], 4) for run in runs],
+        'peak_rss_mb': round(max(run['rss_mb'] for run in runs), 1),
+        'throughput_mb_s': round(size / (1024 * 1024) / wall, 3) if wall > 0 else None,
+        'ok': not failed,
+    }
+    if failed:
+        result['error'] = failed[0]['stderr'].strip()
+    return result
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """返回超出基线阈值的 (用例, 指标, 当前值, 基线值) 列表"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base or not current['ok']:
+            continue
+        if current['wall_s'] > base['wall_s'] * (1 + threshold) and \
+                current['wall_s'] - base['wall_s'] > MIN_WALL_DELTA:
+            regressions.append((name, 'wall_s', current['wall_s'], base['wall_s']))
+        if current['peak_rss_mb'] > base['peak_rss_mb'] * (1 + threshold):
+            regressions.append((name, 'peak_rss_mb', current['peak_rss_mb'], base['peak_rss_mb']))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="转换脚本性能基准")
+    parser.add_argument('cases', nargs='*', help='要运行的用例名称，支持通配符，例如 "xlsx_to_csv/*" (默认: 全部)')
+    parser.add_argument('-s', '--scale', choices=sorted(SCALES), default='small', help='语料规模 (默认: small)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='语料随机种子')
+    parser.add_argument('--corpus', help='语料目录 (默认: 缓存目录下的 bench_corpus/<规模>)')
+    parser.add_argument('-n', '--repeat', type=int, default=3, help='每个用例运行次数，取耗时中位数')
+    parser.add_argument('-o', '--output', help='把结果写入JSON文件')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='基线文件 (JSON)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'允许超出基线的比例 (默认: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--update-baseline', action='store_true', help='用本次结果更新基线文件')
+    parser.add_argument('--list', action='store_true', help='列出所有用例')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES
+             if not args.cases or any(fnmatch.fnmatchcase(case[0], p) for p in args.cases)]
+    if args.list or not cases:
+        for name, script, source, _ in cases or CASES:
+            print(f"{name:<28} {script:<28} {source}")
+        if not cases:
+            show_error("没有匹配的用例")
+            sys.exit(2)
+        return
+
+    corpus_dir = Path(args.corpus) if args.corpus else default_corpus_dir(args.scale)
+    build_corpus(corpus_dir, args.scale, args.seed)
+
+    results = {}
+    for name, script, source, extra_args in cases:
+        result = run_case(name, script, corpus_dir / source, extra_args, args.repeat)
+        results[name] = result
+        line = (f"{name}: {result['wall_s']:.3f} 秒, 峰值内存 {result['peak_rss_mb']:.1f} MB, "
+                f"{result['throughput_mb_s']} MB/s")
+        if result['ok']:
+            show_info(line)
+        else:
+            show_error(f"{line} (运行失败: {result.get('error', '')[-200:]})")
+
+    report = {
+        'version': SCRIPT_VERSION,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'cases': results,
+    }
+    if args.output:
+        write_json_atomic(args.output, report)
+        show_success(f"结果已写入: {args.output}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8')) if baseline_path.exists() else {}
+        scale_baseline = baseline.setdefault(args.scale, {})
+        scale_baseline.update({name: {'wall_s': r['wall_s'], 'peak_rss_mb': r['peak_rss_mb']}
+                               for name, r in results.items() if r['ok']})
+        baseline[args.scale] = dict(sorted(scale_baseline.items()))
+        write_json_atomic(baseline_path, baseline)
+        show_success(f"已更新基线文件: {baseline_path}")
+        return
+
+    failures = [name for name, r in results.items() if not r['ok']]
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8')).get(args.scale, {})
+    else:
+        show_warning(f"基线文件不存在，跳过比较: {baseline_path}")
+    regressions = compare(results, baseline, args.threshold)
+    for name, metric, current, base in regressions:
+        show_error(f"{name}: {metric} {current} 超出基线 {base} 的 {args.threshold:.0%} 阈值")
+
+    if failures:
+        show_error(f"{len(failures)} 个用例运行失败: {', '.join(failures)}")
+    if failures or regressions:
+        sys.exit(1)
+    show_success("所有用例均在基线阈值之内")
+
+if __name__ == "__main__":
+    main()
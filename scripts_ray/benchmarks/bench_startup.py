@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+脚本冷启动时间基准 - 以 -X importtime 统计各脚本执行 --help 时的导入耗时
+版本: 1.0.0
+作者: tianli
+"""
+
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from common_utils import (
+    show_success, show_error, show_info, write_json_atomic
+)
+
+SCRIPT_VERSION = "1.0.0"
+BUDGET_FILE = Path(__file__).resolve().parent / "startup_budget.json"
+DEFAULT_BUDGET_MS = 150.0
+
+def measure_import_ms(script: Path) -> float:
+    """运行一次 `python -X importtime script --help`，返回顶层导入的累计耗时(ms)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', str(script), '--help'],
+        cwd=SCRIPTS_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 名称前只有一个空格的是顶层导入，其累计耗时已包含所有子模块
+        if name.startswith(' ') and not name.startswith('  ') and cumulative.strip().isdigit():
+            total_us += int(cumulative)
+    return total_us / 1000
+
+def discover_scripts() -> list:
+    return sorted(p for p in SCRIPTS_DIR.glob('*.py') if p.name != 'common_utils.py')
+
+def main():
+    parser = argparse.ArgumentParser(description="脚本冷启动时间基准")
+    parser.add_argument('scripts', nargs='*', help='要测量的脚本 (默认: scripts_ray 下所有脚本)')
+    parser.add_argument('-n', '--repeat', type=int, default=5, help='每个脚本运行次数，取中位数')
+    parser.add_argument('--budget', default=str(BUDGET_FILE), help='启动时间预算文件 (JSON)')
+    parser.add_argument('--update', action='store_true', help='按本次结果的 1.5 倍更新预算文件')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    args = parser.parse_args()
+
+    scripts = [Path(s).resolve() for s in args.scripts] or discover_scripts()
+    budget_path = Path(args.budget)
+    budgets = json.loads(budget_path.read_text(encoding='utf-8')) if budget_path.exists() else {}
+
+    results = {}
+    failures = []
+    for script in scripts:
+        median_ms = statistics.median(measure_import_ms(script) for _ in range(args.repeat))
+        results[script.name] = round(median_ms, 1)
+        budget = budgets.get(script.name, DEFAULT_BUDGET_MS)
+        if median_ms > budget:
+            failures.append(script.name)
+            show_error(f"{script.name}: {median_ms:.1f} ms (预算 {budget:.0f} ms)")
+        else:
+            show_info(f"{script.name}: {median_ms:.1f} ms (预算 {budget:.0f} ms)")
+
+    if args.update:
+        budgets.update({name: max(round(ms * 1.5), 20) for name, ms in results.items()})
+        write_json_atomic(budget_path, dict(sorted(budgets.items())))
+        show_success(f"已更新预算文件: {budget_path}")
+        return
+
+    if failures:
+        show_error(f"{len(failures)} 个脚本超出启动时间预算: {', '.join(failures)}")
+        sys.exit(1)
+    show_success("所有脚本均在启动时间预算之内")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+XLSX读取性能基准 - 比较 xlsx_reader 与 openpyxl 只读模式逐行读取大工作表的速度
+版本: 1.0.0
+作者: tianli
+
+测试文件按 Excel 的写法生成：字符串放在共享字符串表中，日期列带日期格式，
+另有布尔列和空列。文件按行数缓存在缓存目录下，参数不变时直接复用。
+"""
+
+import sys
+import time
+import random
+import zipfile
+import argparse
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from common_utils import (
+    show_success, show_error, show_info, show_processing, ensure_directory, get_cache_dir,
+    is_package_available
+)
+from xlsx_reader import XlsxReader
+
+SCRIPT_VERSION = "1.0.0"
+DEFAULT_ROWS = 1_000_000
+DEFAULT_SEED = 20240101
+SHARED_STRINGS = 5_000
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/xl/sharedStrings.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>'
+    '</Types>')
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>')
+WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="数据" sheetId="1" r:id="rId1"/></sheets></workbook>')
+WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings" '
+    'Target="sharedStrings.xml"/></Relationships>')
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+    '<borders count="1"><border/></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>')
+
+def build_test_file(path: Path, rows: int, seed: int = DEFAULT_SEED) -> None:
+    """生成 rows 行 × 8 列的测试工作簿（含表头）"""
+    rng = random.Random(seed)
+    words = ['水库', '流量', '降雨', '河道', '堤防', 'station', 'gauge', 'pump', 'gate', 'zone']
+    strings = [f"{rng.choice(words)}{rng.choice(words)}-{i}" for i in range(SHARED_STRINGS)]
+    header = ['编号', '站点', '水位', '日期', '启用', '备注', '空列', '流量']
+    strings += header
+
+    tmp_path = path.with_suffix('.tmp')
+    with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES)
+        zf.writestr('_rels/.rels', ROOT_RELS)
+        zf.writestr('xl/workbook.xml', WORKBOOK)
+        zf.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS)
+        zf.writestr('xl/styles.xml', STYLES)
+        zf.writestr('xl/sharedStrings.xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    f'count="{len(strings)}" uniqueCount="{len(strings)}">'
+                    + ''.join(f'<si><t>{escape(s)}</t></si>' for s in strings) + '</sst>')
+
+        with zf.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as f:
+            f.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                     f'<dimension ref="A1:H{rows + 1}"/><sheetData>').encode('utf-8'))
+            header_cells = ''.join(f'<c r="{letter}1" t="s"><v>{SHARED_STRINGS + i}</v></c>'
+                                   for i, letter in enumerate('ABCDEFGH'))
+            f.write(f'<row r="1">{header_cells}</row>'.encode('utf-8'))
+            batch = []
+            for r in range(2, rows + 2):
+                batch.append(
+                    f'<row r="{r}"><c r="A{r}"><v>{r - 1}</v></c>'
+                    f'<c r="B{r}" t="s"><v>{rng.randrange(SHARED_STRINGS)}</v></c>'
+                    f'<c r="C{r}"><v>{rng.uniform(0, 100):.3f}</v></c>'
+                    f'<c r="D{r}" s="1"><v>{43831 + rng.randrange(1500)}</v></c>'
+                    f'<c r="E{r}" t="b"><v>{rng.randrange(2)}</v></c>'
+                    f'<c r="F{r}" t="s"><v>{rng.randrange(SHARED_STRINGS)}</v></c>'
+                    f'<c r="H{r}"><v>{rng.randrange(1_000_000)}</v></c></row>')
+                if len(batch) >= 10_000:
+                    f.write(''.join(batch).encode('utf-8'))
+                    batch = []
+            f.write((''.join(batch) + '</sheetData></worksheet>').encode('utf-8'))
+    tmp_path.replace(path)
+
+def read_with_xlsx_reader(path: Path) -> int:
+    count = 0
+    with XlsxReader(path) as book:
+        for _ in book.iter_rows(book.sheet_names[0]):
+            count += 1
+    return count
+
+def read_with_openpyxl(path: Path) -> int:
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        count = 0
+        for _ in wb.worksheets[0].iter_rows(values_only=True):
+            count += 1
+        return count
+    finally:
+        wb.close()
+
+def timed(reader, path: Path) -> tuple:
+    started = time.perf_counter()
+    rows = reader(path)
+    return rows, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="XLSX读取性能基准")
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help=f'数据行数 (默认: {DEFAULT_ROWS})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='测试数据随机种子')
+    parser.add_argument('--file', help='使用指定的XLSX文件代替生成的测试文件')
+    parser.add_argument('--skip-openpyxl', action='store_true', help='只测试 xlsx_reader')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    args = parser.parse_args()
+
+    if args.file:
+        path = Path(args.file)
+    else:
+        cache_dir = get_cache_dir() / 'bench_xlsx_reader'
+        ensure_directory(cache_dir)
+        path = cache_dir / f"rows_{args.rows}_seed_{args.seed}.xlsx"
+        if not path.exists():
+            show_processing(f"生成测试文件: {args.rows} 行 -> {path}")
+            build_test_file(path, args.rows, args.seed)
+    show_info(f"测试文件: {path} ({path.stat().st_size / (1024 * 1024):.1f} MB)")
+
+    rows, fast = timed(read_with_xlsx_reader, path)
+    show_info(f"xlsx_reader: {rows} 行, {fast:.2f} 秒, {rows / fast:,.0f} 行/秒")
+
+    if args.skip_openpyxl:
+        return
+    if not is_package_available('openpyxl'):
+        show_error("未安装 openpyxl，无法比较")
+        sys.exit(1)
+    baseline_rows, slow = timed(read_with_openpyxl, path)
+    show_info(f"openpyxl 只读: {baseline_rows} 行, {slow:.2f} 秒, {baseline_rows / slow:,.0f} 行/秒")
+    if baseline_rows != rows:
+        show_error(f"行数不一致: xlsx_reader {rows} 行, openpyxl {baseline_rows} 行")
+        sys.exit(1)
+    show_success(f"xlsx_reader 比 openpyxl 只读模式快 {slow / fast:.1f} 倍")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+XLSX写入内存基准 - 测量 convert_csv_to_xlsx.py 的峰值内存随行数的变化
+版本: 1.0.0
+作者: tianli
+
+按 make_corpus 的行格式生成不同行数的CSV，以独立子进程运行转换脚本，通过 os.wait4
+取得峰值常驻内存。流式写入时峰值内存应基本不随行数增长；--openpyxl 同时测量
+openpyxl 普通模式（Workbook + ws.append）作为对照。
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import subprocess
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from common_utils import (
+    show_success, show_error, show_info, show_processing, ensure_directory, get_cache_dir,
+    create_temp_dir, cleanup_temp_dir, is_package_available
+)
+from make_corpus import DEFAULT_SEED, write_text_table
+
+SCRIPT_VERSION = "1.0.0"
+DEFAULT_ROWS = [50_000, 100_000, 200_000, 400_000]
+# 最大行数与最小行数的峰值内存之比超过该值时视为内存随行数增长
+DEFAULT_MAX_GROWTH = 1.5
+
+# 对照组：openpyxl 普通模式，所有单元格对象保留到保存为止
+OPENPYXL_SNIPPET = """
+import csv, sys
+from openpyxl import Workbook
+wb = Workbook()
+ws = wb.active
+with open(sys.argv[1], 'r', encoding='utf-8', newline='') as f:
+    for row in csv.reader(f):
+        ws.append(row)
+wb.save(sys.argv[2])
+"""
+
+def _maxrss_mb(rusage) -> float:
+    # Linux 下 ru_maxrss 单位为 KB，macOS 下为字节
+    return rusage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else rusage.ru_maxrss / 1024
+
+def run_measured(command: list) -> tuple:
+    """运行子进程，返回 (耗时, 峰值内存MB)；失败时抛出异常"""
+    started = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    process.stderr.close()
+    _, status, rusage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(stderr.decode('utf-8', 'replace')[-500:])
+    return wall, _maxrss_mb(rusage)
+
+def test_csv(rows: int, seed: int) -> Path:
+    cache_dir = get_cache_dir() / 'bench_xlsx_writer'
+    ensure_directory(cache_dir)
+    path = cache_dir / f"rows_{rows}_seed_{seed}.csv"
+    if not path.exists():
+        show_processing(f"生成测试文件: {rows} 行 -> {path}")
+        tmp_path = path.with_suffix('.tmp')
+        write_text_table(tmp_path, random.Random(seed), rows, ',', 'utf-8')
+        tmp_path.replace(path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="XLSX写入内存基准")
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help=f'各测试文件的数据行数 (默认: {" ".join(map(str, DEFAULT_ROWS))})')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='测试数据随机种子')
+    parser.add_argument('--openpyxl', action='store_true', help='同时测量 openpyxl 普通模式作为对照')
+    parser.add_argument('--max-growth', type=float, default=DEFAULT_MAX_GROWTH,
+                        help=f'允许的峰值内存增长倍数 (默认: {DEFAULT_MAX_GROWTH})')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    args = parser.parse_args()
+
+    if args.openpyxl and not is_package_available('openpyxl'):
+        show_error("未安装 openpyxl，无法比较")
+        sys.exit(1)
+
+    rows_list = sorted(set(args.rows))
+    results = []
+    work = create_temp_dir()
+    try:
+        for rows in rows_list:
+            source = test_csv(rows, args.seed)
+            size_mb = source.stat().st_size / (1024 * 1024)
+            output = work / 'out.xlsx'
+            wall, rss = run_measured([sys.executable, str(SCRIPTS_DIR / 'convert_csv_to_xlsx.py'),
+                                      str(source), str(output)])
+            line = f"{rows:>10,} 行 ({size_mb:6.1f} MB): 流式写入 {wall:6.2f} 秒, 峰值内存 {rss:7.1f} MB"
+            if args.openpyxl:
+                base_wall, base_rss = run_measured([sys.executable, '-c', OPENPYXL_SNIPPET,
+                                                    str(source), str(output)])
+                line += f" | openpyxl {base_wall:6.2f} 秒, {base_rss:7.1f} MB"
+            show_info(line)
+            results.append(rss)
+    except RuntimeError as e:
+        show_error(f"转换失败: {e}")
+        sys.exit(1)
+    finally:
+        cleanup_temp_dir(work)
+
+    growth = results[-1] / results[0]
+    if len(results) > 1 and growth > args.max_growth:
+        show_error(f"峰值内存随行数增长 {growth:.2f} 倍，超过 {args.max_growth} 倍")
+        sys.exit(1)
+    show_success(f"峰值内存增长 {growth:.2f} 倍（{rows_list[0]:,} -> {rows_list[-1]:,} 行）")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+基准测试语料生成器 - 按固定随机种子生成各转换脚本的输入文件
+版本: 1.0.0
+作者: tianli
+
+同一种子和规模生成的文件逐字节一致：Office 文件的文档属性时间固定，
+并把 zip 内各条目的时间戳统一为 1980-01-01。
+"""
+
+import io
+import re
+import sys
+import zlib
+import struct
+import random
+import zipfile
+import argparse
+import datetime
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from common_utils import (
+    show_success, show_info, show_processing, ensure_directory, get_cache_dir,
+    check_python_packages, hash_file, write_json_atomic
+)
+
+SCRIPT_VERSION = "1.0.0"
+DEFAULT_SEED = 20240101
+FIXED_TIME = datetime.datetime(2024, 1, 1, 0, 0, 0)
+ZIP_EPOCH = (1980, 1, 1, 0, 0, 0)
+CORE_MODIFIED = re.compile(rb'(<dcterms:modified[^>]*>)[^<]*(</dcterms:modified>)')
+
+# 各规模的数据量；small 适合快速回归检查，large 用于观察内存和吞吐量
+SCALES = {
+    'small': {'tall_rows': 5_000, 'wide_rows': 200, 'wide_cols': 150, 'sheets': 6,
+              'sheet_rows': 1_000, 'text_rows': 10_000, 'doc_tables': 20, 'doc_images': 10},
+    'medium': {'tall_rows': 50_000, 'wide_rows': 1_000, 'wide_cols': 300, 'sheets': 12,
+               'sheet_rows': 5_000, 'text_rows': 100_000, 'doc_tables': 100, 'doc_images': 40},
+    'large': {'tall_rows': 300_000, 'wide_rows': 3_000, 'wide_cols': 600, 'sheets': 24,
+              'sheet_rows': 20_000, 'text_rows': 1_000_000, 'doc_tables': 400, 'doc_images': 120},
+}
+
+# 均可用 GBK 编码的常用中文词
+CJK_WORDS = [
+    '水库', '流量', '降雨', '河道', '堤防', '闸门', '监测', '水位', '泵站', '灌区',
+    '杭州', '宁波', '温州', '绍兴', '湖州', '嘉兴', '金华', '衢州', '舟山', '台州',
+    '一级', '二级', '正常', '预警', '汛期', '枯水期', '设计', '校核', '年平均', '合计',
+]
+ASCII_WORDS = ['alpha', 'beta', 'gamma', 'delta', 'station', 'gauge', 'pump', 'gate', 'node', 'zone']
+HEADER = ['编号', '日期', '站点', 'code', '水位', '流量', '占比', '备注']
+
+def make_row(rng: random.Random, index: int) -> list:
+    """生成一行中英文混合的数据，各列类型固定"""
+    day = datetime.date(2020, 1, 1) + datetime.timedelta(days=rng.randrange(1500))
+    return [
+        index,
+        day.isoformat(),
+        rng.choice(CJK_WORDS) + rng.choice(CJK_WORDS),
+        f"{rng.choice(ASCII_WORDS)}-{rng.randrange(10000):04d}",
+        round(rng.uniform(0, 100), 3),
+        rng.randrange(0, 1_000_000),
+        f"{rng.uniform(0, 100):.1f}%",
+        rng.choice(CJK_WORDS) if rng.random() < 0.7 else '',
+    ]
+
+def make_png(rng: random.Random, width: int = 64, height: int = 64) -> bytes:
+    """生成一张确定性的 RGB PNG 图片，不依赖 Pillow"""
+    base = [rng.randrange(256) for _ in range(3)]
+    raw = bytearray()
+    for y in range(height):
+        raw.append(0)
+        for x in range(width):
+            raw.extend(((base[0] + x * 3) % 256, (base[1] + y * 3) % 256, (base[2] + x * y) % 256))
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('!I', len(data)) + kind + data + struct.pack('!I', zlib.crc32(kind + data))
+
+    header = struct.pack('!IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(bytes(raw), 9)) + chunk(b'IEND', b''))
+
+def normalize_zip(path: Path) -> None:
+    """把 zip 内各条目的时间戳、权限和文档修改时间统一，使输出逐字节可复现"""
+    with zipfile.ZipFile(path) as source:
+        entries = [(info.filename, source.read(info)) for info in source.infolist()]
+    # openpyxl 保存时总会把修改时间写成当前时间
+    fixed = FIXED_TIME.strftime('%Y-%m-%dT%H:%M:%SZ').encode()
+    entries = [(name, CORE_MODIFIED.sub(rb'\g<1>' + fixed + rb'\g<2>', data)
+                if name == 'docProps/core.xml' else data) for name, data in entries]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as target:
+        for name, data in entries:
+            info = zipfile.ZipInfo(name, date_time=ZIP_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            info.create_system = 3
+            target.writestr(info, data)
+
+def fix_core_properties(properties) -> None:
+    properties.created = FIXED_TIME
+    properties.modified = FIXED_TIME
+    properties.last_modified_by = 'scripts_ray'
+
+# ===== 各类文件生成 =====
+
+def write_xlsx(path: Path, sheets: list) -> None:
+    """sheets 为 [(工作表名, 行迭代器)]，使用 write_only 模式保持内存占用较低"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    wb.properties.creator = 'scripts_ray'
+    wb.properties.created = wb.properties.modified = FIXED_TIME
+    for title, rows in sheets:
+        ws = wb.create_sheet(title)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+    normalize_zip(path)
+
+def tall_rows(rng: random.Random, count: int):
+    yield HEADER
+    for i in range(1, count + 1):
+        yield make_row(rng, i)
+
+def wide_rows(rng: random.Random, rows: int, cols: int):
+    yield [f"列{c}" for c in range(1, cols + 1)]
+    for _ in range(rows):
+        yield [rng.randrange(100000) if c % 3 == 0 else
+               round(rng.uniform(-1000, 1000), 4) if c % 3 == 1 else
+               rng.choice(CJK_WORDS + ASCII_WORDS) for c in range(cols)]
+
+def write_text_table(path: Path, rng: random.Random, count: int,
+                     separator: str, encoding: str) -> None:
+    """按指定分隔符和编码写出表格文本（CSV 字段不含逗号和引号，无需转义）"""
+    with open(path, 'w', encoding=encoding, newline='') as f:
+        f.write(separator.join(HEADER) + '\n')
+        for i in range(1, count + 1):
+            row = [str(value) if value != '' else '-' for value in make_row(rng, i)]
+            f.write(separator.join(row) + '\n')
+
+def write_docx(path: Path, rng: random.Random, tables: int, images: int) -> None:
+    from docx import Document
+    from docx.shared import Inches
+    doc = Document()
+    fix_core_properties(doc.core_properties)
+    image_every = max(1, tables // max(images, 1))
+    for t in range(tables):
+        doc.add_heading(f"表 {t + 1} {rng.choice(CJK_WORDS)}统计", level=2)
+        rows = rng.randrange(5, 20)
+        table = doc.add_table(rows=rows, cols=len(HEADER))
+        for c, name in enumerate(HEADER):
+            table.cell(0, c).text = name
+        for r in range(1, rows):
+            for c, value in enumerate(make_row(rng, r)):
+                table.cell(r, c).text = str(value)
+        if t % image_every == 0 and images > 0:
+            doc.add_picture(io.BytesIO(make_png(rng)), width=Inches(1))
+            images -= 1
+    doc.save(path)
+    normalize_zip(path)
+
+def write_pptx(path: Path, rng: random.Random, tables: int, images: int) -> None:
+    from pptx import Presentation
+    from pptx.util import Inches
+    prs = Presentation()
+    fix_core_properties(prs.core_properties)
+    layout = prs.slide_layouts[5]
+    image_every = max(1, tables // max(images, 1))
+    for t in range(tables):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"{rng.choice(CJK_WORDS)}{rng.choice(CJK_WORDS)} 第{t + 1}页"
+        rows = rng.randrange(4, 12)
+        shape = slide.shapes.add_table(rows, len(HEADER), Inches(0.3), Inches(1.5),
+                                       Inches(9), Inches(0.3) * rows)
+        for c, name in enumerate(HEADER):
+            shape.table.cell(0, c).text = name
+        for r in range(1, rows):
+            for c, value in enumerate(make_row(rng, r)):
+                shape.table.cell(r, c).text = str(value)
+        if t % image_every == 0 and images > 0:
+            slide.shapes.add_picture(io.BytesIO(make_png(rng)), Inches(8), Inches(0.2), Inches(1))
+            images -= 1
+    prs.save(path)
+    normalize_zip(path)
+
+# ===== 语料目录 =====
+
+def default_corpus_dir(scale: str) -> Path:
+    return get_cache_dir() / 'bench_corpus' / scale
+
+def build_corpus(out_dir: Path, scale: str = 'small', seed: int = DEFAULT_SEED,
+                 force: bool = False) -> dict:
+    """生成语料并写出 corpus.json 清单；清单与参数一致时直接复用已有语料"""
+    manifest_path = out_dir / 'corpus.json'
+    params = {'version': SCRIPT_VERSION, 'scale': scale, 'seed': seed}
+    if manifest_path.exists() and not force:
+        import json
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        if all(manifest.get(k) == v for k, v in params.items()) and \
+                all((out_dir / name).exists() for name in manifest.get('files', {})):
+            show_info(f"复用已有语料: {out_dir}")
+            return manifest
+
+    if not check_python_packages(['openpyxl', 'python-docx', 'python-pptx']):
+        sys.exit(1)
+    sizes = SCALES[scale]
+    # 每个文件使用独立的随机数序列，增减文件不会改变其他文件的内容
+    def rng(name: str) -> random.Random:
+        return random.Random(f"{seed}:{name}")
+
+    targets = [
+        ('xlsx/tall.xlsx', lambda p: write_xlsx(p, [('数据', tall_rows(rng(p.name), sizes['tall_rows']))])),
+        ('xlsx/wide.xlsx', lambda p: write_xlsx(p, [('宽表', wide_rows(rng(p.name), sizes['wide_rows'],
+                                                                      sizes['wide_cols']))])),
+        ('xlsx/multi_sheet.xlsx', lambda p: write_xlsx(p, [
+            (f"{CJK_WORDS[i % len(CJK_WORDS)]}{i + 1}", tall_rows(rng(f"{p.name}:{i}"), sizes['sheet_rows']))
+            for i in range(sizes['sheets'])])),
+        ('csv/mixed_cjk.csv', lambda p: write_text_table(p, rng(p.name), sizes['text_rows'], ',', 'utf-8')),
+        ('csv/gbk.csv', lambda p: write_text_table(p, rng(p.name), sizes['text_rows'], ',', 'gbk')),
+        ('txt/mixed_cjk.txt', lambda p: write_text_table(p, rng(p.name), sizes['text_rows'], ' ', 'utf-8')),
+        ('txt/gbk.txt', lambda p: write_text_table(p, rng(p.name), sizes['text_rows'], ' ', 'gbk')),
+        ('txt/tabbed.txt', lambda p: write_text_table(p, rng(p.name), sizes['text_rows'], '\t', 'utf-8')),
+        ('docx/tables_images.docx', lambda p: write_docx(p, rng(p.name), sizes['doc_tables'], sizes['doc_images'])),
+        ('pptx/tables_images.pptx', lambda p: write_pptx(p, rng(p.name), sizes['doc_tables'], sizes['doc_images'])),
+    ]
+
+    files = {}
+    for name, writer in targets:
+        path = out_dir / name
+        ensure_directory(path.parent)
+        show_processing(f"生成: {name}")
+        writer(path)
+        files[name] = {'bytes': path.stat().st_size, 'sha256': hash_file(path)}
+
+    manifest = dict(params, files=files)
+    write_json_atomic(manifest_path, manifest)
+    show_success(f"语料已生成: {out_dir} ({len(files)} 个文件)")
+    return manifest
+
+def main():
+    parser = argparse.ArgumentParser(description="生成基准测试语料")
+    parser.add_argument('-s', '--scale', choices=sorted(SCALES), default='small', help='语料规模 (默认: small)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f'随机种子 (默认: {DEFAULT_SEED})')
+    parser.add_argument('-o', '--output', help='输出目录 (默认: 缓存目录下的 bench_corpus/<规模>)')
+    parser.add_argument('--force', action='store_true', help='即使已有相同参数的语料也重新生成')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    args = parser.parse_args()
+
+    out_dir = Path(args.output) if args.output else default_corpus_dir(args.scale)
+    build_corpus(out_dir, args.scale, args.seed, args.force)
+
+if __name__ == "__main__":
+    main()
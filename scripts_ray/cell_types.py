@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+单元格类型推断模块 - 按块把CSV/TXT中的文本识别为整数、小数、百分比和日期
+版本: 1.0.0
+作者: tianli
+
+每次取一块行（默认 16384 行）按列转为 NumPy 字符串数组，用向量化的解析一次判断整列
+能否转为某种类型，不逐个单元格 try/except。列类型跨块保留：整数列遇到小数放宽为小数，
+遇到无法解析的值则从该块起按文本写出（之前的块已经写出，不再回头修改）。
+
+带前导零的编号 (如 007) 和超过 15 位有效数字的长数字 (如身份证号) 保留为文本，
+因为 Excel 的数字只有 15 位精度。
+"""
+
+from itertools import zip_longest
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+SCRIPT_VERSION = "1.0.0"
+
+# 用到 StringDType 和 np.strings.partition/slice，需要 NumPy 2.3 及以上
+MIN_NUMPY_VERSION = (2, 3)
+
+CHUNK_ROWS = 16384
+# Excel 数字的有效位数
+MAX_DIGITS = 15
+
+DATE_FORMAT = 'yyyy-mm-dd'
+DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+
+# 当前列类型 -> 本块依次尝试的类型；都不成立时该列改为文本
+_CANDIDATES = {
+    None: ('int', 'float', 'percent', 'date'),
+    'int': ('int', 'float'),
+    'float': ('float',),
+    'percent': ('percent',),
+    'date': ('date',),
+    'datetime': ('date',),
+}
+
+def _strings(values: Sequence[str]):
+    import numpy as np
+    return np.array(values, dtype=np.dtypes.StringDType())
+
+def _too_many_digits(s) -> bool:
+    import numpy as np
+    lengths = np.strings.str_len(s)
+    if not (lengths > MAX_DIGITS).any():
+        return False
+    non_digits = sum(np.strings.count(s, ch) for ch in '+-.eE')
+    return bool((lengths - non_digits > MAX_DIGITS).any())
+
+def _has_leading_zero(s):
+    import numpy as np
+    unsigned = np.strings.lstrip(s, '+-')
+    return (np.strings.startswith(unsigned, '0') & (np.strings.str_len(unsigned) > 1)
+            & ~np.strings.startswith(unsigned, '0.'))
+
+def _parse_int(s):
+    import numpy as np
+    try:
+        values = s.astype(np.int64)
+    except (ValueError, OverflowError):
+        return None
+    # 转回字符串后必须与原文一致，排除 007、+5、' 5'、1_000 等写法
+    if not (values.astype(s.dtype) == s).all():
+        return None
+    if _too_many_digits(s):
+        return None
+    return values
+
+def _parse_float(s):
+    import numpy as np
+    if (np.strings.find(s, '_') >= 0).any() or (np.strings.str_len(np.strings.strip(s))
+                                                 != np.strings.str_len(s)).any():
+        return None
+    try:
+        values = s.astype(np.float64)
+    except ValueError:
+        return None
+    # nan、inf 等写法保留为文本
+    if not np.isfinite(values).all():
+        return None
+    if _has_leading_zero(s).any() or _too_many_digits(s):
+        return None
+    return values
+
+def _parse_percent(s):
+    """12.5% -> (0.125, '0.0%')"""
+    import numpy as np
+    if not np.strings.endswith(s, '%').all():
+        return None
+    body = np.strings.slice(s, 0, -1)
+    values = _parse_float(body)
+    if values is None:
+        return None
+    dot = np.strings.find(body, '.')
+    decimals = int(np.where(dot >= 0, np.strings.str_len(body) - dot - 1, 0).max())
+    # 按原文的小数位数舍入，避免 33.3% 写成 0.33299999999999996
+    values = np.round(values / 100, min(decimals + 2, MAX_DIGITS))
+    number_format = '0.' + '0' * min(decimals, 4) + '%' if decimals else '0%'
+    return values, number_format
+
+def _parse_date(s):
+    """2024-01-02、2024/1/2、2024年1月2日（可带 时:分[:秒]）-> (Excel 序列日期, 是否带时间)"""
+    import numpy as np
+    text = s
+    for old, new in (('/', '-'), ('年', '-'), ('月', '-'), ('日', ''), ('T', ' ')):
+        text = np.strings.replace(text, old, new)
+    date, _, time = np.strings.partition(text, np.array(' ', dtype=s.dtype))
+    year, _, rest = np.strings.partition(date, np.array('-', dtype=s.dtype))
+    month, _, day = np.strings.partition(rest, np.array('-', dtype=s.dtype))
+    for part, widths in ((year, (4,)), (month, (1, 2)), (day, (1, 2))):
+        if not (np.strings.isdigit(part) & np.isin(np.strings.str_len(part), widths)).all():
+            return None
+    has_time = np.strings.str_len(time) > 0
+    hour, _, minutes = np.strings.partition(time, np.array(':', dtype=s.dtype))
+    if not (~has_time | (np.strings.isdigit(hour) & np.isin(np.strings.str_len(hour), (1, 2)))).all():
+        return None
+    iso = year + '-' + np.strings.zfill(month, 2) + '-' + np.strings.zfill(day, 2)
+    iso = np.where(has_time, iso + 'T' + np.strings.zfill(hour, 2) + ':' + minutes, iso)
+    try:
+        stamps = iso.astype('datetime64[s]')
+    except ValueError:
+        return None
+    # 1900 日期系统无法表示更早的日期
+    if (stamps < np.datetime64('1900-01-01')).any():
+        return None
+    serial = (stamps - np.datetime64('1899-12-30')) / np.timedelta64(1, 'D')
+    # 1900 日期系统把 1900-02-29 当作存在的日期
+    serial = np.where(serial < 61, serial - 1, serial)
+    return serial, bool(has_time.any())
+
+class ColumnTyper:
+    """逐块推断列类型并转换单元格值
+
+    number_format 通常为 XlsxWriter.number_format，用于登记百分比和日期格式并取得样式编号。
+    """
+
+    def __init__(self, number_format: Callable[[str], int]):
+        self.number_format = number_format
+        self.kinds: List[Optional[str]] = []
+
+    def _convert_column(self, index: int, column: Tuple[str, ...]) -> Tuple[list, int]:
+        import numpy as np
+        kind = self.kinds[index]
+        if kind == 'text':
+            return column, 0
+        s = _strings(column)
+        filled = s != ''
+        if not filled.any():
+            return column, 0
+        present = s[filled]
+        style = 0
+        for candidate in _CANDIDATES[kind]:
+            if candidate == 'int':
+                values = _parse_int(present)
+            elif candidate == 'float':
+                values = _parse_float(present)
+            elif candidate == 'percent':
+                result = _parse_percent(present)
+                values = None
+                if result is not None:
+                    values, number_format = result
+                    style = self.number_format(number_format)
+            else:
+                result = _parse_date(present)
+                values = None
+                if result is not None:
+                    values, has_time = result
+                    if has_time or kind == 'datetime':
+                        candidate = 'datetime'
+                    style = self.number_format(DATETIME_FORMAT if candidate == 'datetime'
+                                               else DATE_FORMAT)
+            if values is not None:
+                self.kinds[index] = candidate
+                if filled.all():
+                    return values.tolist(), style
+                converted = np.full(len(column), None, dtype=object)
+                converted[filled] = values
+                return converted.tolist(), style
+        self.kinds[index] = 'text'
+        return column, 0
+
+    def convert(self, rows: Sequence[Sequence[str]]) -> Tuple[List[tuple], List[int]]:
+        """转换一块行，返回 (转换后的行, 各列样式编号)"""
+        columns = list(zip_longest(*rows, fillvalue=''))
+        if len(columns) > len(self.kinds):
+            self.kinds.extend([None] * (len(columns) - len(self.kinds)))
+        converted, styles = [], []
+        for index, column in enumerate(columns):
+            values, style = self._convert_column(index, column)
+            converted.append(values)
+            styles.append(style)
+        return list(zip(*converted)), styles
+
+def iter_typed_chunks(rows: Iterable[Sequence[str]], number_format: Callable[[str], int],
+                      header: bool = True, chunk_rows: int = CHUNK_ROWS
+                      ) -> Iterator[Tuple[List[Sequence], Optional[List[int]]]]:
+    """把文本行分块转换为带类型的行，依次产生 (行列表, 各列样式编号)
+
+    header 为真时第一行作为列名原样产生（样式为 None）。
+    """
+    rows = iter(rows)
+    if header:
+        first = next(rows, None)
+        if first is None:
+            return
+        yield [first], None
+    typer = ColumnTyper(number_format)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield typer.convert(chunk)
+            chunk = []
+    if chunk:
+        yield typer.convert(chunk)
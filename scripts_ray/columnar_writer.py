@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+列式输出模块 - 把逐行产生的表格数据写为带类型、压缩的 Parquet 或 Feather 文件
+版本: 1.0.0
+作者: tianli
+
+第一行作为列名（可关闭），其余行按批推断各列类型后写为一个行组 (row group)，
+内存中最多只保留一批数据。后续批次出现与已写出类型不兼容的值时（例如整数列
+中出现文本），把该列放宽为兼容类型后从头重写，因此数据源需要能重新迭代。
+"""
+
+import re
+import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+SCRIPT_VERSION = "1.0.0"
+
+COLUMNAR_FORMATS = ('parquet', 'feather')
+OUTPUT_SUFFIXES = {'csv': '.csv', 'parquet': '.parquet', 'feather': '.feather'}
+BATCH_ROWS = 65536
+COMPRESSION = 'zstd'
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+# 文本数据中的整数和小数；带前导零的编号 (如 007) 保留为文本
+_TEXT_INT = re.compile(r'[-+]?(?:0|[1-9]\d*)')
+_TEXT_FLOAT = re.compile(r'[-+]?(?:0|[1-9]\d*)?(?:\.\d+)?(?:[eE][-+]?\d+)?')
+
+class _SchemaWidened(Exception):
+    """后续批次与已写出的列类型不兼容，需要以放宽后的类型重写"""
+
+    def __init__(self, types: Dict[int, str], width: int):
+        super().__init__()
+        self.types = types
+        self.width = width
+
+def output_suffix(output_format: str) -> str:
+    return OUTPUT_SUFFIXES[output_format]
+
+def _value_kind(value, parse_text: bool) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int' if INT64_MIN <= value <= INT64_MAX else 'string'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, datetime.datetime):
+        return 'timestamp'
+    if isinstance(value, str):
+        if value == '':
+            return None
+        if parse_text:
+            if _TEXT_INT.fullmatch(value):
+                return 'int' if INT64_MIN <= int(value) <= INT64_MAX else 'string'
+            if any(c.isdigit() for c in value) and _TEXT_FLOAT.fullmatch(value):
+                return 'float'
+        return 'string'
+    return 'string'
+
+def _merge_kind(current: Optional[str], new: Optional[str]) -> Optional[str]:
+    """两种列类型的最小兼容类型：整数与小数合并为小数，其余不同类型合并为文本"""
+    if current is None or current == new:
+        return new
+    if new is None:
+        return current
+    if {current, new} == {'int', 'float'}:
+        return 'float'
+    return 'string'
+
+def _column_names(header: list, width: int) -> List[str]:
+    names = []
+    seen = set()
+    for i in range(width):
+        value = header[i] if i < len(header) else None
+        name = str(value).strip() if value is not None and str(value).strip() else f"column_{i + 1}"
+        base, n = name, 2
+        while name in seen:
+            name = f"{base}_{n}"
+            n += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+def _to_array(pa, values: list, kind: str, parse_text: bool):
+    if kind == 'string':
+        return pa.array([None if v is None or v == '' else str(v) for v in values], pa.string())
+    if parse_text:
+        values = [None if v is None or v == '' else v for v in values]
+        if kind == 'int':
+            values = [v if v is None else int(v) for v in values]
+        elif kind == 'float':
+            values = [v if v is None else float(v) for v in values]
+    arrow_type = {'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(),
+                  'timestamp': pa.timestamp('us')}[kind]
+    return pa.array(values, arrow_type)
+
+class _Sink:
+    """按格式打开 Parquet 或 Feather (Arrow IPC) 写入器"""
+
+    def __init__(self, path: Path, output_format: str, schema):
+        import pyarrow as pa
+        if output_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(str(path), schema, compression=COMPRESSION)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=COMPRESSION)
+            self.writer = pa.ipc.new_file(str(path), schema, options=options)
+
+    def write(self, batch) -> None:
+        # Parquet 每批写为一个行组；Feather 每批写为一个记录批次
+        self.writer.write_batch(batch)
+
+    def close(self) -> None:
+        self.writer.close()
+
+def _write_once(rows: Iterable, path: Path, output_format: str, header: bool, parse_text: bool,
+                types: Dict[int, str], width: int, batch_rows: int) -> int:
+    import pyarrow as pa
+
+    rows = iter(rows)
+    names_row = list(next(rows, ()) or ()) if header else []
+    sink = schema = None
+    kinds: List[str] = []
+    names: List[str] = []
+    written = 0
+    try:
+        while True:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    break
+            if not batch and sink is not None:
+                break
+
+            batch_width = max([len(row) for row in batch] + [width, len(names_row)])
+            columns = [[] for _ in range(batch_width)]
+            for row in batch:
+                for i in range(batch_width):
+                    columns[i].append(row[i] if i < len(row) else None)
+
+            batch_kinds = []
+            for i, values in enumerate(columns):
+                kind = types.get(i)
+                for value in values:
+                    kind = _merge_kind(kind, _value_kind(value, parse_text))
+                    if kind == 'string':
+                        break
+                batch_kinds.append(kind)
+
+            if sink is None:
+                # 第一批确定列数和各列类型；第一批中全为空的列按文本处理
+                width = batch_width
+                kinds = [kind or 'string' for kind in batch_kinds]
+                names = _column_names(names_row, width)
+                arrow_types = {'bool': pa.bool_(), 'int': pa.int64(), 'float': pa.float64(),
+                               'timestamp': pa.timestamp('us'), 'string': pa.string()}
+                schema = pa.schema([(name, arrow_types[kind]) for name, kind in zip(names, kinds)])
+                sink = _Sink(path, output_format, schema)
+            else:
+                widened = {i: _merge_kind(kinds[i], kind) for i, kind in enumerate(batch_kinds)
+                           if i < len(kinds) and _merge_kind(kinds[i], kind) != kinds[i]}
+                if widened or batch_width > len(kinds):
+                    widened.update({i: kind for i, kind in enumerate(batch_kinds)
+                                    if i >= len(kinds) and kind})
+                    raise _SchemaWidened({**dict(enumerate(kinds)), **widened}, batch_width)
+
+            if batch:
+                arrays = [_to_array(pa, values, kind, parse_text)
+                          for values, kind in zip(columns, kinds)]
+                sink.write(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                written += len(batch)
+            if len(batch) < batch_rows:
+                break
+    finally:
+        if sink is not None:
+            sink.close()
+    return written
+
+def write_columnar(rows_factory: Callable[[], Iterable], output_file: Union[str, Path],
+                   output_format: str, header: bool = True, parse_text: bool = False,
+                   batch_rows: int = BATCH_ROWS) -> int:
+    """把 rows_factory() 产生的行写为 Parquet/Feather 文件，返回写出的数据行数
+
+    rows_factory 每次调用都应返回一个从头开始的新迭代器；parse_text 为真时把文本形式的
+    整数、小数识别为数字（用于 TXT 等没有类型的来源）。
+    """
+    if output_format not in COLUMNAR_FORMATS:
+        raise ValueError(f"不支持的列式格式: {output_format}")
+    output_file = Path(output_file)
+    temp_file = output_file.with_name(f".{output_file.name}.tmp")
+    types: Dict[int, str] = {}
+    width = 0
+    try:
+        while True:
+            try:
+                rows = _write_once(rows_factory(), temp_file, output_format, header, parse_text,
+                                   types, width, batch_rows)
+                break
+            except _SchemaWidened as e:
+                types, width = e.types, e.width
+        temp_file.replace(output_file)
+        return rows
+    finally:
+        if temp_file.exists():
+            temp_file.unlink()
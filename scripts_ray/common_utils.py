@@ -7,12 +7,26 @@ Python脚本通用工具模块
 提供统一的显示函数、文件操作、错误处理等功能
 """
 
+import io
 import os
+import json
+import time
+import queue
+import codecs
+import re
+import fnmatch
+import hashlib
+import sqlite3
+import importlib
+import importlib.util
 import sys
 import shutil
 import tempfile
+import threading
+import contextlib
+from collections import deque
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Sized, Tuple, Union
 
 # ===== 基础配置 =====
 
@@ -156,15 +170,28 @@ def check_command_exists(command: str) -> bool:
         return False
     return True
 
+# pip 包名与导入名不一致的常见包
+PACKAGE_IMPORT_NAMES = {
+    'python-docx': 'docx',
+    'python-pptx': 'pptx',
+    'pillow': 'PIL',
+    'pyyaml': 'yaml',
+    'beautifulsoup4': 'bs4',
+    'opencv-python': 'cv2',
+    'python-calamine': 'python_calamine',
+}
+
+def is_package_available(package: str) -> bool:
+    """只查找模块规格而不真正导入，判断包是否已安装"""
+    module_name = PACKAGE_IMPORT_NAMES.get(package.lower(), package)
+    try:
+        return importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):
+        return False
+
 def check_python_packages(packages: List[str]) -> bool:
-    """检查必需的Python包"""
-    missing_packages = []
-    
-    for package in packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    """检查必需的Python包（不导入包本身，不影响启动速度）"""
+    missing_packages = [package for package in packages if not is_package_available(package)]
     
     if missing_packages:
         show_error(f"缺少Python包: {', '.join(missing_packages)}")
@@ -172,6 +199,66 @@ def check_python_packages(packages: List[str]) -> bool:
         return False
     return True
 
+def check_package_version(package: str, minimum: Tuple[int, ...]) -> bool:
+    """检查已安装的包版本不低于 minimum（只读取包的元数据，不导入包本身）"""
+    from importlib import metadata
+    try:
+        installed = metadata.version(package)
+    except metadata.PackageNotFoundError:
+        # 没有元数据（如随项目附带的包）时无法判断，按满足处理
+        return True
+    match = re.match(r'\d+(?:\.\d+)*', installed)
+    current = tuple(int(part) for part in match.group(0).split('.')) if match else ()
+    if current < minimum:
+        required = '.'.join(map(str, minimum))
+        show_error(f"{package} 版本过低: {installed}，需要 {required} 或更高版本")
+        show_info(f"请运行: pip install -U '{package}>={required}'")
+        return False
+    return True
+
+def check_infer_dependencies(infer: bool = True) -> bool:
+    """CSV/TXT 转 XLSX 的依赖检查：工作表XML由 xlsx_writer 直接写入，只有类型推断需要 numpy"""
+    if not infer:
+        return True
+    from cell_types import MIN_NUMPY_VERSION
+    show_info("检查依赖项...")
+    if not (check_python_packages(['numpy'])
+            and check_package_version('numpy', MIN_NUMPY_VERSION)):
+        show_info("或使用 --no-infer 不推断类型，所有值按文本写出")
+        return False
+    show_success("依赖检查完成")
+    return True
+
+class LazyModule:
+    """延迟导入的模块代理，首次访问属性时才真正导入"""
+    
+    def __init__(self, name: str):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+    
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__dict__['_lazy_name'])
+            self.__dict__['_lazy_module'] = module
+        return module
+    
+    def __getattr__(self, attr: str):
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+    
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+    
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_lazy_module'] else 'not loaded'
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+def lazy_import(name: str) -> LazyModule:
+    """延迟导入重量级模块，例如 pd = lazy_import('pandas')"""
+    return LazyModule(name)
+
 # ===== 实用工具函数 =====
 
 def create_temp_dir() -> Path:
@@ -199,32 +286,101 @@ def retry_operation(operation, max_attempts: int = 3, *args, **kwargs):
 
 # ===== 文件查找函数 =====
 
-def find_files_by_extension(directory: Union[str, Path], 
-                          extension: str, 
-                          recursive: bool = False) -> List[Path]:
-    """根据扩展名查找文件"""
-    directory = Path(directory)
-    extension = extension.lower().lstrip('.')
+DEFAULT_PRUNE_DIRS = ('.git', '.svn', '.hg', 'node_modules', '__pycache__',
+                      '.venv', 'venv', '.tox', '.mypy_cache', '.pytest_cache')
+# Office 打开文件时生成的锁文件，无法转换
+DEFAULT_EXCLUDE = ('~$*',)
+
+PathsArg = Union[str, Path, Iterable[Union[str, Path]]]
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    if isinstance(value, (str, Path)):
+        return [value]
+    return list(value)
+
+def _compile_patterns(patterns) -> Optional[re.Pattern]:
+    patterns = _as_list(patterns)
+    if not patterns:
+        return None
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns))
+
+def iter_files(paths: PathsArg,
+               extensions: Union[str, Iterable[str]],
+               recursive: bool = False,
+               exclude: Optional[Iterable[str]] = DEFAULT_EXCLUDE,
+               prune: Optional[Iterable[str]] = DEFAULT_PRUNE_DIRS) -> Iterator[Path]:
+    """查找文件（生成器），对每个目录只做一次 os.scandir 遍历
+
+    paths 可以是单个或多个文件/目录；扩展名匹配不区分大小写；
+    exclude 按文件名或目录名排除，prune 指定不进入的目录（均为通配符模式）。
+    结果按目录内名称顺序边遍历边产出，不必等整棵目录树列完。
+    """
+    suffixes = tuple('.' + ext.lower().lstrip('.') for ext in _as_list(extensions))
+    exclude_re = _compile_patterns(exclude)
+    prune_re = _compile_patterns(prune)
+    roots = _as_list(paths)
+    seen = set() if len(roots) > 1 else None
     
-    if recursive:
-        pattern = f"**/*.{extension}"
-        files = list(directory.glob(pattern))
-        # 也搜索大写扩展名
-        files.extend(directory.glob(f"**/*.{extension.upper()}"))
-    else:
-        pattern = f"*.{extension}"
-        files = list(directory.glob(pattern))
-        # 也搜索大写扩展名
-        files.extend(directory.glob(f"*.{extension.upper()}"))
+    def wanted(name: str) -> bool:
+        return name.lower().endswith(suffixes) and not (exclude_re and exclude_re.match(name))
     
-    # 去重并排序
-    return sorted(list(set(files)))
+    def emit(path: str) -> Iterator[Path]:
+        if seen is not None:
+            real = os.path.realpath(path)
+            if real in seen:
+                return
+            seen.add(real)
+        yield Path(path)
+    
+    def scan(directory: str) -> list:
+        try:
+            with os.scandir(directory) as it:
+                return sorted(it, key=lambda entry: entry.name)
+        except OSError as e:
+            show_warning(f"无法读取目录: {directory} - {e}")
+            return []
+    
+    for root in roots:
+        root = os.fspath(root)
+        if os.path.isfile(root):
+            if wanted(os.path.basename(root)):
+                yield from emit(root)
+            continue
+        if not os.path.isdir(root):
+            show_warning(f"路径不存在: {root}")
+            continue
+        
+        stack = [iter(scan(root))]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not (prune_re and prune_re.match(entry.name)) \
+                            and not (exclude_re and exclude_re.match(entry.name)):
+                        stack.append(iter(scan(entry.path)))
+                elif wanted(entry.name) and entry.is_file():
+                    yield from emit(entry.path)
+            except OSError:
+                continue
+
+def find_files_by_extension(paths: PathsArg,
+                            extensions: Union[str, Iterable[str]],
+                            recursive: bool = False,
+                            exclude: Optional[Iterable[str]] = DEFAULT_EXCLUDE,
+                            prune: Optional[Iterable[str]] = DEFAULT_PRUNE_DIRS) -> List[Path]:
+    """根据扩展名查找文件，返回列表（参数同 iter_files）"""
+    return list(iter_files(paths, extensions, recursive, exclude, prune))
 
 def count_files_by_extension(directory: Union[str, Path], 
                            extension: str, 
                            recursive: bool = False) -> int:
     """统计指定扩展名的文件数量"""
-    return len(find_files_by_extension(directory, extension, recursive))
+    return sum(1 for _ in iter_files(directory, extension, recursive))
 
 # ===== 版本和帮助函数 =====
 
@@ -250,73 +406,584 @@ def show_help_footer() -> None:
     print("    --version        显示版本信息")
     print()
 
+# ===== 缓存目录 =====
+
+def get_cache_dir() -> Path:
+    """获取脚本缓存目录，可通过环境变量 SCRIPTS_RAY_CACHE_DIR 指定"""
+    override = os.environ.get('SCRIPTS_RAY_CACHE_DIR')
+    if override:
+        return Path(override)
+    base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / 'scripts_ray'
+
+def write_json_atomic(file_path: Union[str, Path], data: Any) -> None:
+    """原子写入JSON文件（先写临时文件再替换）"""
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
 # ===== 编码检测函数 =====
 
-def detect_file_encoding(file_path: Union[str, Path]) -> str:
-    """检测文件编码"""
+ENCODING_SAMPLE_SIZE = 4 * 1024 * 1024
+ENCODING_CACHE_LIMIT = 5000
+_DETECT_CHUNK_SIZE = 64 * 1024
+# chardet 置信度低于该值时不采用其结果（短文本常被识别为 ibm855 等能解码任意字节的编码）
+MIN_DETECT_CONFIDENCE = 0.5
+
+# UTF-32 的 BOM 以 UTF-16 的 BOM 开头，必须先检查
+_BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+# chardet 常把GBK文本识别为其子集，统一使用超集 gb18030
+_ENCODING_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'ascii': 'utf-8'}
+
+# (进程号, 连接)：fork 出的工作进程不能沿用父进程的 SQLite 连接
+_encoding_db: Optional[Tuple[int, sqlite3.Connection]] = None
+
+def _encoding_conn() -> sqlite3.Connection:
+    """编码缓存数据库，多个进程可以同时读写，每条检测结果单独写入"""
+    global _encoding_db
+    if _encoding_db is None or _encoding_db[0] != os.getpid():
+        db_path = get_cache_dir() / 'encoding_cache.sqlite3'
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+        with contextlib.suppress(sqlite3.DatabaseError):
+            conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS encodings ('
+                     'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, encoding TEXT)')
+        _encoding_db = (os.getpid(), conn)
+    return _encoding_db[1]
+
+def _cached_encoding(key: str, stamp: list) -> Optional[str]:
     try:
-        import chardet
-        file_path = Path(file_path)
-        with open(file_path, 'rb') as f:
-            raw_data = f.read()
-        result = chardet.detect(raw_data)
-        return result.get('encoding', 'utf-8')
+        row = _encoding_conn().execute(
+            'SELECT size, mtime_ns, encoding FROM encodings WHERE path = ?', (key,)).fetchone()
+    except (OSError, sqlite3.Error):
+        return None
+    return row[2] if row is not None and list(row[:2]) == stamp else None
+
+def _remember_encoding(key: str, stamp: list, encoding: str) -> None:
+    """记录检测结果；条目超过上限时删除最早写入的"""
+    try:
+        conn = _encoding_conn()
+        conn.execute('INSERT OR REPLACE INTO encodings VALUES (?, ?, ?, ?)',
+                     (key, stamp[0], stamp[1], encoding))
+        conn.execute('DELETE FROM encodings WHERE rowid <= (SELECT MAX(rowid) FROM encodings) - ?',
+                     (ENCODING_CACHE_LIMIT,))
+    except (OSError, sqlite3.Error):
+        pass
+
+def _normalize_encoding(encoding: Optional[str]) -> str:
+    if not encoding:
+        return 'utf-8'
+    encoding = encoding.lower()
+    return _ENCODING_ALIASES.get(encoding, encoding)
+
+def _sniff_encoding(file_path: Path, sample_size: int) -> str:
+    """分块检测编码：BOM 快速判断，UTF-8 校验通过则直接返回，否则逐块交给 chardet"""
+    with open_binary_input(file_path) as f:
+        head = f.read(_DETECT_CHUNK_SIZE)
+        for bom, encoding in _BOM_ENCODINGS:
+            if head.startswith(bom):
+                return encoding
+        
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        chunk, consumed = head, 0
+        try:
+            while chunk and consumed < sample_size:
+                decoder.decode(chunk)
+                consumed += len(chunk)
+                chunk = f.read(_DETECT_CHUNK_SIZE)
+            if not chunk:
+                decoder.decode(b'', final=True)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+    
+    try:
+        from chardet.universaldetector import UniversalDetector
     except ImportError:
         show_warning("chardet 包未安装，假设使用 utf-8 编码")
         return 'utf-8'
+    
+    # .zst 等压缩流不能向回 seek，重新打开后从头交给 chardet
+    detector = UniversalDetector()
+    sample = []
+    consumed = 0
+    with open_binary_input(file_path) as f:
+        while consumed < sample_size and not detector.done:
+            chunk = f.read(_DETECT_CHUNK_SIZE)
+            if not chunk:
+                break
+            detector.feed(chunk)
+            sample.append(chunk)
+            consumed += len(chunk)
+    detector.close()
+    detected = detector.result.get('encoding')
+    confidence = detector.result.get('confidence') or 0.0
+    if detected and confidence >= MIN_DETECT_CONFIDENCE:
+        return _normalize_encoding(detected)
+    
+    # 结果不可信时按后备编码依次试解码读到的数据，取第一个能解码的；与检测结果不同时给出警告
+    data = b''.join(sample)
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(data, False)
+        except UnicodeDecodeError:
+            continue
+        if encoding != _normalize_encoding(detected):
+            show_warning(f"编码检测结果不可信 ({detected}，置信度 {confidence:.2f})，"
+                         f"按 {encoding} 读取: {file_path.name}")
+        return encoding
+    return _normalize_encoding(detected)
+
+def detect_file_encoding(file_path: Union[str, Path],
+                         sample_size: int = ENCODING_SAMPLE_SIZE,
+                         use_cache: bool = True) -> str:
+    """检测文件编码
+
+    只读取文件开头最多 sample_size 字节；结果按 路径+大小+修改时间 缓存到磁盘，
+    文件未变化时再次调用不会重新检测。
+    """
+    file_path = Path(file_path)
+    try:
+        stat = file_path.stat()
+        key = str(file_path.resolve())
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        
+        if use_cache:
+            cached = _cached_encoding(key, stamp)
+            if cached:
+                return cached
+        
+        encoding = _sniff_encoding(file_path, sample_size)
+        if use_cache:
+            _remember_encoding(key, stamp, encoding)
+        return encoding
     except Exception as e:
         show_warning(f"编码检测失败: {e}，假设使用 utf-8 编码")
         return 'utf-8'
 
-def read_file_with_encoding(file_path: Union[str, Path], 
-                          encoding: Optional[str] = None) -> str:
-    """读取文件并自动检测编码"""
+# ===== 流式文本读取 =====
+
+TEXT_CHUNK_SIZE = 1024 * 1024
+FALLBACK_ENCODINGS = ['utf-8', 'gb18030', 'latin1']
+
+def _next_decoder(data: bytes, final: bool, tried: List[str], file_path: Path):
+    """当前编码解码失败时，依次尝试后备编码解码同一块数据"""
+    for encoding in FALLBACK_ENCODINGS:
+        if encoding in tried:
+            continue
+        tried.append(encoding)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            text = decoder.decode(data, final)
+        except UnicodeDecodeError:
+            continue
+        show_warning(f"使用 {encoding} 编码继续读取文件: {file_path}")
+        return decoder, text
+    raise UnicodeDecodeError(tried[-1], data, 0, len(data), "所有后备编码均解码失败")
+
+def _translate_newlines(text: str) -> str:
+    if '\r' not in text:
+        return text
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+def iter_text_chunks(file_path: Union[str, Path],
+                     encoding: Optional[str] = None,
+                     chunk_size: int = TEXT_CHUNK_SIZE,
+                     errors: str = 'strict',
+                     newline: Optional[str] = None) -> Iterator[str]:
+    """按块流式读取文本文件，每块都在行边界结束，内存占用与文件大小无关
+
+    解码失败时从出错的块开始改用后备编码继续解码，已读取的内容不会重新读取。
+    newline 的含义与 open() 相同：None 表示把 \\r\\n 和 \\r 统一转换为 \\n。
+    .gz/.zst/.xz 压缩文件边读边解压。
+    """
     file_path = Path(file_path)
-    
     if encoding is None:
         encoding = detect_file_encoding(file_path)
+    translate = _translate_newlines if newline is None else (lambda text: text)
     
+    # UTF-16/32 的换行符不是单字节，无法按字节对齐，交给 TextIOWrapper 处理
+    if codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32')):
+        with io.TextIOWrapper(open_binary_input(file_path), encoding=encoding, errors=errors,
+                              newline=newline) as f:
+            while True:
+                text = f.read(chunk_size)
+                if not text:
+                    return
+                yield text
+    
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    tried = [encoding]
+    carry = b''
+    with open_binary_input(file_path) as f:
+        while True:
+            block = f.read(chunk_size)
+            final = not block
+            data = carry + block
+            carry = b''
+            if not final:
+                cut = data.rfind(b'\n') + 1
+                if cut:
+                    data, carry = data[:cut], data[cut:]
+            
+            try:
+                text = decoder.decode(data, final)
+            except UnicodeDecodeError as e:
+                # 出错行之前的内容仍按原编码解码，从出错行开始切换编码
+                data = decoder.getstate()[0] + data
+                line_start = data.rfind(b'\n', 0, e.start) + 1
+                head = codecs.decode(data[:line_start], tried[-1], errors)
+                decoder, text = _next_decoder(data[line_start:], final, tried, file_path)
+                text = head + text
+            
+            if text:
+                yield translate(text)
+            if final:
+                return
+
+def iter_text_lines(file_path: Union[str, Path],
+                    encoding: Optional[str] = None,
+                    chunk_size: int = TEXT_CHUNK_SIZE,
+                    errors: str = 'strict') -> Iterator[str]:
+    """逐行流式读取文本文件（保留行尾换行符，与迭代文件对象一致）"""
+    pending = ''
+    for chunk in iter_text_chunks(file_path, encoding, chunk_size, errors):
+        # 超长行可能跨块，不完整的末行留到下一块拼接
+        for line in io.StringIO(pending + chunk, newline='\n'):
+            if line.endswith('\n'):
+                yield line
+                pending = ''
+            else:
+                pending = line
+    if pending:
+        yield pending
+
+def read_file_with_encoding(file_path: Union[str, Path], 
+                          encoding: Optional[str] = None) -> str:
+    """读取文件并自动检测编码"""
     try:
-        with open(file_path, 'r', encoding=encoding) as f:
-            return f.read()
+        return ''.join(iter_text_chunks(file_path, encoding))
     except UnicodeDecodeError:
-        # 如果指定编码失败，尝试其他常见编码
-        for fallback_encoding in ['utf-8', 'gbk', 'gb2312', 'latin1']:
-            if fallback_encoding != encoding:
-                try:
-                    with open(file_path, 'r', encoding=fallback_encoding) as f:
-                        show_warning(f"使用 {fallback_encoding} 编码读取文件: {file_path}")
-                        return f.read()
-                except UnicodeDecodeError:
-                    continue
-        
         fatal_error(f"无法读取文件，编码检测失败: {file_path}")
 
+# ===== 压缩文件读写 =====
+
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst', 'xz': '.xz'}
+COMPRESSION_LEVELS = {'gzip': (1, 9, 6), 'zstd': (1, 22, 3), 'xz': (0, 9, 6)}
+COMPRESS_BLOCK_SIZE = 1024 * 1024
+# 等待压缩的数据块上限，写入快于压缩时生产者在此阻塞，内存占用有上限
+COMPRESS_QUEUE_BLOCKS = 4
+
+def parse_compression(spec: Optional[str]) -> Optional[str]:
+    """校验 --compress 参数 (gzip、zstd、xz，可带 :级别)，返回规范化后的字符串"""
+    if not spec:
+        return None
+    method, _, level = spec.lower().partition(':')
+    if method not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"不支持的压缩格式: {method}（可选: {', '.join(COMPRESSION_SUFFIXES)}）")
+    low, high, default = COMPRESSION_LEVELS[method]
+    try:
+        level = int(level) if level else default
+    except ValueError:
+        raise ValueError(f"无效的压缩级别: {spec}") from None
+    if not low <= level <= high:
+        raise ValueError(f"{method} 的压缩级别应在 {low}-{high} 之间: {level}")
+    if method == 'zstd' and not is_package_available('zstandard'):
+        raise ValueError("zstd 压缩需要 zstandard 包，请运行: pip install zstandard")
+    return f"{method}:{level}"
+
+def add_compress_argument(parser) -> None:
+    parser.add_argument('--compress', metavar='FMT[:LEVEL]',
+                        help='压缩文本输出: gzip、zstd 或 xz，可指定级别，例如 zstd:9')
+
+def compression_of(file_path: Union[str, Path]) -> Optional[str]:
+    """按扩展名判断文件的压缩格式"""
+    suffix = Path(file_path).suffix.lower()
+    for method, method_suffix in COMPRESSION_SUFFIXES.items():
+        if suffix == method_suffix:
+            return method
+    return None
+
+def strip_compression_suffix(file_path: Union[str, Path]) -> Path:
+    """去掉压缩扩展名，例如 data.csv.gz -> data.csv"""
+    file_path = Path(file_path)
+    return file_path.with_suffix('') if compression_of(file_path) else file_path
+
+def compressed_path(file_path: Union[str, Path], compression: Optional[str]) -> Path:
+    """按压缩格式在输出文件名后追加扩展名（已有该扩展名时不重复追加）"""
+    file_path = Path(file_path)
+    if not compression:
+        return file_path
+    suffix = COMPRESSION_SUFFIXES[compression.partition(':')[0]]
+    if file_path.suffix.lower() == suffix:
+        return file_path
+    return file_path.with_name(file_path.name + suffix)
+
+def text_extensions(extension: str) -> List[str]:
+    """扩展名及其压缩形式，用于 iter_files 同时查找 .csv 和 .csv.gz 等文件"""
+    extension = extension.lower().lstrip('.')
+    return [extension] + [extension + suffix for suffix in COMPRESSION_SUFFIXES.values()]
+
+def open_binary_input(file_path: Union[str, Path]):
+    """以二进制方式打开输入文件，.gz/.zst/.xz 文件边读边解压"""
+    method = compression_of(file_path)
+    if method == 'gzip':
+        import gzip
+        return gzip.open(file_path, 'rb')
+    if method == 'xz':
+        import lzma
+        return lzma.open(file_path, 'rb')
+    if method == 'zstd':
+        import zstandard
+        # 其他工具生成的 .zst 文件可能由多个帧拼接而成
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            open(file_path, 'rb'), read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader, COMPRESS_BLOCK_SIZE)
+    return open(file_path, 'rb')
+
+def open_text_input(file_path: Union[str, Path], encoding: str = 'utf-8',
+                    newline: Optional[str] = '') -> io.TextIOWrapper:
+    """以文本方式打开输入文件，压缩文件透明解压"""
+    return io.TextIOWrapper(open_binary_input(file_path), encoding=encoding, newline=newline)
+
+def _compressor(compression: str):
+    method, _, level = compression.partition(':')
+    level = int(level)
+    if method == 'gzip':
+        import zlib
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if method == 'xz':
+        import lzma
+        return lzma.LZMACompressor(preset=level)
+    import zstandard
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+class CompressedWriter(io.RawIOBase):
+    """在后台线程中压缩并写入文件的二进制输出流
+
+    写入的数据块放入有界队列后立即返回，压缩和写盘在另一个线程中进行。
+    zlib、lzma 和 zstandard 压缩时都会释放 GIL，因此解析数据与压缩可以同时进行。
+    压缩线程中的异常在下一次写入或关闭时重新抛出。
+    """
+
+    def __init__(self, file_path: Union[str, Path], compression: str):
+        super().__init__()
+        self._compressor = _compressor(compression)
+        self._file = open(file_path, 'wb')
+        self._queue = queue.Queue(COMPRESS_QUEUE_BLOCKS)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name='compress', daemon=True)
+        self._thread.start()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self._error is not None:
+            raise self._error
+        # BufferedWriter 会复用传入的缓冲区，必须复制
+        self._queue.put(bytes(data))
+        return len(data)
+
+    def _run(self) -> None:
+        compress = self._compressor.compress
+        write = self._file.write
+        while True:
+            data = self._queue.get()
+            if data is None:
+                return
+            # 出错后继续取走队列中的数据，避免写入方阻塞
+            if self._error is None:
+                try:
+                    write(compress(data))
+                except BaseException as e:
+                    self._error = e
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is None:
+                self._file.write(self._compressor.flush())
+        finally:
+            self._file.close()
+            super().close()
+        if self._error is not None:
+            raise self._error
+
+def open_text_output(file_path: Union[str, Path], compression: Optional[str] = None,
+                     encoding: str = 'utf-8', newline: Optional[str] = '') -> io.TextIOBase:
+    """打开文本输出文件；指定 compression（parse_compression 的结果）时写入后台压缩流
+
+    调用方负责用 compressed_path 得到带压缩扩展名的文件名。
+    """
+    if not compression:
+        return open(file_path, 'w', encoding=encoding, newline=newline)
+    raw = CompressedWriter(file_path, compression)
+    return io.TextIOWrapper(io.BufferedWriter(raw, COMPRESS_BLOCK_SIZE),
+                            encoding=encoding, newline=newline)
+
 # ===== 进度统计类 =====
 
+ITEM_FIELDS = ('item', 'status', 'wall', 'cpu', 'bytes_in', 'bytes_out', 'rows')
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """最近秩法百分位数，sorted_values 需已排序且非空"""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def _format_size(num_bytes: float) -> str:
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
 class ProgressTracker:
-    """进度跟踪器"""
+    """进度跟踪器
+
+    计数只在主进程中更新：并行批处理时由 run_batch 按输入顺序汇总各工作进程
+    返回的结果，因此同一个实例可以安全地配合多进程使用。
+    每一项的耗时、CPU时间、输入/输出字节数和行数记录在 items 中（字段见 ITEM_FIELDS），
+    用于摘要中的 p50/p95/最大耗时、吞吐量统计以及 write_report() 输出的报告。
+    """
     
-    def __init__(self):
+    def __init__(self, total: Optional[int] = None):
         self.success_count = 0
         self.failed_count = 0
         self.skipped_count = 0
         self.total_count = 0
+        self.expected_total = total
+        self.current = 0
+        self.items: List[tuple] = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock', None)
+        return state
     
-    def add_success(self):
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+    
+    def show(self, item: str) -> None:
+        """显示当前进度（只有一项时不显示）"""
+        with self._lock:
+            self.current += 1
+            current = self.current
+        if self.expected_total == 1:
+            return
+        if self.expected_total:
+            show_processing(f"进度 ({current}/{self.expected_total}): {item}")
+        else:
+            show_processing(f"处理中 ({current}): {item}")
+    
+    def _add_item(self, status: str, metrics: Optional[dict]) -> None:
+        if metrics is not None:
+            self.items.append(tuple(status if field == 'status' else metrics.get(field)
+                                    for field in ITEM_FIELDS))
+    
+    def add_success(self, metrics: Optional[dict] = None):
         """添加成功计数"""
-        self.success_count += 1
-        self.total_count += 1
+        with self._lock:
+            self.success_count += 1
+            self.total_count += 1
+            self._add_item('success', metrics)
     
-    def add_failure(self):
+    def add_failure(self, metrics: Optional[dict] = None):
         """添加失败计数"""
-        self.failed_count += 1
-        self.total_count += 1
+        with self._lock:
+            self.failed_count += 1
+            self.total_count += 1
+            self._add_item('failed', metrics)
     
-    def add_skip(self):
+    def add_skip(self, metrics: Optional[dict] = None):
         """添加跳过计数"""
-        self.skipped_count += 1
-        self.total_count += 1
+        with self._lock:
+            self.skipped_count += 1
+            self.total_count += 1
+            self._add_item('skipped', metrics)
+    
+    def record(self, ok: bool, metrics: Optional[dict] = None) -> None:
+        """按结果添加成功或失败计数"""
+        if ok:
+            self.add_success(metrics)
+        else:
+            self.add_failure(metrics)
+    
+    def merge(self, other: 'ProgressTracker') -> None:
+        """合并另一个跟踪器的计数"""
+        with self._lock:
+            self.success_count += other.success_count
+            self.failed_count += other.failed_count
+            self.skipped_count += other.skipped_count
+            self.total_count += other.total_count
+            self.items.extend(other.items)
+    
+    def metrics_summary(self) -> dict:
+        """汇总已记录条目的耗时分布、字节数、行数和吞吐量"""
+        elapsed = time.perf_counter() - self.started
+        timed = [item for item in self.items if item[1] != 'skipped' and item[2] is not None]
+        walls = sorted(item[2] for item in timed)
+        bytes_in = sum(item[4] or 0 for item in timed)
+        rows = [item[6] for item in timed if item[6] is not None]
+        summary = {
+            'success': self.success_count,
+            'failed': self.failed_count,
+            'skipped': self.skipped_count,
+            'total': self.total_count,
+            'elapsed': round(elapsed, 6),
+            'cpu': round(sum(item[3] or 0 for item in timed), 6),
+            'bytes_in': bytes_in,
+            'bytes_out': sum(item[5] or 0 for item in timed),
+            'rows': sum(rows) if rows else None,
+            'throughput_mb_s': round(bytes_in / (1024 * 1024) / elapsed, 3) if elapsed > 0 else None,
+        }
+        if walls:
+            slowest = max(timed, key=lambda item: item[2])
+            summary.update({
+                'wall_p50': round(_percentile(walls, 0.50), 6),
+                'wall_p95': round(_percentile(walls, 0.95), 6),
+                'wall_max': round(walls[-1], 6),
+                'slowest': slowest[0],
+            })
+        return summary
+    
+    def write_report(self, report_path: Union[str, Path], operation_name: str = "处理") -> None:
+        """写出机器可读的报告：.jsonl 为每项一行加一行汇总，其余为单个JSON文档"""
+        report_path = Path(report_path)
+        summary = self.metrics_summary()
+        summary.update({'operation': operation_name,
+                        'generated': time.strftime('%Y-%m-%dT%H:%M:%S%z')})
+        items = [dict(zip(ITEM_FIELDS, item)) for item in self.items]
+        try:
+            ensure_directory(report_path.parent)
+            if report_path.suffix.lower() == '.jsonl':
+                with open(report_path, 'w', encoding='utf-8') as f:
+                    for item in items:
+                        f.write(json.dumps({'type': 'item', **item}, ensure_ascii=False) + '\n')
+                    f.write(json.dumps({'type': 'summary', **summary}, ensure_ascii=False) + '\n')
+            else:
+                write_json_atomic(report_path, {'summary': summary, 'items': items})
+            show_info(f"性能报告已写入: {report_path}")
+        except OSError as e:
+            show_error(f"无法写入性能报告: {report_path} - {e}")
     
     def show_summary(self, operation_name: str = "处理"):
         """显示统计摘要"""
@@ -329,6 +996,596 @@ class ProgressTracker:
             print(f"⚠️ 跳过: {self.skipped_count} 个")
         print(f"📊 总计: {self.total_count} 个")
         
-        if self.total_count > 0:
-            success_rate = (self.success_count * 100) // self.total_count
-            print(f"📊 成功率: {success_rate}%") 
\ No newline at end of file
+        processed = self.total_count - self.skipped_count
+        if processed > 0:
+            success_rate = (self.success_count * 100) // processed
+            print(f"📊 成功率: {success_rate}%")
+        
+        summary = self.metrics_summary()
+        if 'wall_max' in summary:
+            print(f"⏱️ 耗时: {summary['elapsed']:.2f} 秒，单项 p50 {summary['wall_p50']:.2f} 秒 / "
+                  f"p95 {summary['wall_p95']:.2f} 秒 / 最长 {summary['wall_max']:.2f} 秒 "
+                  f"({Path(summary['slowest']).name})")
+            line = f"📦 输入 {_format_size(summary['bytes_in'])}，输出 {_format_size(summary['bytes_out'])}"
+            if summary['throughput_mb_s'] is not None:
+                line += f"，吞吐 {summary['throughput_mb_s']:.1f} MB/s"
+            if summary['rows'] is not None:
+                line += f"，共 {summary['rows']:,} 行"
+            print(line)
+
+# ===== 增量转换清单 =====
+
+def hash_file(file_path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def file_fingerprint(file_path: Union[str, Path]) -> list:
+    """返回 [绝对路径, 大小, 修改时间(ns), 内容哈希]"""
+    file_path = Path(file_path).resolve()
+    stat = file_path.stat()
+    return [str(file_path), stat.st_size, stat.st_mtime_ns, hash_file(file_path)]
+
+_task_outputs: List[Tuple[str, Optional[int]]] = []
+
+def register_output(file_path: Union[str, Path], rows: Optional[int] = None) -> None:
+    """登记当前任务生成的输出文件及其行数，供增量清单和性能统计使用"""
+    _task_outputs.append((str(file_path), rows))
+
+def register_sheet_outputs(sheet) -> None:
+    """登记 xlsx_writer.RollingSheetWriter 写出的各个文件，续写到多个工作表或文件时给出说明"""
+    for path, rows in sheet.outputs():
+        register_output(path, rows)
+    if sheet.sheet_count > 1:
+        unit = '个工作表' if sheet.overflow == 'sheets' else '个文件'
+        show_info(f"超过 Excel 行数上限，已续写为 {sheet.sheet_count} {unit}（每个都重复列名行）")
+
+def _task_metrics(item: Any, wall: float, cpu: float) -> dict:
+    """汇总单个任务的耗时、输入/输出字节数和行数"""
+    metrics = {'item': str(item), 'wall': round(wall, 6), 'cpu': round(cpu, 6),
+               'bytes_in': None, 'bytes_out': 0, 'rows': None}
+    with contextlib.suppress(OSError, TypeError):
+        metrics['bytes_in'] = os.path.getsize(item)
+    for path, rows in _task_outputs:
+        with contextlib.suppress(OSError):
+            metrics['bytes_out'] += os.path.getsize(path)
+        if rows is not None:
+            metrics['rows'] = (metrics['rows'] or 0) + rows
+    return metrics
+
+class ConversionManifest:
+    """增量转换清单
+
+    以 SQLite 保存每个输入文件的大小、修改时间、内容哈希，生成它时的工具版本与选项，
+    以及各输出文件的指纹。输入、选项和输出都未变化时该文件可以跳过；
+    只有修改时间变化而内容相同的文件通过比较哈希确认，不会被重新转换。
+    """
+    
+    COMMIT_INTERVAL = 100
+    
+    def __init__(self, tool: str, version: str, db_path: Optional[Union[str, Path]] = None):
+        self.tool = tool
+        self.version = version
+        self.db_path = Path(db_path) if db_path else get_cache_dir() / 'manifest.sqlite3'
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+        with contextlib.suppress(sqlite3.DatabaseError):
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'tool TEXT, input TEXT, size INTEGER, mtime_ns INTEGER, digest TEXT, '
+            'version TEXT, options TEXT, outputs TEXT, PRIMARY KEY (tool, input))'
+        )
+        self._uncommitted = 0
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @staticmethod
+    def _refresh(entry: list) -> Optional[bool]:
+        """检查指纹：None 表示已变化或缺失，True 表示仅修改时间变化（已就地更新）"""
+        path, size, mtime_ns, digest = entry
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if stat.st_size != size:
+            return None
+        if stat.st_mtime_ns == mtime_ns:
+            return False
+        if hash_file(path) != digest:
+            return None
+        entry[2] = stat.st_mtime_ns
+        return True
+    
+    def is_fresh(self, input_file: Union[str, Path], options: str) -> bool:
+        """输入、工具版本、选项与所有输出均未变化时返回 True"""
+        key = str(Path(input_file).resolve())
+        row = self._conn.execute(
+            'SELECT size, mtime_ns, digest, version, options, outputs '
+            'FROM entries WHERE tool = ? AND input = ?', (self.tool, key)
+        ).fetchone()
+        if row is None or row[3] != self.version or row[4] != options:
+            return False
+        
+        source = [key, row[0], row[1], row[2]]
+        outputs = json.loads(row[5])
+        touched = False
+        for entry in [source] + outputs:
+            state = self._refresh(entry)
+            if state is None:
+                return False
+            touched = touched or state
+        if touched:
+            self.record(source, options, outputs)
+        return True
+    
+    def record(self, source: list, options: str, outputs: List[list]) -> None:
+        """记录一次成功的转换"""
+        self._conn.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (self.tool, source[0], source[1], source[2], source[3],
+             self.version, options, json.dumps(outputs, ensure_ascii=False))
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self.COMMIT_INTERVAL:
+            self._conn.commit()
+            self._uncommitted = 0
+    
+    def close(self) -> None:
+        self._conn.commit()
+        self._conn.close()
+
+def open_manifest(enabled: bool, tool: str, version: str):
+    """按需打开增量清单，未启用时返回值为 None 的上下文"""
+    return ConversionManifest(tool, version) if enabled else contextlib.nullcontext()
+
+# ===== 并行批处理 =====
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """解析并行进程数，0 或负数表示使用全部CPU核心"""
+    if not jobs or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+def add_batch_arguments(parser) -> None:
+    """为批处理脚本添加通用命令行选项"""
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='并行进程数 (0 表示使用全部CPU核心)')
+    parser.add_argument('--report', metavar='PATH',
+                        help='把每个文件的耗时、字节数、行数写入JSON/JSONL报告')
+
+def add_incremental_argument(parser) -> None:
+    """添加 --incremental 选项"""
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式: 跳过输入、选项和输出都未变化的文件')
+
+_EXHAUSTED = object()
+
+def _item_name(item: Any) -> str:
+    return Path(item).name if isinstance(item, (str, Path)) else str(item)
+
+def _batch_worker(worker: Callable[..., bool], item: Any, kwargs: dict,
+                  capture: bool, fingerprint: bool = False) -> dict:
+    """在工作进程中执行单个任务，异常只计为该任务失败"""
+    buffer = io.StringIO()
+    result = {'ok': False}
+    del _task_outputs[:]
+    with contextlib.redirect_stdout(buffer) if capture else contextlib.nullcontext():
+        try:
+            if fingerprint:
+                result['input'] = file_fingerprint(item)
+            phases_before = dict(_phase_totals) if _phase_state['enabled'] else None
+            started, cpu_started = time.perf_counter(), time.process_time()
+            with _profile_worker_task():
+                result['ok'] = bool(worker(item, **kwargs))
+            wall = time.perf_counter() - started
+            result['metrics'] = _task_metrics(item, wall, time.process_time() - cpu_started)
+            if phases_before is not None:
+                result['phases'] = _task_phases(phases_before, wall)
+                result['pid'] = os.getpid()
+            if fingerprint and result['ok']:
+                outputs = dict.fromkeys(path for path, _ in _task_outputs)
+                result['outputs'] = [file_fingerprint(path) for path in outputs]
+        except Exception as e:
+            show_error(f"处理失败: {_item_name(item)} - {e}")
+            result['ok'] = False
+    result['output'] = buffer.getvalue()
+    return result
+
+def _run_isolated(worker: Callable[..., bool], item: Any, kwargs: dict,
+                  fingerprint: bool) -> dict:
+    """在独立的单进程池中重跑任务，用于定位导致进程池崩溃的任务"""
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    with ProcessPoolExecutor(max_workers=1) as solo:
+        try:
+            return solo.submit(_batch_worker, worker, item, kwargs, True, fingerprint).result()
+        except BrokenProcessPool:
+            return {'ok': False, 'output': f"❌ 工作进程异常退出: {_item_name(item)}\n"}
+
+def _finish_item(tracker: ProgressTracker, manifest: Optional[ConversionManifest],
+                 options: Optional[str], item: Any, result: Optional[dict]) -> None:
+    """在主进程中汇总单个任务的结果，result 为 None 表示增量模式下跳过"""
+    if result is None:
+        show_info(f"未变化，跳过: {_item_name(item)}")
+        tracker.add_skip({'item': str(item)})
+        return
+    sys.stdout.write(result['output'])
+    tracker.record(result['ok'], result.get('metrics') or {'item': str(item)})
+    if result.get('pid', os.getpid()) != os.getpid():
+        for name, seconds in result['phases'].items():
+            _add_phase(name, seconds)
+    if manifest is not None and result['ok'] and 'outputs' in result:
+        manifest.record(result['input'], options, result['outputs'])
+
+def run_batch(items: Iterable, worker: Callable[..., bool], jobs: int = 1,
+              tracker: Optional[ProgressTracker] = None,
+              manifest: Optional[ConversionManifest] = None,
+              on_result: Optional[Callable[[Any, bool], None]] = None,
+              **worker_kwargs) -> ProgressTracker:
+    """批量执行 worker(item, **worker_kwargs) 并统计结果
+
+    jobs > 1 时使用进程池并行处理；各任务的输出在主进程中按输入顺序回放，
+    单个任务抛出异常或工作进程崩溃只会记为该任务失败。worker 必须是模块级函数。
+    传入 manifest 时启用增量模式，worker 需用 register_output() 登记输出文件。
+    on_result(item, ok) 在主进程中按输入顺序、每个任务汇总后调用（增量模式跳过的任务 ok 为 False）。
+    """
+    if tracker is None:
+        tracker = ProgressTracker(len(items) if isinstance(items, Sized) else None)
+    jobs = resolve_jobs(jobs)
+    fingerprint = manifest is not None
+    options = json.dumps(worker_kwargs, sort_keys=True, default=str) if fingerprint else None
+    
+    def is_fresh(item) -> bool:
+        return fingerprint and manifest.is_fresh(item, options)
+    
+    if jobs <= 1:
+        for item in items:
+            tracker.show(_item_name(item))
+            if is_fresh(item):
+                _finish_item(tracker, manifest, options, item, None)
+                if on_result is not None:
+                    on_result(item, False)
+                continue
+            result = _batch_worker(worker, item, worker_kwargs, False, fingerprint)
+            _finish_item(tracker, manifest, options, item, result)
+            if on_result is not None:
+                on_result(item, result['ok'])
+        return tracker
+    
+    # 进程池模块较重，只在并行时导入
+    from concurrent.futures import ProcessPoolExecutor
+    from concurrent.futures.process import BrokenProcessPool
+    
+    iterator = iter(items)
+    window = jobs * 4
+    pending = deque()
+    sys.stdout.flush()
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    
+    def submit(item):
+        if is_fresh(item):
+            return None
+        return executor.submit(_batch_worker, worker, item, worker_kwargs, True, fingerprint)
+    
+    def resubmit(item, future):
+        """进程池崩溃后只重新提交被取消或随进程池一起失败的任务，已完成的结果保留"""
+        if future is None or (future.done() and not future.cancelled()
+                              and not isinstance(future.exception(), BrokenProcessPool)):
+            return future
+        return executor.submit(_batch_worker, worker, item, worker_kwargs, True, fingerprint)
+    
+    try:
+        while True:
+            while len(pending) < window:
+                item = next(iterator, _EXHAUSTED)
+                if item is _EXHAUSTED:
+                    break
+                pending.append((item, submit(item)))
+            if not pending:
+                break
+            
+            item, future = pending.popleft()
+            try:
+                result = future.result() if future is not None else None
+            except BrokenProcessPool:
+                executor.shutdown(wait=False, cancel_futures=True)
+                result = _run_isolated(worker, item, worker_kwargs, fingerprint)
+                executor = ProcessPoolExecutor(max_workers=jobs)
+                pending = deque((queued, resubmit(queued, queued_future))
+                                for queued, queued_future in pending)
+            except Exception as e:
+                result = {'ok': False, 'output': f"❌ 处理失败: {_item_name(item)} - {e}\n"}
+            
+            tracker.show(_item_name(item))
+            _finish_item(tracker, manifest, options, item, result)
+            if on_result is not None:
+                on_result(item, bool(result and result['ok']))
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    
+    return tracker
+
+# ===== 性能分析 =====
+
+# 分阶段计时默认关闭；通过环境变量传递给并行工作进程
+_phase_state = {'enabled': os.environ.get('SCRIPTS_RAY_TIMINGS') == '1'}
+_phase_totals: dict = {}
+_NULL_PHASE = contextlib.nullcontext()
+
+PROFILE_TOP_DEFAULT = 25
+TRACEMALLOC_FRAMES = 5
+TRACEMALLOC_TOP = 10
+
+def timings_enabled() -> bool:
+    return _phase_state['enabled']
+
+def _add_phase(name: str, seconds: float) -> None:
+    _phase_totals[name] = _phase_totals.get(name, 0.0) + seconds
+
+class _PhaseTimer:
+    __slots__ = ('name', 'started')
+    
+    def __init__(self, name: str):
+        self.name = name
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        _add_phase(self.name, time.perf_counter() - self.started)
+        return False
+
+def phase(name: str):
+    """分阶段计时的上下文管理器，例如 with phase('read'): ...；未启用 --timings 时为空操作"""
+    return _PhaseTimer(name) if _phase_state['enabled'] else _NULL_PHASE
+
+def timed_iter(iterable: Iterable, name: str = 'read') -> Iterable:
+    """把迭代器每次取下一项的耗时计入指定阶段；未启用时原样返回"""
+    if not _phase_state['enabled']:
+        return iterable
+    
+    def generate():
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                _add_phase(name, time.perf_counter() - started)
+                return
+            _add_phase(name, time.perf_counter() - started)
+            yield item
+    return generate()
+
+def timed_call(func: Callable, name: str = 'write') -> Callable:
+    """把函数每次调用的耗时计入指定阶段；未启用时原样返回"""
+    if not _phase_state['enabled']:
+        return func
+    
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _add_phase(name, time.perf_counter() - started)
+    return wrapper
+
+def _task_phases(before: dict, wall: float) -> dict:
+    """计算单个任务的各阶段耗时，未单独计时的部分计为 transform"""
+    phases = {name: total - before.get(name, 0.0) for name, total in _phase_totals.items()
+              if total - before.get(name, 0.0) > 0}
+    remainder = wall - sum(phases.values())
+    if remainder > 0:
+        _add_phase('transform', remainder)
+        phases['transform'] = phases.get('transform', 0.0) + remainder
+    return phases
+
+_worker_profiler: dict = {}
+
+@contextlib.contextmanager
+def _profile_worker_task():
+    """在并行工作进程中累计 cProfile 数据，主进程结束时合并"""
+    base = os.environ.get('SCRIPTS_RAY_PROFILE')
+    if not base or os.environ.get('SCRIPTS_RAY_PROFILE_PID') == str(os.getpid()):
+        yield
+        return
+    profiler = _worker_profiler.get('profiler')
+    if profiler is None:
+        import cProfile
+        profiler = _worker_profiler['profiler'] = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{base}.worker{os.getpid()}")
+
+_PROFILING_FLAGS = ('--profile', '--profile-top', '--trace-malloc', '--timings')
+# --profile 后面空格分隔的值只有以这些扩展名结尾时才作为输出路径，避免把脚本的输入文件当作输出覆盖
+PROFILE_SUFFIXES = ('.pstats', '.prof')
+
+def _profiling_parser():
+    import argparse
+    # allow_abbrev=False：不能把脚本自己的 --prof 之类的选项当作缩写吞掉
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument('--profile', nargs='?', const='')
+    parser.add_argument('--profile-top', dest='top', default=str(PROFILE_TOP_DEFAULT))
+    parser.add_argument('--trace-malloc', action='store_true')
+    parser.add_argument('--timings', action='store_true')
+    return parser
+
+def _check_profiling_options(options) -> dict:
+    if not options.top.isdigit():
+        fatal_error(f"--profile-top 需要一个正整数: {options.top}")
+    if options.profile and not options.profile.lower().endswith(PROFILE_SUFFIXES):
+        fatal_error(f"--profile 的输出文件需以 {' 或 '.join(PROFILE_SUFFIXES)} 结尾: {options.profile}"
+                    f"（如果它是脚本参数，请写成 --profile 放在最后或使用 --profile=PATH）")
+    return {'profile': options.profile, 'top': int(options.top),
+            'trace_malloc': options.trace_malloc, 'timings': options.timings}
+
+def _pop_profiling_options(argv: List[str]) -> dict:
+    """从参数列表中取出性能分析选项（原地修改），其余参数按原顺序留给脚本自己解析
+
+    支持 --profile、--profile=PATH 和 --profile PATH；-- 之后的参数不再解析。
+    """
+    # 只有出现性能分析选项时才导入 argparse 解析，不影响普通运行的启动速度
+    if not any(arg.partition('=')[0] in _PROFILING_FLAGS for arg in argv[1:]):
+        return {'profile': None, 'top': PROFILE_TOP_DEFAULT, 'trace_malloc': False, 'timings': False}
+    options, remaining = _profiling_parser().parse_known_args(argv[1:])
+    argv[1:] = remaining
+    return _check_profiling_options(options)
+
+class _PeakSampler(threading.Thread):
+    """后台采样 tracemalloc，在内存占用创新高时保存快照，用于定位峰值分配位置"""
+    
+    def __init__(self, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.snapshot = None
+        self.snapshot_size = 0
+        self.stopped = threading.Event()
+    
+    def capture(self) -> None:
+        import tracemalloc
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self.snapshot_size * 1.1:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+    
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.capture()
+
+def _show_timings() -> None:
+    total = sum(_phase_totals.values())
+    if not total:
+        show_info("分阶段计时: 没有记录到数据")
+        return
+    print()
+    show_info("分阶段计时 (未单独计时的部分计为 transform):")
+    for name, seconds in sorted(_phase_totals.items(), key=lambda kv: -kv[1]):
+        print(f"  {name:<12} {seconds:10.3f} 秒  {seconds * 100 / total:5.1f}%")
+
+def _show_profile(profile_path: Path, top: int) -> None:
+    import glob
+    import pstats
+    worker_files = sorted(glob.glob(glob.escape(str(profile_path)) + '.worker*'))
+    stats = pstats.Stats(str(profile_path), *worker_files, stream=sys.stdout)
+    if worker_files:
+        stats.dump_stats(str(profile_path))
+        for worker_file in worker_files:
+            with contextlib.suppress(OSError):
+                os.unlink(worker_file)
+    print()
+    show_info(f"cProfile 结果已保存: {profile_path}" +
+              (f" (合并了 {len(worker_files)} 个工作进程)" if worker_files else ""))
+    stats.sort_stats('cumulative').print_stats(top)
+
+def _show_malloc_peak(sampler: _PeakSampler) -> None:
+    import tracemalloc
+    peak = tracemalloc.get_traced_memory()[1]
+    sampler.capture()
+    print()
+    show_info(f"tracemalloc 峰值: {_format_size(peak)} (仅统计主进程)")
+    if sampler.snapshot is None:
+        return
+    snapshot = sampler.snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+    ])
+    show_info(f"接近峰值时 ({_format_size(sampler.snapshot_size)}) 的主要分配位置:")
+    for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+        frame = stat.traceback[0]
+        print(f"  {_format_size(stat.size):>10}  {stat.count:>8} 块  {frame.filename}:{frame.lineno}")
+
+def run_main(main_func: Callable[[], Any], argv: Optional[List[str]] = None) -> Any:
+    """运行脚本的 main()，并处理通用的性能分析选项
+
+    --profile[=PATH]    使用 cProfile 分析，结果保存为 .pstats 并显示前 N 项
+    --profile-top N     显示的函数数量（默认 25）
+    --trace-malloc      使用 tracemalloc 统计峰值内存及主要分配位置
+    --timings           显示 read/transform/write 等阶段的耗时
+    这些选项会在脚本解析参数前从 sys.argv 中移除；都未指定时直接调用 main_func()。
+    --profile 后空格分隔的路径须以 .pstats 或 .prof 结尾。
+    """
+    return _run_profiled(main_func, _pop_profiling_options(sys.argv if argv is None else argv))
+
+def _run_profiled(main_func: Callable[[], Any], options: dict) -> Any:
+    if options['profile'] is None and not options['trace_malloc'] and not options['timings']:
+        return main_func()
+    
+    profiler = sampler = profile_path = None
+    if options['timings']:
+        _phase_state['enabled'] = True
+        os.environ['SCRIPTS_RAY_TIMINGS'] = '1'
+    if options['trace_malloc']:
+        import tracemalloc
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        sampler = _PeakSampler()
+        sampler.start()
+    if options['profile'] is not None:
+        import cProfile
+        script = Path(sys.argv[0]).stem or 'python'
+        profile_path = Path(options['profile'] or f"{script}_{time.strftime('%Y%m%d_%H%M%S')}.pstats").resolve()
+        os.environ['SCRIPTS_RAY_PROFILE'] = str(profile_path)
+        os.environ['SCRIPTS_RAY_PROFILE_PID'] = str(os.getpid())
+        profiler = cProfile.Profile()
+    
+    started = time.perf_counter()
+    try:
+        if profiler is not None:
+            return profiler.runcall(main_func)
+        return main_func()
+    finally:
+        elapsed = time.perf_counter() - started
+        if sampler is not None:
+            sampler.stopped.set()
+            _show_malloc_peak(sampler)
+            tracemalloc.stop()
+        if profiler is not None:
+            profiler.dump_stats(str(profile_path))
+            _show_profile(profile_path, options['top'])
+        if options['timings']:
+            _show_timings()
+            show_info(f"总耗时: {elapsed:.3f} 秒")
+
+def _run_script_cli() -> None:
+    """python3 common_utils.py [性能分析选项] 脚本.py [脚本参数...]"""
+    import runpy
+    argv = sys.argv
+    # 脚本名之前的参数都是性能分析选项；--profile-top 和带 .pstats 路径的 --profile 各带一个值
+    options_end = 1
+    while options_end < len(argv) and argv[options_end].startswith('--'):
+        option = argv[options_end]
+        options_end += 1
+        if options_end < len(argv) and (
+                option == '--profile-top'
+                or (option == '--profile' and argv[options_end].lower().endswith(PROFILE_SUFFIXES))):
+            options_end += 1
+    if options_end >= len(argv):
+        print("用法: python3 common_utils.py [--profile[=PATH]] [--profile-top N] "
+              "[--trace-malloc] [--timings] 脚本.py [脚本参数...]")
+        sys.exit(2)
+    options, unknown = _profiling_parser().parse_known_args(argv[1:options_end])
+    if unknown:
+        fatal_error(f"未知的性能分析选项: {' '.join(unknown)}")
+    script = argv[options_end]
+    sys.argv = [script] + argv[options_end + 1:]
+    sys.path.insert(0, str(Path(script).resolve().parent))
+    _run_profiled(lambda: runpy.run_path(script, run_name='__main__'),
+                  _check_profiling_options(options))
+
+if __name__ == "__main__":
+    # 以模块名导入自身，使被运行脚本中的 common_utils 与这里共享同一份计时状态
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import common_utils
+    common_utils._run_script_cli()
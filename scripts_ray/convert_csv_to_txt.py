@@ -14,34 +14,42 @@ from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
-    fatal_error, show_version_info, find_files_by_extension
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
+    fatal_error, show_version_info, iter_files, register_output,
+    timed_iter, timed_call, run_main, add_compress_argument, parse_compression,
+    compressed_path, strip_compression_suffix, text_extensions, open_text_input, open_text_output
 )
 
 SCRIPT_VERSION = "2.0.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def convert_csv_to_txt_single(input_file: Path, output_file: Optional[Path] = None) -> bool:
+def convert_csv_to_txt_single(input_file: Path, output_file: Optional[Path] = None,
+                              compress: Optional[str] = None) -> bool:
     try:
         if not validate_input_file(input_file):
             return False
         
-        if not check_file_extension(input_file, 'csv'):
+        # data.csv.gz 等压缩文件按解压后的扩展名判断
+        if not check_file_extension(strip_compression_suffix(input_file), 'csv'):
             show_warning(f"跳过不支持的文件: {input_file.name}")
             return False
         
         if output_file is None:
-            output_file = input_file.with_suffix('.txt')
+            output_file = strip_compression_suffix(input_file).with_suffix('.txt')
+        output_file = compressed_path(output_file, compress)
         
         show_processing(f"转换: {input_file.name} -> {output_file.name}")
         
-        with open(input_file, 'r', encoding='utf-8') as f_in, \
-             open(output_file, 'w', encoding='utf-8') as f_out:
-            reader = csv.reader(f_in)
-            for row in reader:
-                f_out.write('\t'.join(row) + '\n')
+        rows = 0
+        with open_text_input(input_file) as f_in, \
+             open_text_output(output_file, compress, newline=None) as f_out:
+            write = timed_call(f_out.write)
+            for row in timed_iter(csv.reader(f_in)):
+                write('\t'.join(row) + '\n')
+                rows += 1
         
+        register_output(output_file, rows)
         show_success(f"转换完成: {output_file.name}")
         return True
         
@@ -49,25 +57,19 @@ def convert_csv_to_txt_single(input_file: Path, output_file: Optional[Path] = No
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False) -> None:
+def batch_process(directory: Path, recursive: bool = False, jobs: int = 1,
+                  report: Optional[str] = None, compress: Optional[str] = None) -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'csv', recursive)
+    files = iter_files(directory, text_extensions('csv'), recursive)
+    tracker = run_batch(files, convert_csv_to_txt_single, jobs=jobs, compress=compress)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到CSV文件")
         return
     
-    show_info(f"找到 {len(files)} 个CSV文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_csv_to_txt_single(file):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -77,11 +79,14 @@ def show_help() -> None:
 用法: python3 {sys.argv[0]} [选项] [输入] [输出]
 
 参数:
-  输入            输入CSV文件或目录
+  输入            输入CSV文件或目录（也可以是 .csv.gz/.csv.zst/.csv.xz 压缩文件）
   输出            输出TXT文件（可选，仅对单文件有效）
 
 选项:
   -r, --recursive  递归处理子目录
+  -j, --jobs N     并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --compress FMT[:LEVEL]  压缩TXT输出: gzip、zstd 或 xz，可指定级别（如 zstd:9）
+  --report PATH    写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
   -h, --help       显示此帮助信息
   --version        显示版本信息
     """)
@@ -91,6 +96,8 @@ def main():
     parser.add_argument('input', nargs='?', help='输入CSV文件或目录')
     parser.add_argument('output', nargs='?', help='输出TXT文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    add_compress_argument(parser)
+    add_batch_arguments(parser)
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -103,22 +110,32 @@ def main():
         show_version()
         return
     
+    try:
+        compress = parse_compression(args.compress)
+    except ValueError as e:
+        fatal_error(str(e))
+    
     if not args.input:
-        batch_process(Path.cwd())
+        batch_process(Path.cwd(), jobs=args.jobs, report=args.report, compress=compress)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_csv_to_txt_single(input_path, output_path):
+            tracker = run_batch([input_path], convert_csv_to_txt_single, output_file=output_path,
+                                compress=compress)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive)
+            batch_process(input_path, args.recursive, jobs=args.jobs, report=args.report,
+                          compress=compress)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
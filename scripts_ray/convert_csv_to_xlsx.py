@@ -8,29 +8,47 @@ CSV转XLSX转换工具 - 将CSV文件转换为Excel XLSX格式
 
 import sys
 import csv
+import hashlib
 import argparse
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
-    fatal_error, check_python_packages, show_version_info,
-    find_files_by_extension
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
+    fatal_error, check_infer_dependencies, show_version_info,
+    iter_files, iter_text_lines, register_output, register_sheet_outputs,
+    add_incremental_argument, open_manifest,
+    create_temp_dir, cleanup_temp_dir, timed_iter, timed_call, run_main
 )
+from xlsx_writer import COMPRESS_LEVEL, OVERFLOW_MODES, RollingSheetWriter, XlsxWriter
 
 SCRIPT_VERSION = "2.0.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def check_dependencies() -> bool:
-    show_info("检查依赖项...")
-    if not check_python_packages(['openpyxl']):
-        return False
-    show_success("依赖检查完成")
-    return True
+PART_COMPRESS_LEVEL = 1
 
-def convert_csv_to_xlsx_single(input_file: Path, output_file: Optional[Path] = None) -> bool:
+def write_csv_sheets(input_file: Path, output_file: Path, infer: bool = True,
+                     overflow: str = 'sheets', compresslevel: int = COMPRESS_LEVEL) -> RollingSheetWriter:
+    """把一个CSV写为XLSX，返回已关闭的写入器（用于取得输出文件和行数）"""
+    # 逐行生成工作表XML并写入压缩包，内存占用与行数无关；编码与 TXT 转换一样自动检测
+    with RollingSheetWriter(output_file, 'Sheet', overflow, compresslevel=compresslevel) as sheet:
+        reader = timed_iter(csv.reader(iter_text_lines(input_file)))
+        if infer:
+            # 按块推断列类型，数字、百分比和日期写为带格式的数值单元格
+            from cell_types import iter_typed_chunks
+            write_rows = timed_call(sheet.write_rows)
+            for chunk, styles in iter_typed_chunks(reader, sheet.number_format):
+                write_rows(chunk, styles)
+        else:
+            write_row = timed_call(sheet.write_row)
+            for row in reader:
+                write_row(row)
+    return sheet
+
+def convert_csv_to_xlsx_single(input_file: Path, output_file: Optional[Path] = None,
+                               infer: bool = True, overflow: str = 'sheets') -> bool:
     try:
         if not validate_input_file(input_file):
             return False
@@ -44,17 +62,8 @@ def convert_csv_to_xlsx_single(input_file: Path, output_file: Optional[Path] = N
         
         show_processing(f"转换: {input_file.name} -> {output_file.name}")
         
-        from openpyxl import Workbook
-        
-        wb = Workbook()
-        ws = wb.active
-        
-        with open(input_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                ws.append(row)
-        
-        wb.save(output_file)
+        sheet = write_csv_sheets(input_file, output_file, infer, overflow)
+        register_sheet_outputs(sheet)
         
         show_success(f"转换完成: {output_file.name}")
         return True
@@ -63,25 +72,76 @@ def convert_csv_to_xlsx_single(input_file: Path, output_file: Optional[Path] = N
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False) -> None:
+def part_file(part_dir: Path, input_file: Path) -> Path:
+    """--combine 时某个CSV对应的临时工作簿"""
+    digest = hashlib.md5(str(input_file).encode('utf-8')).hexdigest()
+    return part_dir / f"{digest}.xlsx"
+
+def build_sheet_part(input_file: Path, part_dir: Path, infer: bool = True) -> bool:
+    """--combine 的工作进程：解析CSV、推断类型，把工作表写为临时工作簿"""
+    try:
+        if not validate_input_file(input_file):
+            return False
+        show_processing(f"解析: {input_file.name}")
+        # 临时工作簿只在本机中转一次，用最低压缩级别节省工作进程的时间
+        sheet = write_csv_sheets(input_file, part_file(part_dir, input_file), infer,
+                                 compresslevel=PART_COMPRESS_LEVEL)
+        register_output(*sheet.outputs()[0])
+        return True
+    except Exception as e:
+        show_error(f"解析失败: {input_file.name} - {e}")
+        return False
+
+def combine_csv_files(files: List[Path], output_file: Path, jobs: int = 1, infer: bool = True,
+                      report: Optional[str] = None) -> bool:
+    """把多个CSV写为一个工作簿，每个CSV一个工作表（以文件名命名）
+
+    CSV解析和类型推断在工作进程中并行执行，各自写出临时工作簿；主进程按输入顺序
+    把完成的工作表逐个追加到输出文件并删除临时文件，内存占用与文件数和行数无关。
+    """
+    show_info(f"合并 {len(files)} 个CSV文件为工作簿: {output_file}")
+    part_dir = create_temp_dir()
+    try:
+        with XlsxWriter(output_file) as book:
+            def append_part(input_file: Path, ok: bool) -> None:
+                part = part_file(part_dir, input_file)
+                if ok:
+                    names = book.append_workbook(part, input_file.stem)
+                    show_info(f"{input_file.name} -> 工作表 {', '.join(names)}")
+                if part.exists():
+                    part.unlink()
+            
+            tracker = run_batch(files, build_sheet_part, jobs=jobs, on_result=append_part,
+                                part_dir=part_dir, infer=infer)
+    finally:
+        cleanup_temp_dir(part_dir)
+    
+    tracker.show_summary("工作表合并")
+    if report:
+        tracker.write_report(report, "工作表合并")
+    if tracker.failed_count:
+        show_warning(f"{tracker.failed_count} 个文件解析失败，未写入工作簿")
+        return False
+    show_success(f"合并完成: {output_file.name}（{len(book.sheet_names)} 个工作表）")
+    return True
+
+def batch_process(directory: Path, recursive: bool = False, jobs: int = 1,
+                  incremental: bool = False,
+                  report: Optional[str] = None, infer: bool = True,
+                  overflow: str = 'sheets') -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'csv', recursive)
+    files = iter_files(directory, 'csv', recursive)
+    with open_manifest(incremental, 'convert_csv_to_xlsx', SCRIPT_VERSION) as manifest:
+        tracker = run_batch(files, convert_csv_to_xlsx_single, jobs=jobs, manifest=manifest,
+                            infer=infer, overflow=overflow)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到CSV文件")
         return
     
-    show_info(f"找到 {len(files)} 个CSV文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_csv_to_xlsx_single(file):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -92,15 +152,22 @@ def show_help() -> None:
 
 参数:
   输入            输入CSV文件或目录
-  输出            输出XLSX文件（可选，仅对单文件有效）
+  输出            输出XLSX文件（可选，对单文件和 --combine 有效）
 
 选项:
   -r, --recursive  递归处理子目录
+  -j, --jobs N     并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --report PATH    写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
+  --incremental    增量模式，跳过输入和输出都未变化的文件
+  --no-infer       不推断列类型，所有值按文本写出
+  --overflow MODE  超过 1048576 行时续写到新工作表 (sheets，默认) 或分卷文件 (files)
+  --combine        把目录中的CSV合并为一个工作簿，每个CSV一个工作表（以文件名命名），
+                   默认输出为 <目录>/<目录名>.xlsx；配合 -j 并行解析
   -h, --help       显示此帮助信息
   --version        显示版本信息
 
 依赖:
-  - openpyxl
+  - numpy >= 2.3（类型推断，--no-infer 时不需要）
     """)
 
 def main():
@@ -108,6 +175,12 @@ def main():
     parser.add_argument('input', nargs='?', help='输入CSV文件或目录')
     parser.add_argument('output', nargs='?', help='输出XLSX文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    add_batch_arguments(parser)
+    add_incremental_argument(parser)
+    parser.add_argument('--no-infer', action='store_true', help='不推断列类型，所有值按文本写出')
+    parser.add_argument('--overflow', choices=OVERFLOW_MODES, default='sheets',
+                        help='超过行数上限时续写到新工作表或分卷文件')
+    parser.add_argument('--combine', action='store_true', help='把目录中的CSV合并为一个多工作表工作簿')
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -120,25 +193,49 @@ def main():
         show_version()
         return
     
-    if not check_dependencies():
+    infer = not args.no_infer
+    overflow = args.overflow
+    if not check_infer_dependencies(infer):
         sys.exit(1)
     
-    if not args.input:
-        batch_process(Path.cwd())
+    if args.combine:
+        directory = Path(args.input) if args.input else Path.cwd()
+        if not directory.is_dir():
+            fatal_error(f"--combine 需要输入目录: {directory}")
+        if args.incremental:
+            show_warning("--combine 不支持增量模式，将重新生成整个工作簿")
+        files = list(iter_files(directory, 'csv', args.recursive))
+        if not files:
+            show_warning("未找到CSV文件")
+            return
+        output_path = Path(args.output) if args.output else directory / f"{directory.resolve().name}.xlsx"
+        if not combine_csv_files(files, output_path, jobs=args.jobs, infer=infer, report=args.report):
+            sys.exit(1)
+    elif not args.input:
+        batch_process(Path.cwd(), jobs=args.jobs, incremental=args.incremental,
+                      report=args.report, infer=infer, overflow=overflow)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_csv_to_xlsx_single(input_path, output_path):
+            with open_manifest(args.incremental, 'convert_csv_to_xlsx', SCRIPT_VERSION) as manifest:
+                tracker = run_batch([input_path], convert_csv_to_xlsx_single,
+                                    manifest=manifest, output_file=output_path, infer=infer,
+                                    overflow=overflow)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive)
+            batch_process(input_path, args.recursive, jobs=args.jobs,
+                          incremental=args.incremental, report=args.report, infer=infer,
+                          overflow=overflow)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+常驻转换进程 - 预先导入转换脚本及其重量级依赖，通过Unix套接字接收转换任务
+版本: 1.0.0
+作者: tianli
+
+用法:
+    convert_daemon.py serve [--idle-timeout 秒] [--max-memory MB] [--max-jobs N]
+    convert_daemon.py run [--autostart] <脚本名或路径> [脚本参数...]
+    convert_daemon.py status | stop
+
+每个任务在预热后的常驻进程中 fork 出子进程执行，互不影响；常驻进程未运行时，
+run 会直接以普通方式启动脚本（可选同时在后台启动常驻进程）。
+客户端只依赖标准库中的轻量模块，以保证启动足够快。
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import struct
+from pathlib import Path
+
+SCRIPT_VERSION = "1.0.0"
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+# 可以交给常驻进程执行的脚本
+CONVERTER_MODULES = [
+    'convert_csv_to_txt', 'convert_csv_to_xlsx', 'convert_txt_to_csv',
+    'convert_txt_to_xlsx', 'convert_xlsx_to_csv', 'convert_xlsx_to_txt',
+    'convert_pptx_to_md', 'splitsheets', 'extract_tables_office',
+]
+PRELOAD_PACKAGES = ['openpyxl', 'pandas', 'docx', 'pptx', 'xlsx_reader', 'xlsx_writer', 'cell_types', 'xlsx_split', 'xlsx_engines']
+
+DEFAULT_IDLE_TIMEOUT = 900
+DEFAULT_MAX_MEMORY_MB = 1024
+DEFAULT_MAX_JOBS = 1000
+
+# 帧格式: 1字节类型 + 4字节长度 + 数据；o=标准输出 e=标准错误 x=退出码
+FRAME_HEADER = struct.Struct('!cI')
+
+def default_socket_path() -> str:
+    override = os.environ.get('SCRIPTS_RAY_DAEMON_SOCKET')
+    if override:
+        return override
+    return os.path.join(os.environ.get('TMPDIR', '/tmp'), f'scripts_ray_daemon_{os.getuid()}.sock')
+
+# ===== 客户端 =====
+
+def _recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("常驻进程提前关闭了连接")
+        data += chunk
+    return data
+
+def _connect(socket_path: str) -> socket.socket:
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        raise
+    return conn
+
+def _request(conn: socket.socket, payload: dict) -> int:
+    """发送请求并把返回的输出帧写到本进程的标准输出/错误，返回退出码"""
+    conn.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+    streams = {b'o': sys.stdout.buffer, b'e': sys.stderr.buffer}
+    while True:
+        kind, length = FRAME_HEADER.unpack(_recv_exact(conn, FRAME_HEADER.size))
+        data = _recv_exact(conn, length)
+        if kind == b'x':
+            return int(data.decode())
+        streams[kind].write(data)
+        streams[kind].flush()
+
+def _start_daemon_background(socket_path: str) -> None:
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), 'serve', '--socket', socket_path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+def run_client(script: str, argv: list, socket_path: str, autostart: bool = False) -> int:
+    name = Path(script).stem
+    if name in CONVERTER_MODULES:
+        try:
+            conn = _connect(socket_path)
+        except OSError:
+            if autostart:
+                _start_daemon_background(socket_path)
+        else:
+            with conn:
+                try:
+                    return _request(conn, {'script': name, 'argv': argv, 'cwd': os.getcwd()})
+                except ConnectionError as e:
+                    print(f"❌ {e}", file=sys.stderr)
+                    return 1
+
+    # 常驻进程不可用时按原方式启动脚本
+    script_path = SCRIPTS_DIR / f"{name}.py"
+    os.execv(sys.executable, [sys.executable, str(script_path)] + argv)
+
+# ===== 常驻进程 =====
+
+class _FrameWriter(io.RawIOBase):
+    """把写入的数据按帧发送到客户端的二进制流"""
+
+    def __init__(self, conn: socket.socket, kind: bytes):
+        super().__init__()
+        self.conn = conn
+        self.kind = kind
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if data:
+            self.conn.sendall(FRAME_HEADER.pack(self.kind, len(data)) + bytes(data))
+        return len(data)
+
+def _current_rss_mb() -> float:
+    """当前常驻内存 (MB)；无法获取时退化为峰值内存"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _run_job(conn: socket.socket, modules: dict, stats: dict) -> int:
+    """在 fork 出的子进程中执行一个任务，返回退出码"""
+    from common_utils import show_error, show_warning, run_main
+
+    line = b''
+    while not line.endswith(b'\n'):
+        chunk = conn.recv(65536)
+        if not chunk:
+            return 1
+        line += chunk
+    request = json.loads(line)
+
+    sys.stdout = io.TextIOWrapper(_FrameWriter(conn, b'o'), encoding='utf-8', write_through=True)
+    sys.stderr = io.TextIOWrapper(_FrameWriter(conn, b'e'), encoding='utf-8', write_through=True)
+
+    if request.get('cmd') == 'ping':
+        print(json.dumps(stats, ensure_ascii=False))
+        return 0
+    if request.get('cmd') == 'stop':
+        import signal
+        os.kill(os.getppid(), signal.SIGTERM)
+        print("常驻进程已停止")
+        return 0
+
+    module = modules.get(request.get('script'))
+    if module is None:
+        show_error(f"常驻进程不支持该脚本: {request.get('script')}")
+        return 2
+
+    os.chdir(request['cwd'])
+    sys.argv = [module.__file__] + list(request.get('argv', []))
+    try:
+        run_main(module.main)
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        show_warning("用户中断操作")
+        return 1
+    except Exception as e:
+        show_error(f"程序执行失败: {e}")
+        return 1
+
+def _handle_connection(conn: socket.socket, modules: dict, stats: dict) -> None:
+    code = 1
+    try:
+        code = _run_job(conn, modules, stats)
+    except Exception:
+        import traceback
+        traceback.print_exc(file=sys.__stderr__)
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            conn.sendall(FRAME_HEADER.pack(b'x', len(str(code))) + str(code).encode())
+        except Exception:
+            pass
+        os._exit(0)
+
+def serve(socket_path: str, idle_timeout: float, max_memory_mb: float, max_jobs: int) -> None:
+    import time
+    import signal
+    import importlib
+    from common_utils import show_info, show_success, show_warning, is_package_available
+
+    try:
+        _connect(socket_path).close()
+        show_warning(f"常驻进程已在运行: {socket_path}")
+        return
+    except OSError:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socket_path)
+    except OSError as e:
+        show_warning(f"无法监听 {socket_path}: {e}")
+        return
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    server.settimeout(1.0)
+
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    for package in PRELOAD_PACKAGES:
+        if is_package_available(package):
+            importlib.import_module(package)
+    modules = {name: importlib.import_module(name) for name in CONVERTER_MODULES}
+    show_success(f"常驻进程已就绪 (pid {os.getpid()}): {socket_path}")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append('SIGTERM'))
+    stats = {'pid': os.getpid(), 'jobs': 0, 'started': time.time(), 'socket': socket_path}
+    children = set()
+    last_active = time.monotonic()
+
+    try:
+        while not stopping:
+            for pid in list(children):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    children.discard(pid)
+            if children:
+                last_active = time.monotonic()
+            elif time.monotonic() - last_active > idle_timeout:
+                show_info("空闲超时，常驻进程退出")
+                break
+
+            if stats['jobs'] >= max_jobs or _current_rss_mb() > max_memory_mb:
+                show_info("达到任务数或内存上限，常驻进程退出以便重新启动")
+                break
+
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+            except InterruptedError:
+                continue
+
+            stats['jobs'] += 1
+            sys.stdout.flush()
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                _handle_connection(conn, modules, stats)
+            conn.close()
+            children.add(pid)
+            last_active = time.monotonic()
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='常驻转换进程')
+    parser.add_argument('--socket', default=default_socket_path(), help='Unix套接字路径')
+    parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='启动常驻进程')
+    serve_parser.add_argument('--socket', default=argparse.SUPPRESS, help='Unix套接字路径')
+    serve_parser.add_argument('--idle-timeout', type=float, default=DEFAULT_IDLE_TIMEOUT,
+                              help=f'空闲多少秒后退出 (默认: {DEFAULT_IDLE_TIMEOUT})')
+    serve_parser.add_argument('--max-memory', type=float, default=DEFAULT_MAX_MEMORY_MB,
+                              help=f'常驻内存超过多少MB后退出重启 (默认: {DEFAULT_MAX_MEMORY_MB})')
+    serve_parser.add_argument('--max-jobs', type=int, default=DEFAULT_MAX_JOBS,
+                              help=f'处理多少个任务后退出重启 (默认: {DEFAULT_MAX_JOBS})')
+
+    run_parser = commands.add_parser('run', help='通过常驻进程运行转换脚本')
+    run_parser.add_argument('--autostart', action='store_true', help='常驻进程未运行时在后台启动')
+    run_parser.add_argument('script', help='脚本名或路径，例如 convert_xlsx_to_csv')
+    run_parser.add_argument('args', nargs=argparse.REMAINDER, help='传给脚本的参数')
+
+    commands.add_parser('status', help='显示常驻进程状态')
+    commands.add_parser('stop', help='停止常驻进程')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.socket, args.idle_timeout, args.max_memory, args.max_jobs)
+    elif args.command == 'run':
+        sys.exit(run_client(args.script, args.args, args.socket, args.autostart))
+    else:
+        try:
+            conn = _connect(args.socket)
+        except OSError:
+            print("ℹ️ 常驻进程未运行")
+            sys.exit(1 if args.command == 'status' else 0)
+        with conn:
+            sys.exit(_request(conn, {'cmd': 'ping' if args.command == 'status' else 'stop'}))
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
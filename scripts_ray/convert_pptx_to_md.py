@@ -8,14 +8,16 @@ PPTX转Markdown转换工具 - 将PPTX演示文稿转换为Markdown格式
 import sys
 import argparse
 from pathlib import Path
-from pptx import Presentation
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
     validate_input_file, ensure_directory, ProgressTracker, fatal_error,
-    check_python_packages, find_files_by_extension, get_file_basename
+    check_python_packages, find_files_by_extension, get_file_basename,
+    lazy_import, run_main
 )
 
+pptx = lazy_import('pptx')
+
 SCRIPT_VERSION = "2.0.0"
 
 def check_dependencies():
@@ -39,7 +41,7 @@ def convert_pptx_to_md_single(file_path: Path, output_dir: Path) -> bool:
     show_processing(f"转换 {file_path.name} 为 Markdown...")
 
     try:
-        prs = Presentation(file_path)
+        prs = pptx.Presentation(file_path)
         with open(output_file, 'w', encoding='utf-8') as md_file:
             for i, slide in enumerate(prs.slides, 1):
                 md_file.write(f"## Slide {i}\n\n")
@@ -114,5 +116,5 @@ def main():
     show_success(f"总共成功转换了 {total_success} 个文件")
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
 
@@ -1,57 +1,206 @@
 #!/usr/bin/env python3
 """
-TXT转CSV转换工具 - 将文本文件转换为CSV格式
-版本: 2.0.0
+TXT转CSV转换工具 - 将文本文件转换为CSV格式（也可输出 Parquet/Feather）
+版本: 2.1.0
 作者: tianli
 更新: 2024-01-01
 """
 
 import sys
 import csv
-import re
+import codecs
+import shutil
 import argparse
+import tempfile
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional, Tuple
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
-    fatal_error, show_version_info, find_files_by_extension
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
+    fatal_error, show_version_info, iter_files, iter_text_chunks, register_output,
+    check_python_packages, timed_iter, timed_call, run_main, add_compress_argument,
+    parse_compression, compressed_path, strip_compression_suffix, text_extensions, open_text_output,
+    compression_of, detect_file_encoding, resolve_jobs, cleanup_temp_dir
 )
+from columnar_writer import COLUMNAR_FORMATS, output_suffix, write_columnar
 
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.1.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def convert_txt_to_csv_single(input_file: Path, output_file: Optional[Path] = None) -> bool:
+# --chunk-jobs 时每段至少这么大，小文件分段的进程开销大于收益
+MIN_CHUNK_SIZE = 8 * 1024 * 1024
+BOUNDARY_SCAN_SIZE = 64 * 1024
+# 每次拆分和写出的文本块大小；块越大，同时存在的行列表越占内存，64KB 时也最快
+ROW_BATCH_SIZE = 64 * 1024
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def check_dependencies(output_format: str = 'csv') -> bool:
+    if output_format in COLUMNAR_FORMATS:
+        show_info("检查依赖项...")
+        if not check_python_packages(['pyarrow']):
+            return False
+        show_success("依赖检查完成")
+    return True
+
+def iter_row_batches(chunks: Iterable[str]) -> Iterator[List[List[str]]]:
+    """把文本块按空白拆分为字段，每块产出一批行（跳过空行）
+
+    字段内的逗号原样保留，由 csv.writer 加引号。块应在行边界结束；超长行跨块时，
+    不完整的末行留到下一块拼接。\\r 按换行处理，\\r\\n 多出的空行会被跳过。
+    """
+    pending = ''
+    for chunk in chunks:
+        if pending:
+            chunk = pending + chunk
+        cut = chunk.rfind('\n') + 1
+        pending = chunk[cut:]
+        batch = [fields for fields in map(str.split, chunk[:cut].replace('\r', '\n').split('\n'))
+                 if fields]
+        if batch:
+            yield batch
+    fields = pending.split()
+    if fields:
+        yield [fields]
+
+def iter_txt_rows(input_file: Path):
+    """逐块读取文本文件，按空白拆分为字段，跳过空行"""
+    chunks = iter_text_chunks(input_file, chunk_size=ROW_BATCH_SIZE)
+    for batch in timed_iter(iter_row_batches(chunks)):
+        yield from batch
+
+def line_ranges(input_file: Path, parts: int) -> List[Tuple[int, int]]:
+    """把文件按字节大致均分为 parts 段，每个分界点后移到下一个换行符之后"""
+    size = input_file.stat().st_size
+    bounds = [0]
+    with open(input_file, 'rb') as f:
+        for i in range(1, parts):
+            pos = max(size * i // parts, bounds[-1])
+            f.seek(pos)
+            while True:
+                block = f.read(BOUNDARY_SCAN_SIZE)
+                if not block:
+                    pos = size
+                    break
+                newline = block.find(b'\n')
+                if newline >= 0:
+                    pos += newline + 1
+                    break
+                pos += len(block)
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+def iter_range_text(input_file: Path, start: int, end: int, encoding: str) -> Iterator[str]:
+    """按块解码文件的 [start, end) 字节段"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(input_file, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(ROW_BATCH_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield decoder.decode(block)
+    yield decoder.decode(b'', True)
+
+def convert_txt_range(input_file: Path, start: int, end: int, part_file: Path,
+                      encoding: str) -> int:
+    """--chunk-jobs 的工作进程：把一段字节转换为CSV片段，返回行数"""
+    rows = 0
+    with open(part_file, 'w', encoding='utf-8', newline='') as f:
+        writerows = csv.writer(f).writerows
+        for batch in iter_row_batches(iter_range_text(input_file, start, end, encoding)):
+            writerows(batch)
+            rows += len(batch)
+    return rows
+
+def write_csv_chunked(input_file: Path, output_file: Path, ranges: List[Tuple[int, int]],
+                      encoding: str, compress: Optional[str] = None) -> int:
+    """各段在工作进程中写出CSV片段，再按原顺序拼接为输出文件，返回行数
+
+    片段放在输出目录下的临时目录中（大文件时 /tmp 可能放不下），拼接后删除。
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    part_dir = Path(tempfile.mkdtemp(prefix='.txt_to_csv_', dir=output_file.parent))
+    try:
+        parts = [part_dir / f"{i}.csv" for i in range(len(ranges))]
+        sys.stdout.flush()
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            futures = [executor.submit(convert_txt_range, input_file, start, end, part, encoding)
+                       for (start, end), part in zip(ranges, parts)]
+            rows = sum(future.result() for future in futures)
+        # 片段已是UTF-8编码的CSV，按字节拼接（需要压缩时写入压缩流）
+        with open_text_output(output_file, compress) as out:
+            for part in parts:
+                with open(part, 'rb') as src:
+                    shutil.copyfileobj(src, out.buffer, COPY_BUFFER_SIZE)
+        return rows
+    finally:
+        cleanup_temp_dir(part_dir)
+
+def chunk_ranges(input_file: Path, chunk_jobs: int, encoding: str) -> List[Tuple[int, int]]:
+    """--chunk-jobs 的分段；文件太小、压缩输入或 UTF-16/32 编码时只有一段"""
+    jobs = resolve_jobs(chunk_jobs)
+    if jobs < 2 or compression_of(input_file):
+        return []
+    # UTF-16/32 的换行符不是单字节，无法按字节对齐
+    if codecs.lookup(encoding).name.startswith(('utf-16', 'utf-32')):
+        return []
+    parts = min(jobs, input_file.stat().st_size // MIN_CHUNK_SIZE)
+    if parts < 2:
+        return []
+    ranges = line_ranges(input_file, parts)
+    return ranges if len(ranges) > 1 else []
+
+def convert_txt_to_csv_single(input_file: Path, output_file: Optional[Path] = None,
+                              output_format: str = 'csv', header: bool = True,
+                              compress: Optional[str] = None, chunk_jobs: int = 1) -> bool:
     try:
         if not validate_input_file(input_file):
             return False
         
-        if not check_file_extension(input_file, 'txt'):
+        # data.txt.zst 等压缩文件按解压后的扩展名判断，读取时边读边解压
+        if not check_file_extension(strip_compression_suffix(input_file), 'txt'):
             show_warning(f"跳过不支持的文件: {input_file.name}")
             return False
         
         if output_file is None:
-            output_file = input_file.with_suffix('.csv')
+            output_file = strip_compression_suffix(input_file).with_suffix(output_suffix(output_format))
+        output_file = compressed_path(output_file, compress)
         
         show_processing(f"转换: {input_file.name} -> {output_file.name}")
         
-        with open(input_file, 'r', encoding='utf-8') as f:
-            content = f.readlines()
-        
-        processed_lines = []
-        for line in content:
-            line = line.strip()
-            if not line:
-                continue
-            line = re.sub(r'\s+', ',', line)
-            processed_lines.append(line.split(','))
-        
-        with open(output_file, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerows(processed_lines)
+        if output_format in COLUMNAR_FORMATS:
+            # 文本中的整数和小数按数字列写出；类型冲突时重新读取文件
+            rows = write_columnar(lambda: iter_txt_rows(input_file), output_file, output_format,
+                                  header=header, parse_text=True)
+        else:
+            encoding = detect_file_encoding(input_file)
+            ranges = chunk_ranges(input_file, chunk_jobs, encoding)
+            rows = None
+            if ranges:
+                show_info(f"分 {len(ranges)} 段并行转换: {input_file.name}")
+                try:
+                    rows = write_csv_chunked(input_file, output_file, ranges, encoding, compress)
+                except UnicodeDecodeError as e:
+                    # 单进程读取时可以从出错处改用后备编码
+                    show_warning(f"分段解码失败，改为单进程转换: {input_file.name} - {e}")
+            if rows is None:
+                rows = 0
+                with open_text_output(output_file, compress) as f:
+                    writerows = timed_call(csv.writer(f).writerows)
+                    chunks = iter_text_chunks(input_file, encoding, ROW_BATCH_SIZE)
+                    for batch in timed_iter(iter_row_batches(chunks)):
+                        writerows(batch)
+                        rows += len(batch)
         
+        register_output(output_file, rows)
         show_success(f"转换完成: {output_file.name}")
         return True
         
@@ -59,25 +208,23 @@ def convert_txt_to_csv_single(input_file: Path, output_file: Optional[Path] = No
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False) -> None:
+def batch_process(directory: Path, recursive: bool = False, jobs: int = 1,
+                  report: Optional[str] = None, output_format: str = 'csv',
+                  header: bool = True, compress: Optional[str] = None,
+                  chunk_jobs: int = 1) -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'txt', recursive)
+    files = iter_files(directory, text_extensions('txt'), recursive)
+    tracker = run_batch(files, convert_txt_to_csv_single, jobs=jobs,
+                        output_format=output_format, header=header, compress=compress,
+                        chunk_jobs=chunk_jobs)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到TXT文件")
         return
     
-    show_info(f"找到 {len(files)} 个TXT文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_txt_to_csv_single(file):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -87,20 +234,38 @@ def show_help() -> None:
 用法: python3 {sys.argv[0]} [选项] [输入] [输出]
 
 参数:
-  输入            输入TXT文件或目录
-  输出            输出CSV文件（可选，仅对单文件有效）
+  输入            输入TXT文件或目录（也可以是 .txt.gz/.txt.zst/.txt.xz 压缩文件）
+  输出            输出文件（可选，仅对单文件有效）
 
 选项:
   -r, --recursive  递归处理子目录
+  -j, --jobs N     并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --chunk-jobs N   把单个大文件按行边界分段并行转换的进程数，0 表示使用全部CPU核心
+                   （默认: 1）；每段至少 8MB，仅用于CSV输出和未压缩的输入
+  --format FMT     输出格式: csv、parquet 或 feather（默认: csv）
+  --no-header      列式输出时第一行不作为列名
+  --compress FMT[:LEVEL]  压缩CSV输出: gzip、zstd 或 xz，可指定级别（如 zstd:9）
+  --report PATH    写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
   -h, --help       显示此帮助信息
   --version        显示版本信息
+
+依赖:
+  - pyarrow（仅 --format parquet/feather）
+  - zstandard（仅 --compress zstd 或读取 .zst 文件）
     """)
 
 def main():
     parser = argparse.ArgumentParser(description='TXT转CSV转换工具', add_help=False)
     parser.add_argument('input', nargs='?', help='输入TXT文件或目录')
-    parser.add_argument('output', nargs='?', help='输出CSV文件')
+    parser.add_argument('output', nargs='?', help='输出文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    parser.add_argument('--format', choices=('csv',) + COLUMNAR_FORMATS, default='csv',
+                        help='输出格式 (默认: csv)')
+    parser.add_argument('--no-header', action='store_true', help='列式输出时第一行不作为列名')
+    add_compress_argument(parser)
+    add_batch_arguments(parser)
+    parser.add_argument('--chunk-jobs', type=int, default=1,
+                        help='单个文件分段并行转换的进程数 (0 表示使用全部CPU核心)')
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -113,22 +278,43 @@ def main():
         show_version()
         return
     
+    if not check_dependencies(args.format):
+        sys.exit(1)
+    
+    header = not args.no_header
+    try:
+        compress = parse_compression(args.compress)
+    except ValueError as e:
+        fatal_error(str(e))
+    if compress and args.format != 'csv':
+        fatal_error("--compress 只用于CSV输出，Parquet/Feather 已按列压缩")
+    if args.chunk_jobs != 1 and args.format != 'csv':
+        fatal_error("--chunk-jobs 只用于CSV输出")
     if not args.input:
-        batch_process(Path.cwd())
+        batch_process(Path.cwd(), jobs=args.jobs, report=args.report,
+                      output_format=args.format, header=header, compress=compress,
+                      chunk_jobs=args.chunk_jobs)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_txt_to_csv_single(input_path, output_path):
+            tracker = run_batch([input_path], convert_txt_to_csv_single, output_file=output_path,
+                                output_format=args.format, header=header, compress=compress,
+                                chunk_jobs=args.chunk_jobs)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive)
+            batch_process(input_path, args.recursive, jobs=args.jobs, report=args.report,
+                          output_format=args.format, header=header, compress=compress,
+                          chunk_jobs=args.chunk_jobs)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
@@ -7,29 +7,26 @@ TXT转XLSX转换工具 - 将制表符分隔的文本文件转换为Excel XLSX格
 """
 
 import sys
+import csv
 import argparse
 from pathlib import Path
 from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
-    fatal_error, check_python_packages, show_version_info,
-    find_files_by_extension
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
+    fatal_error, check_infer_dependencies, show_version_info,
+    iter_files, iter_text_lines, register_sheet_outputs,
+    timed_iter, timed_call, run_main
 )
+from xlsx_writer import OVERFLOW_MODES, RollingSheetWriter
 
 SCRIPT_VERSION = "2.0.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def check_dependencies() -> bool:
-    show_info("检查依赖项...")
-    if not check_python_packages(['pandas', 'openpyxl']):
-        return False
-    show_success("依赖检查完成")
-    return True
-
-def convert_txt_to_xlsx_single(input_file: Path, output_file: Optional[Path] = None) -> bool:
+def convert_txt_to_xlsx_single(input_file: Path, output_file: Optional[Path] = None,
+                               infer: bool = True, overflow: str = 'sheets') -> bool:
     try:
         if not validate_input_file(input_file):
             return False
@@ -43,10 +40,20 @@ def convert_txt_to_xlsx_single(input_file: Path, output_file: Optional[Path] = N
         
         show_processing(f"转换: {input_file.name} -> {output_file.name}")
         
-        import pandas as pd
-        
-        df = pd.read_csv(input_file, sep='\\t', encoding='utf-8', engine='python')
-        df.to_excel(output_file, index=False)
+        # 制表符分隔，支持带引号的字段；空行跳过，第一行为列名
+        lines = iter_text_lines(input_file)
+        reader = timed_iter(row for row in csv.reader(lines, delimiter='\t') if row)
+        with RollingSheetWriter(output_file, 'Sheet1', overflow) as sheet:
+            if infer:
+                from cell_types import iter_typed_chunks
+                write_rows = timed_call(sheet.write_rows)
+                for chunk, styles in iter_typed_chunks(reader, sheet.number_format):
+                    write_rows(chunk, styles)
+            else:
+                write_row = timed_call(sheet.write_row)
+                for row in reader:
+                    write_row(row)
+        register_sheet_outputs(sheet)
         
         show_success(f"转换完成: {output_file.name}")
         return True
@@ -55,25 +62,20 @@ def convert_txt_to_xlsx_single(input_file: Path, output_file: Optional[Path] = N
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False) -> None:
+def batch_process(directory: Path, recursive: bool = False, jobs: int = 1,
+                  report: Optional[str] = None, infer: bool = True,
+                  overflow: str = 'sheets') -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'txt', recursive)
+    files = iter_files(directory, 'txt', recursive)
+    tracker = run_batch(files, convert_txt_to_xlsx_single, jobs=jobs, infer=infer, overflow=overflow)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到TXT文件")
         return
     
-    show_info(f"找到 {len(files)} 个TXT文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_txt_to_xlsx_single(file):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -88,12 +90,15 @@ def show_help() -> None:
 
 选项:
   -r, --recursive  递归处理子目录
+  -j, --jobs N     并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --report PATH    写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
+  --no-infer       不推断列类型，所有值按文本写出
+  --overflow MODE  超过 1048576 行时续写到新工作表 (sheets，默认) 或分卷文件 (files)
   -h, --help       显示此帮助信息
   --version        显示版本信息
 
 依赖:
-  - pandas
-  - openpyxl
+  - numpy >= 2.3（类型推断，--no-infer 时不需要）
     """)
 
 def main():
@@ -101,6 +106,10 @@ def main():
     parser.add_argument('input', nargs='?', help='输入TXT文件或目录')
     parser.add_argument('output', nargs='?', help='输出XLSX文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    add_batch_arguments(parser)
+    parser.add_argument('--no-infer', action='store_true', help='不推断列类型，所有值按文本写出')
+    parser.add_argument('--overflow', choices=OVERFLOW_MODES, default='sheets',
+                        help='超过行数上限时续写到新工作表或分卷文件')
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -113,25 +122,32 @@ def main():
         show_version()
         return
     
-    if not check_dependencies():
+    infer = not args.no_infer
+    overflow = args.overflow
+    if not check_infer_dependencies(infer):
         sys.exit(1)
     
     if not args.input:
-        batch_process(Path.cwd())
+        batch_process(Path.cwd(), jobs=args.jobs, report=args.report, infer=infer, overflow=overflow)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_txt_to_xlsx_single(input_path, output_path):
+            tracker = run_batch([input_path], convert_txt_to_xlsx_single, output_file=output_path,
+                                infer=infer, overflow=overflow)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive)
+            batch_process(input_path, args.recursive, jobs=args.jobs, report=args.report,
+                          infer=infer, overflow=overflow)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
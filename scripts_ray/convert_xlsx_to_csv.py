@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-XLSX转CSV转换工具 - 将Excel XLSX文件转换为CSV格式
+XLSX转CSV转换工具 - 将Excel XLSX文件转换为CSV格式（也可输出 Parquet/Feather）
 版本: 2.0.0
 作者: tianli
 更新: 2024-01-01
@@ -14,27 +14,95 @@ from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
-    fatal_error, check_python_packages, show_version_info,
-    find_files_by_extension
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
+    fatal_error, show_version_info,
+    iter_files, register_output, resolve_jobs, add_incremental_argument, open_manifest,
+    check_python_packages, phase, timed_iter, timed_call, run_main,
+    add_compress_argument, parse_compression, compressed_path, open_text_output
 )
+from columnar_writer import COLUMNAR_FORMATS, output_suffix, write_columnar
 
 SCRIPT_VERSION = "2.0.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def check_dependencies() -> bool:
-    show_info("检查依赖项...")
-    if not check_python_packages(['openpyxl']):
-        return False
-    show_success("依赖检查完成")
+def check_dependencies(output_format: str = 'csv') -> bool:
+    # 工作表由 xlsx_reader 直接从压缩包中流式解析，只依赖标准库；列式输出需要 pyarrow
+    if output_format in COLUMNAR_FORMATS:
+        show_info("检查依赖项...")
+        if not check_python_packages(['pyarrow']):
+            return False
+        show_success("依赖检查完成")
     return True
 
+def write_sheet_csv(rows_iter, output_file: Path, compress: Optional[str] = None) -> int:
+    """把一个工作表的行逐行写入CSV文件（可压缩），返回写出的行数"""
+    rows = 0
+    with open_text_output(output_file, compress) as f:
+        writerow = timed_call(csv.writer(f).writerow)
+        for row in timed_iter(rows_iter):
+            writerow(['' if cell is None else str(cell) for cell in row])
+            rows += 1
+    return rows
+
+def sheet_rows(book, sheet_name: str, columns: Optional[str] = None,
+               rows: Optional[str] = None, extent: Optional[dict] = None):
+    """按 --columns/--rows 选择返回工作表的行，去掉末尾的空行和空列；列名按该工作表第一行解析"""
+    from xlsx_reader import parse_row_range, trim_rows, trim_width
+    selected = book.resolve_columns(columns, sheet_name) if columns else None
+    first, last = parse_row_range(rows) if rows else (1, None)
+    return trim_rows(book.iter_rows(sheet_name, selected, first, last, pad=False), extent,
+                     trim_width(book, sheet_name, selected))
+
+def write_sheet(book, sheet_name: str, output_file: Path, output_format: str = 'csv',
+                header: bool = True, columns: Optional[str] = None,
+                rows: Optional[str] = None, show_extent: bool = False,
+                compress: Optional[str] = None) -> int:
+    """按输出格式导出一个工作表；列式格式类型冲突时会重新读取该工作表"""
+    extent = {}
+    if output_format == 'csv':
+        written = write_sheet_csv(sheet_rows(book, sheet_name, columns, rows, extent), output_file,
+                                  compress)
+    else:
+        written = write_columnar(
+            lambda: timed_iter(sheet_rows(book, sheet_name, columns, rows, extent)),
+            output_file, output_format, header=header)
+    if show_extent:
+        from xlsx_reader import describe_extent
+        show_info(f"工作表 '{sheet_name}': {describe_extent(extent, book.dimension(sheet_name))}")
+    return written
+
+def sequential_result(write, *args):
+    """顺序导出时与并行模式一致：单个工作表出错只返回异常，不影响其余工作表"""
+    try:
+        return write(*args)
+    except Exception as e:
+        return e
+
+def export_sheet(input_file: Path, sheet_name: str, output_file: Path,
+                 strings_memory: Optional[float] = None, output_format: str = 'csv',
+                 header: bool = True, columns: Optional[str] = None,
+                 rows: Optional[str] = None, show_extent: bool = False,
+                 compress: Optional[str] = None) -> int:
+    """在工作进程中单独打开工作簿并导出一个工作表"""
+    from xlsx_reader import XlsxReader
+    with XlsxReader(input_file, strings_memory) as book:
+        return write_sheet(book, sheet_name, output_file, output_format, header, columns, rows,
+                           show_extent, compress)
+
 def convert_xlsx_to_csv_single(
     input_file: Path, 
     output_file: Optional[Path] = None, 
     sheet_name: Optional[str] = None, 
-    all_sheets: bool = True
+    all_sheets: bool = True,
+    sheet_jobs: int = 1,
+    strings_memory: Optional[float] = None,
+    output_format: str = 'csv',
+    header: bool = True,
+    columns: Optional[str] = None,
+    rows: Optional[str] = None,
+    show_extent: bool = False,
+    compress: Optional[str] = None
 ) -> bool:
     try:
         if not validate_input_file(input_file):
@@ -45,57 +113,89 @@ def convert_xlsx_to_csv_single(
             return False
         
         show_processing(f"转换: {input_file.name}")
-        from openpyxl import load_workbook
+        from xlsx_reader import XlsxReader
         
-        wb = load_workbook(input_file, read_only=True, data_only=True)
+        with phase('read'):
+            book = XlsxReader(input_file, strings_memory)
         
-        if sheet_name and sheet_name in wb.sheetnames:
-            sheets_to_process = [(sheet_name, wb[sheet_name])]
-        elif not all_sheets:
-            sheets_to_process = [(wb.active.title, wb.active)]
-        else:
-            sheets_to_process = [(name, wb[name]) for name in wb.sheetnames]
-        
-        success_count = 0
-        for name, ws in sheets_to_process:
-            if output_file and len(sheets_to_process) == 1:
-                current_output = output_file
+        # 出错时也要关闭工作簿（并行模式下已提前关闭，重复关闭无妨）
+        with book:
+            if sheet_name and sheet_name in book.sheet_names:
+                sheet_names = [sheet_name]
+            elif not all_sheets:
+                sheet_names = [book.active_sheet]
             else:
-                current_output = input_file.parent / f"{input_file.stem}_{name}.csv"
+                sheet_names = list(book.sheet_names)
             
-            with open(current_output, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                for row in ws.iter_rows(values_only=True):
-                    writer.writerow(['' if cell is None else str(cell) for cell in row])
+            outputs = []
+            for name in sheet_names:
+                if output_file and len(sheet_names) == 1:
+                    current_output = output_file
+                else:
+                    current_output = (input_file.parent /
+                                      f"{input_file.stem}_{name}{output_suffix(output_format)}")
+                outputs.append((name, compressed_path(current_output, compress)))
+            
+            sheet_jobs = min(resolve_jobs(sheet_jobs), len(outputs))
+            if sheet_jobs > 1:
+                # 每个工作进程各自打开工作簿，结果按工作表顺序汇总
+                book.close()
+                from concurrent.futures import ProcessPoolExecutor
+                sys.stdout.flush()
+                with ProcessPoolExecutor(max_workers=sheet_jobs) as executor:
+                    futures = [executor.submit(export_sheet, input_file, name, current_output,
+                                               strings_memory, output_format, header, columns, rows,
+                                               show_extent, compress)
+                               for name, current_output in outputs]
+                    results = []
+                    for future in futures:
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            results.append(e)
+            else:
+                results = (sequential_result(write_sheet, book, name, current_output, output_format,
+                                             header, columns, rows, show_extent, compress)
+                           for name, current_output in outputs)
+            
+            success_count = 0
+            for (name, current_output), written in zip(outputs, results):
+                if isinstance(written, Exception):
+                    show_error(f"转换工作表失败: '{name}' - {written}")
+                    continue
+                register_output(current_output, written)
+                show_success(f"已转换工作表 '{name}' -> {current_output.name}")
+                success_count += 1
             
-            show_success(f"已转换工作表 '{name}' -> {current_output.name}")
-            success_count += 1
-        
         return success_count > 0
         
     except Exception as e:
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False, all_sheets: bool = True) -> None:
+def batch_process(directory: Path, recursive: bool = False, all_sheets: bool = True,
+                  jobs: int = 1, incremental: bool = False,
+                  report: Optional[str] = None, sheet_jobs: int = 1,
+                  strings_memory: Optional[float] = None, output_format: str = 'csv',
+                  header: bool = True, columns: Optional[str] = None,
+                  rows: Optional[str] = None, show_extent: bool = False,
+                  compress: Optional[str] = None) -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'xlsx', recursive)
+    files = iter_files(directory, 'xlsx', recursive)
+    with open_manifest(incremental, 'convert_xlsx_to_csv', SCRIPT_VERSION) as manifest:
+        tracker = run_batch(files, convert_xlsx_to_csv_single, jobs=jobs,
+                            manifest=manifest, all_sheets=all_sheets, sheet_jobs=sheet_jobs,
+                            strings_memory=strings_memory, output_format=output_format,
+                            header=header, columns=columns, rows=rows, show_extent=show_extent,
+                            compress=compress)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到XLSX文件")
         return
     
-    show_info(f"找到 {len(files)} 个XLSX文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_xlsx_to_csv_single(file, all_sheets=all_sheets):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -106,26 +206,53 @@ def show_help() -> None:
 
 参数:
   输入            输入XLSX文件或目录
-  输出            输出CSV文件（可选，仅对单文件有效）
+  输出            输出文件（可选，仅对单文件有效）
 
 选项:
   -r, --recursive   递归处理子目录
+  -j, --jobs N      并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --sheet-jobs N    每个工作簿按工作表并行导出的进程数，0 表示使用全部CPU核心（默认: 1）
+  --strings-memory MB  共享字符串表的内存上限，超出时写入临时文件按需读取（默认: 256）
+  --report PATH     写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
+  --incremental     增量模式，跳过输入和输出都未变化的文件
   -s, --sheet NAME  指定要转换的工作表名称
   -d, --default     仅转换默认工作表
+  --format FMT      输出格式: csv、parquet 或 feather（默认: csv）
+  --no-header       列式输出时第一行不作为列名
+  --columns LIST    只导出指定的列，按列字母或第一行的列名，例如 A,C:F 或 站点,水位
+  --rows START:END  只导出指定范围的行（从 1 开始，含两端），读到 END 行即停止解析
+  --show-extent     显示每个工作表去掉末尾空行、空列后的实际数据范围
+  --compress FMT[:LEVEL]  压缩CSV输出: gzip、zstd 或 xz，可指定级别（如 zstd:9），
+                    压缩在后台线程中与解析同时进行
   -h, --help        显示此帮助信息
   --version         显示版本信息
 
 依赖:
-  - openpyxl
+  - 无（直接解析XLSX压缩包中的工作表XML）
+  - pyarrow（仅 --format parquet/feather）
+  - zstandard（仅 --compress zstd）
     """)
 
 def main():
     parser = argparse.ArgumentParser(description='XLSX转CSV转换工具', add_help=False)
     parser.add_argument('input', nargs='?', help='输入XLSX文件或目录')
-    parser.add_argument('output', nargs='?', help='输出CSV文件')
+    parser.add_argument('output', nargs='?', help='输出文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
     parser.add_argument('-s', '--sheet', help='指定要转换的工作表名称')
     parser.add_argument('-d', '--default', action='store_true', help='仅转换默认工作表')
+    parser.add_argument('--sheet-jobs', type=int, default=1,
+                        help='每个工作簿按工作表并行导出的进程数 (0 表示使用全部CPU核心)')
+    parser.add_argument('--strings-memory', type=float, metavar='MB',
+                        help='共享字符串表的内存上限 (MB)，超出时写入临时文件按需读取')
+    parser.add_argument('--format', choices=('csv',) + COLUMNAR_FORMATS, default='csv',
+                        help='输出格式 (默认: csv)')
+    parser.add_argument('--no-header', action='store_true', help='列式输出时第一行不作为列名')
+    parser.add_argument('--columns', metavar='LIST', help='只导出指定的列，例如 A,C:F 或 站点,水位')
+    parser.add_argument('--rows', metavar='START:END', help='只导出指定范围的行，例如 2:1000')
+    parser.add_argument('--show-extent', action='store_true', help='显示每个工作表的实际数据范围')
+    add_compress_argument(parser)
+    add_batch_arguments(parser)
+    add_incremental_argument(parser)
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -138,27 +265,60 @@ def main():
         show_version()
         return
     
-    if not check_dependencies():
+    if not check_dependencies(args.format):
         sys.exit(1)
     
+    header = not args.no_header
+    if args.rows:
+        from xlsx_reader import parse_row_range
+        try:
+            parse_row_range(args.rows)
+        except ValueError as e:
+            fatal_error(str(e))
+    try:
+        compress = parse_compression(args.compress)
+    except ValueError as e:
+        fatal_error(str(e))
+    if compress and args.format != 'csv':
+        fatal_error("--compress 只用于CSV输出，Parquet/Feather 已按列压缩")
     all_sheets = not (args.sheet or args.default)
     
     if not args.input:
-        batch_process(Path.cwd(), all_sheets=all_sheets)
+        batch_process(Path.cwd(), all_sheets=all_sheets, jobs=args.jobs,
+                      incremental=args.incremental, report=args.report,
+                      sheet_jobs=args.sheet_jobs, strings_memory=args.strings_memory,
+                      output_format=args.format, header=header,
+                      columns=args.columns, rows=args.rows,
+                      show_extent=args.show_extent, compress=compress)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_xlsx_to_csv_single(input_path, output_path, args.sheet, all_sheets):
+            with open_manifest(args.incremental, 'convert_xlsx_to_csv', SCRIPT_VERSION) as manifest:
+                tracker = run_batch([input_path], convert_xlsx_to_csv_single, manifest=manifest,
+                                    output_file=output_path, sheet_name=args.sheet,
+                                    all_sheets=all_sheets, sheet_jobs=args.sheet_jobs,
+                                    strings_memory=args.strings_memory,
+                                    output_format=args.format, header=header,
+                                    columns=args.columns, rows=args.rows,
+                                    show_extent=args.show_extent, compress=compress)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive, all_sheets=all_sheets)
+            batch_process(input_path, args.recursive, all_sheets=all_sheets, jobs=args.jobs,
+                          incremental=args.incremental, report=args.report,
+                          sheet_jobs=args.sheet_jobs, strings_memory=args.strings_memory,
+                          output_format=args.format, header=header,
+                          columns=args.columns, rows=args.rows,
+                          show_extent=args.show_extent, compress=compress)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
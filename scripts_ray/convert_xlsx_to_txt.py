@@ -1,35 +1,71 @@
 #!/usr/bin/env python3
 """
 XLSX转TXT转换工具 - 将Excel XLSX文件转换为制表符分隔的TXT格式
-版本: 2.0.0
+版本: 2.1.0
 作者: tianli
 更新: 2024-01-01
+
+每个工作簿只打开一次，各工作表都从同一个读取对象导出；读取引擎见 xlsx_engines.py。
 """
 
 import sys
+import csv
 import argparse
 from pathlib import Path
 from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
-    validate_input_file, check_file_extension, ProgressTracker,
+    validate_input_file, check_file_extension, run_batch, add_batch_arguments,
     fatal_error, check_python_packages, show_version_info,
-    find_files_by_extension
+    iter_files, register_output,
+    timed_iter, timed_call, run_main
 )
 
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "2.1.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-01"
 
-def check_dependencies() -> bool:
+ENGINE_CHOICES = ('auto', 'stream', 'openpyxl', 'calamine')
+
+def check_dependencies(engine: str = 'stream') -> bool:
+    # 默认的 stream 引擎由 xlsx_reader 直接从压缩包中流式解析，只依赖标准库
+    from xlsx_engines import ENGINE_PACKAGES
+    package = ENGINE_PACKAGES.get(engine)
+    if package is None:
+        return True
     show_info("检查依赖项...")
-    if not check_python_packages(['pandas', 'openpyxl']):
+    if not check_python_packages([package]):
         return False
     show_success("依赖检查完成")
     return True
 
-def convert_xlsx_to_txt_single(input_file: Path, output_file: Optional[Path] = None) -> bool:
+def resolve_engine(engine: str, refresh: bool = False) -> str:
+    """把 --engine auto 换成本机上最快的已安装引擎（首次使用时测量并缓存）"""
+    if engine != 'auto':
+        return engine
+    from xlsx_engines import choose_engine
+    engine, timings = choose_engine(refresh)
+    if timings is not None:
+        measured = ', '.join(f"{name} {seconds:.3f} 秒" for name, seconds in timings.items())
+        show_info(f"已测量读取引擎: {measured}（结果已缓存）")
+    show_info(f"使用读取引擎: {engine}")
+    return engine
+
+def write_sheet_txt(rows_iter, output_file: Path) -> int:
+    """把一个工作表的行逐行写入制表符分隔的TXT文件，返回写出的行数"""
+    rows = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writerow = timed_call(csv.writer(f, delimiter='\t', lineterminator='\n').writerow)
+        for row in timed_iter(rows_iter):
+            writerow(['' if cell is None else cell for cell in row])
+            rows += 1
+    return rows
+
+def convert_xlsx_to_txt_single(input_file: Path, output_file: Optional[Path] = None,
+                               strings_memory: Optional[float] = None,
+                               columns: Optional[str] = None, rows: Optional[str] = None,
+                               show_extent: bool = False, engine: str = 'stream') -> bool:
     try:
         if not validate_input_file(input_file):
             return False
@@ -39,25 +75,33 @@ def convert_xlsx_to_txt_single(input_file: Path, output_file: Optional[Path] = N
             return False
         
         show_processing(f"转换: {input_file.name}")
+        from xlsx_reader import parse_row_range, trim_rows, trim_width, describe_extent
+        from xlsx_engines import open_workbook
+        first, last = parse_row_range(rows) if rows else (1, None)
         
-        import pandas as pd
-        
-        excel_file = pd.ExcelFile(input_file)
-        sheet_names = excel_file.sheet_names
-        
-        success_count = 0
-        for sheet_name in sheet_names:
-            df = pd.read_excel(input_file, sheet_name=sheet_name)
-            
-            if output_file and len(sheet_names) == 1:
-                current_output = output_file
-            else:
-                current_output = input_file.parent / f"{input_file.stem}_{sheet_name}.txt"
-            
-            df.to_csv(current_output, sep='\t', index=False)
-            
-            show_success(f"已转换工作表 '{sheet_name}' -> {current_output.name}")
-            success_count += 1
+        with open_workbook(input_file, engine, strings_memory) as book:
+            sheet_names = book.sheet_names
+            success_count = 0
+            for sheet_name in sheet_names:
+                if output_file and len(sheet_names) == 1:
+                    current_output = output_file
+                else:
+                    current_output = input_file.parent / f"{input_file.stem}_{sheet_name}.txt"
+                
+                # 列名按各工作表自己的第一行解析
+                selected = book.resolve_columns(columns, sheet_name) if columns else None
+                # 去掉虚高使用区域中末尾的空行和空列
+                extent = {}
+                sheet_rows = trim_rows(book.iter_rows(sheet_name, selected, first, last, pad=False),
+                                       extent, trim_width(book, sheet_name, selected))
+                written = write_sheet_txt(sheet_rows, current_output)
+                register_output(current_output, written)
+                if show_extent:
+                    show_info(f"工作表 '{sheet_name}': "
+                              f"{describe_extent(extent, book.dimension(sheet_name))}")
+                
+                show_success(f"已转换工作表 '{sheet_name}' -> {current_output.name}")
+                success_count += 1
         
         return success_count > 0
         
@@ -65,25 +109,22 @@ def convert_xlsx_to_txt_single(input_file: Path, output_file: Optional[Path] = N
         show_error(f"转换失败: {input_file.name} - {e}")
         return False
 
-def batch_process(directory: Path, recursive: bool = False) -> None:
+def batch_process(directory: Path, recursive: bool = False, jobs: int = 1,
+                  report: Optional[str] = None, strings_memory: Optional[float] = None,
+                  columns: Optional[str] = None, rows: Optional[str] = None,
+                  show_extent: bool = False, engine: str = 'stream') -> None:
     show_info(f"处理目录: {directory}")
-    files = find_files_by_extension(directory, 'xlsx', recursive)
+    files = iter_files(directory, 'xlsx', recursive)
+    tracker = run_batch(files, convert_xlsx_to_txt_single, jobs=jobs, strings_memory=strings_memory,
+                        columns=columns, rows=rows, show_extent=show_extent, engine=engine)
     
-    if not files:
+    if tracker.total_count == 0:
         show_warning("未找到XLSX文件")
         return
     
-    show_info(f"找到 {len(files)} 个XLSX文件")
-    tracker = ProgressTracker()
-    
-    for i, file in enumerate(files, 1):
-        show_processing(f"进度 ({i}/{len(files)}): {file.name}")
-        if convert_xlsx_to_txt_single(file):
-            tracker.add_success()
-        else:
-            tracker.add_failure()
-    
     tracker.show_summary("文件转换")
+    if report:
+        tracker.write_report(report, "文件转换")
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -98,12 +139,21 @@ def show_help() -> None:
 
 选项:
   -r, --recursive  递归处理子目录
+  -j, --jobs N     并行进程数，0 表示使用全部CPU核心（默认: 1）
+  --engine NAME    读取引擎: stream（默认，流式解析）、openpyxl、calamine（需安装 python-calamine），
+                   auto 选择本机最快的已安装引擎（首次使用时测量一次并缓存）
+  --refresh-engine 与 --engine auto 一起使用，重新测量各引擎
+  --strings-memory MB  共享字符串表的内存上限，超出时写入临时文件按需读取（默认: 256，仅 stream 引擎）
+  --columns LIST   只导出指定的列，按列字母或第一行的列名，例如 A,C:F 或 站点,水位
+  --rows START:END 只导出指定范围的行（从 1 开始，含两端），读到 END 行即停止解析
+  --show-extent    显示每个工作表去掉末尾空行、空列后的实际数据范围
+  --report PATH    写出每个文件的耗时、字节数和行数报告（.json 或 .jsonl）
   -h, --help       显示此帮助信息
   --version        显示版本信息
 
 依赖:
-  - pandas
-  - openpyxl
+  - 无（默认直接解析XLSX压缩包中的工作表XML）
+  - openpyxl 或 python-calamine（使用对应的 --engine 时）
     """)
 
 def main():
@@ -111,6 +161,14 @@ def main():
     parser.add_argument('input', nargs='?', help='输入XLSX文件或目录')
     parser.add_argument('output', nargs='?', help='输出TXT文件')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    parser.add_argument('--engine', choices=ENGINE_CHOICES, default='stream', help='读取引擎')
+    parser.add_argument('--refresh-engine', action='store_true', help='重新测量 --engine auto 的各引擎')
+    parser.add_argument('--strings-memory', type=float, metavar='MB',
+                        help='共享字符串表的内存上限 (MB)，超出时写入临时文件按需读取')
+    parser.add_argument('--columns', metavar='LIST', help='只导出指定的列，例如 A,C:F 或 站点,水位')
+    parser.add_argument('--rows', metavar='START:END', help='只导出指定范围的行，例如 2:1000')
+    parser.add_argument('--show-extent', action='store_true', help='显示每个工作表的实际数据范围')
+    add_batch_arguments(parser)
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     args = parser.parse_args()
@@ -123,25 +181,42 @@ def main():
         show_version()
         return
     
-    if not check_dependencies():
+    engine = resolve_engine(args.engine, args.refresh_engine)
+    if not check_dependencies(engine):
         sys.exit(1)
     
+    if args.rows:
+        from xlsx_reader import parse_row_range
+        try:
+            parse_row_range(args.rows)
+        except ValueError as e:
+            fatal_error(str(e))
+    
     if not args.input:
-        batch_process(Path.cwd())
+        batch_process(Path.cwd(), jobs=args.jobs, report=args.report,
+                      strings_memory=args.strings_memory, columns=args.columns, rows=args.rows,
+                      show_extent=args.show_extent, engine=engine)
     else:
         input_path = Path(args.input)
         if input_path.is_file():
             output_path = Path(args.output) if args.output else None
-            if not convert_xlsx_to_txt_single(input_path, output_path):
+            tracker = run_batch([input_path], convert_xlsx_to_txt_single, output_file=output_path,
+                                strings_memory=args.strings_memory, columns=args.columns,
+                                rows=args.rows, show_extent=args.show_extent, engine=engine)
+            if args.report:
+                tracker.write_report(args.report, "文件转换")
+            if tracker.failed_count:
                 sys.exit(1)
         elif input_path.is_dir():
-            batch_process(input_path, args.recursive)
+            batch_process(input_path, args.recursive, jobs=args.jobs, report=args.report,
+                          strings_memory=args.strings_memory, columns=args.columns,
+                          rows=args.rows, show_extent=args.show_extent, engine=engine)
         else:
             fatal_error(f"输入路径不存在: {input_path}")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
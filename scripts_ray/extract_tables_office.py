@@ -6,29 +6,33 @@ Office文件表格提取工具 - 从.docx, .pptx, .xlsx文件中提取所有表
 """
 
 import sys
+import csv
 import argparse
-import pandas as pd
 from pathlib import Path
-from docx import Document
-from pptx import Presentation
+from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
     validate_input_file, ensure_directory, ProgressTracker, fatal_error,
-    check_python_packages, find_files_by_extension
+    check_python_packages, find_files_by_extension, lazy_import, run_main,
+    add_compress_argument, parse_compression, compressed_path, open_text_output
 )
 
+pd = lazy_import('pandas')
+docx = lazy_import('docx')
+pptx = lazy_import('pptx')
+
 SCRIPT_VERSION = "2.0.0"
 
 def check_dependencies():
     show_info("检查依赖项...")
-    if not check_python_packages(['pandas', 'python-docx', 'python-pptx', 'openpyxl']):
+    if not check_python_packages(['pandas', 'python-docx', 'python-pptx']):
         sys.exit(1)
     show_success("依赖检查完成")
 
-def extract_from_docx(file_path: Path, output_dir: Path) -> int:
+def extract_from_docx(file_path: Path, output_dir: Path, compress: Optional[str] = None) -> int:
     try:
-        doc = Document(file_path)
+        doc = docx.Document(file_path)
         if not doc.tables:
             return 0
         
@@ -36,17 +40,18 @@ def extract_from_docx(file_path: Path, output_dir: Path) -> int:
         for i, table in enumerate(doc.tables, 1):
             data = [[cell.text for cell in row.cells] for row in table.rows]
             df = pd.DataFrame(data)
-            output_file = output_dir / f"{file_path.stem}_table_{i}.csv"
-            df.to_csv(output_file, index=False, header=False)
+            output_file = compressed_path(output_dir / f"{file_path.stem}_table_{i}.csv", compress)
+            with open_text_output(output_file, compress) as f:
+                df.to_csv(f, index=False, header=False)
             count += 1
         return count
     except Exception as e:
         show_error(f"处理DOCX失败: {e}")
         return 0
 
-def extract_from_pptx(file_path: Path, output_dir: Path) -> int:
+def extract_from_pptx(file_path: Path, output_dir: Path, compress: Optional[str] = None) -> int:
     try:
-        prs = Presentation(file_path)
+        prs = pptx.Presentation(file_path)
         count = 0
         for slide_num, slide in enumerate(prs.slides, 1):
             for shape in slide.shapes:
@@ -56,29 +61,38 @@ def extract_from_pptx(file_path: Path, output_dir: Path) -> int:
                 table = shape.table
                 data = [[cell.text for cell in row.cells] for row in table.rows]
                 df = pd.DataFrame(data)
-                output_file = output_dir / f"{file_path.stem}_slide_{slide_num}_table_{count+1}.csv"
-                df.to_csv(output_file, index=False, header=False)
+                output_file = compressed_path(
+                    output_dir / f"{file_path.stem}_slide_{slide_num}_table_{count+1}.csv", compress)
+                with open_text_output(output_file, compress) as f:
+                    df.to_csv(f, index=False, header=False)
                 count += 1
         return count
     except Exception as e:
         show_error(f"处理PPTX失败: {e}")
         return 0
 
-def extract_from_xlsx(file_path: Path, output_dir: Path) -> int:
+def extract_from_xlsx(file_path: Path, output_dir: Path, compress: Optional[str] = None) -> int:
+    from xlsx_reader import XlsxReader, trim_rows, trim_width
     try:
-        xls = pd.ExcelFile(file_path)
         count = 0
-        for sheet_name in xls.sheet_names:
-            df = pd.read_excel(xls, sheet_name=sheet_name, header=None)
-            output_file = output_dir / f"{file_path.stem}_sheet_{sheet_name}.csv"
-            df.to_csv(output_file, index=False, header=False)
-            count += 1
+        with XlsxReader(file_path) as book:
+            for sheet_name in book.sheet_names:
+                output_file = compressed_path(output_dir / f"{file_path.stem}_sheet_{sheet_name}.csv",
+                                              compress)
+                with open_text_output(output_file, compress) as f:
+                    writer = csv.writer(f)
+                    # 与转换脚本相同：去掉只有格式的末尾空行，各行补齐到 <dimension> 的列数
+                    rows = trim_rows(book.iter_rows(sheet_name, pad=False),
+                                     width=trim_width(book, sheet_name))
+                    for row in rows:
+                        writer.writerow(['' if cell is None else cell for cell in row])
+                count += 1
         return count
     except Exception as e:
         show_error(f"处理XLSX失败: {e}")
         return 0
 
-def extract_tables_from_file(file_path: Path, output_dir: Path) -> int:
+def extract_tables_from_file(file_path: Path, output_dir: Path, compress: Optional[str] = None) -> int:
     if not validate_input_file(file_path):
         return 0
 
@@ -97,7 +111,7 @@ def extract_tables_from_file(file_path: Path, output_dir: Path) -> int:
     ensure_directory(file_output_dir)
     
     show_processing(f"从 {file_path.name} 提取表格...")
-    count = extractors[ext](file_path, file_output_dir)
+    count = extractors[ext](file_path, file_output_dir, compress)
     
     if count > 0:
         show_success(f"成功提取 {count} 个表格到 {file_output_dir}")
@@ -111,10 +125,15 @@ def main():
     parser.add_argument("input_paths", nargs='+', help="一个或多个文件/目录路径")
     parser.add_argument("-o", "--output", help="输出目录 (默认: ./extracted_tables)")
     parser.add_argument("-r", "--recursive", action="store_true", help="递归处理目录")
+    add_compress_argument(parser)
     parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
     args = parser.parse_args()
 
     check_dependencies()
+    try:
+        compress = parse_compression(args.compress)
+    except ValueError as e:
+        fatal_error(str(e))
 
     output_dir = Path(args.output) if args.output else Path("./extracted_tables")
     ensure_directory(output_dir)
@@ -135,12 +154,12 @@ def main():
 
     for file_path in files_to_process:
         progress.show(f"处理 {file_path.name}")
-        count = extract_tables_from_file(file_path, output_dir)
+        count = extract_tables_from_file(file_path, output_dir, compress)
         total_extracted += count
         
     show_info("\n处理完成")
     show_success(f"总共提取了 {total_extracted} 个表格")
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
 
@@ -15,9 +15,12 @@ from collections import Counter
 from common_utils import (
     show_success, show_error, show_warning, show_info,
     validate_input_file, ensure_directory, ProgressTracker,
-    fatal_error, find_files_by_extension
+    fatal_error, find_files_by_extension, iter_text_chunks,
+    check_python_packages, lazy_import, run_main
 )
 
+pd = lazy_import('pandas')
+
 SCRIPT_VERSION = "2.0.0"
 TOKEN_PATTERN = re.compile(r"[\w'-]+")
 
@@ -26,15 +29,12 @@ def analyze_file(file_path: Path, min_len: int, min_freq: int) -> list:
         return []
 
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            text = f.read().lower()
-        
-        tokens = TOKEN_PATTERN.findall(text)
-        
-        token_counts = Counter(
-            token for token in tokens
-            if len(token) >= min_len
-        )
+        token_counts = Counter()
+        for chunk in iter_text_chunks(file_path, errors='ignore'):
+            token_counts.update(
+                token for token in TOKEN_PATTERN.findall(chunk.lower())
+                if len(token) >= min_len
+            )
         
         return [
             (token, count) for token, count in token_counts.items()
@@ -66,10 +66,8 @@ def main():
     parser.add_argument('--version', action='version', version=f'%(prog)s {SCRIPT_VERSION}')
     args = parser.parse_args()
 
-    try:
-        import pandas as pd
-    except ImportError:
-        fatal_error("此脚本需要 pandas 库。请运行: pip install pandas")
+    if not check_python_packages(['pandas']):
+        sys.exit(1)
 
     files_to_process = find_files_by_extension(
         args.input_paths,
@@ -102,10 +100,5 @@ def main():
     save_results(final_results, Path(args.output))
 
 if __name__ == "__main__":
-    # Add pandas to global scope for save_results
-    try:
-        import pandas as pd
-    except ImportError:
-        pass
-    main()
+    run_main(main)
 
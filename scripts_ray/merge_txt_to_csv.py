@@ -7,17 +7,24 @@
 import sys
 import csv
 import re
+from itertools import zip_longest
 from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
 
 from common_utils import (
     show_success, show_error, show_info, fatal_error, ProgressTracker,
-    show_version_info, show_help_header, show_help_footer
+    show_version_info, show_help_header, show_help_footer, show_warning,
+    iter_text_lines, run_main, parse_compression, compressed_path, strip_compression_suffix,
+    text_extensions, iter_files, open_text_output, create_temp_dir, cleanup_temp_dir
 )
 
 SCRIPT_VERSION = "1.0.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-07-26"
 
+# 为输出文件、临时文件和解释器自身保留的文件句柄数
+RESERVED_HANDLES = 32
+
 def show_version():
     """显示版本信息"""
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -27,20 +34,23 @@ def show_help():
     show_help_header(sys.argv[0], "合并目录中所有.txt文件为单个CSV")
     print("    [target_dir]     要处理的目录 (默认为当前目录)")
     print("    [output_file.csv] 输出的CSV文件名 (默认为 'merged.csv')")
+    print("    --compress FMT[:LEVEL] 压缩输出: gzip、zstd 或 xz，可指定级别 (如 zstd:9)")
+    print("    目录中的 .txt.gz/.txt.zst/.txt.xz 文件同样参与合并，读取时边读边解压")
     show_help_footer()
 
-def merge_txt_to_csv(target_dir: Path, output_file: Path, tracker: ProgressTracker):
+def merge_txt_to_csv(target_dir: Path, output_file: Path, tracker: ProgressTracker,
+                     compress: Optional[str] = None):
     """
     将目录中的所有 .txt 文件按列合并到一个 CSV 文件中。
     """
-    txt_files = sorted(target_dir.glob('*.txt'))
+    txt_files = sorted(iter_files(target_dir, text_extensions('txt'), exclude=None))
     
     if not txt_files:
         show_error(f"在目录 '{target_dir}' 中未找到 .txt 文件。")
         return
 
     def extract_number(filename: Path):
-        match = re.match(r'(\d+)(_\d+)?\.txt', filename.name)
+        match = re.match(r'(\d+)(_\d+)?\.txt', strip_compression_suffix(filename).name)
         if match:
             number = int(match.group(1))
             suffix = match.group(2) or ''
@@ -51,44 +61,127 @@ def merge_txt_to_csv(target_dir: Path, output_file: Path, tracker: ProgressTrack
     
     show_info(f"找到 {len(txt_files)} 个 .txt 文件进行合并。")
 
-    # 以最长文件的行数为基准
-    max_lines = 0
+    budget = open_file_budget(len(txt_files))
     for file in txt_files:
-        with open(file, 'r', encoding='utf-8') as f:
-            line_count = sum(1 for _ in f)
-            if line_count > max_lines:
-                max_lines = line_count
-    
-    if max_lines == 0:
+        show_info(f"正在处理: {file.name}")
+        tracker.add_success()
+
+    # 同时流式读取所有文件，以最长文件的行数为基准，短文件以空值补齐
+    row_count = 0
+    part_dir = None
+    try:
+        if len(txt_files) <= budget:
+            streams = [(line.strip() for line in iter_text_lines(file)) for file in txt_files]
+            with open_text_output(output_file, compress) as f:
+                writer = csv.writer(f)
+                for row in zip_longest(*streams, fillvalue=''):
+                    writer.writerow(row)
+                    row_count += 1
+        else:
+            # 文件数超过句柄上限时分组合并为临时CSV，再合并这些临时文件
+            show_info(f"文件数超过可同时打开的上限 ({budget})，分组合并")
+            part_dir = create_temp_dir()
+            sources = merge_in_groups(txt_files, budget, part_dir)
+            with open_text_output(output_file, compress) as f:
+                row_count = write_merged(csv.writer(f), sources)
+    except OSError as e:
+        fatal_error(f"合并失败: {e}")
+    finally:
+        if part_dir is not None:
+            cleanup_temp_dir(part_dir)
+
+    if row_count == 0:
         show_warning("所有 .txt 文件都为空，将生成一个空的CSV文件。")
-        output_file.touch()
         show_success(f"操作完成，已生成空的CSV文件: {output_file.name}")
         return
+    show_success(f"合并完成。结果已保存为 {output_file.name} 文件。")
 
-    lines = [[] for _ in range(max_lines)]
-
-    for file in txt_files:
-        show_info(f"正在处理: {file.name}")
-        tracker.add_success()
-        with open(file, 'r', encoding='utf-8') as f:
-            file_lines = [line.strip() for line in f.readlines()]
-            for i in range(max_lines):
-                lines[i].append(file_lines[i] if i < len(file_lines) else '')
-
+def raise_open_file_limit(required: int) -> Optional[int]:
+    """同时打开的文件较多时，尝试提高进程的文件句柄上限；返回提高后的上限（无限制或未知时为 None）"""
     try:
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerows(lines)
-        show_success(f"合并完成。结果已保存为 {output_file.name} 文件。")
-    except IOError as e:
-        fatal_error(f"写入CSV文件失败: {e}")
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < required:
+            target = required if hard == resource.RLIM_INFINITY else min(required, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        return None if soft == resource.RLIM_INFINITY else soft
+    except (ImportError, ValueError, OSError):
+        return None
+
+def open_file_budget(file_count: int) -> int:
+    """合并时最多可以同时打开的输入文件数"""
+    limit = raise_open_file_limit(file_count + RESERVED_HANDLES)
+    if limit is None:
+        return file_count
+    return max(limit - RESERVED_HANDLES, 2)
+
+# 合并来源: (文件, 列数, 是否为分组合并的临时CSV)
+Source = Tuple[Path, int, bool]
+
+def iter_source_rows(source: Source) -> Iterator[List[str]]:
+    path, _, is_part = source
+    if not is_part:
+        for line in iter_text_lines(path):
+            yield [line.strip()]
+        return
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        yield from csv.reader(f)
+
+def write_merged(writer, sources: List[Source]) -> int:
+    """按列拼接各来源的行，较短的来源以空值补齐到自身的列数，返回写出的行数"""
+    blanks = [[''] * width for _, width, _ in sources]
+    row_count = 0
+    for parts in zip_longest(*(iter_source_rows(source) for source in sources)):
+        row = []
+        for part, blank in zip(parts, blanks):
+            row.extend(blank if part is None else part)
+        writer.writerow(row)
+        row_count += 1
+    return row_count
+
+def merge_in_groups(txt_files: List[Path], group_size: int, part_dir: Path) -> List[Source]:
+    """每组最多 group_size 个来源合并为一个临时CSV，直到来源数不超过 group_size"""
+    sources = [(file, 1, False) for file in txt_files]
+    level = 0
+    while len(sources) > group_size:
+        merged = []
+        for start in range(0, len(sources), group_size):
+            group = sources[start:start + group_size]
+            part = part_dir / f"{level}_{len(merged)}.csv"
+            with open(part, 'w', encoding='utf-8', newline='') as f:
+                write_merged(csv.writer(f), group)
+            merged.append((part, sum(width for _, width, _ in group), True))
+        # 上一层的临时文件已合并，及时删除以节省磁盘空间
+        for path, _, is_part in sources:
+            if is_part:
+                path.unlink()
+        sources = merged
+        level += 1
+    return sources
 
 def main():
     """主函数"""
     target_dir_str = "."
     output_file_str = "merged.csv"
 
-    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    argv = sys.argv[1:]
+    compress_spec = None
+    for i, arg in enumerate(argv):
+        if arg == '--compress' and i + 1 < len(argv):
+            compress_spec = argv[i + 1]
+            del argv[i:i + 2]
+            break
+        if arg.startswith('--compress='):
+            compress_spec = arg.partition('=')[2]
+            del argv[i]
+            break
+    try:
+        compress = parse_compression(compress_spec)
+    except ValueError as e:
+        fatal_error(str(e))
+
+    args = [arg for arg in argv if not arg.startswith('-')]
     
     if any(arg in ("-h", "--help") for arg in sys.argv):
         show_help()
@@ -108,12 +201,14 @@ def main():
     if not target_dir.is_dir():
         fatal_error(f"目标不是一个有效的目录: {target_dir}")
 
+    output_file = strip_compression_suffix(output_file)
     if output_file.suffix.lower() != '.csv':
         output_file = output_file.with_suffix('.csv')
+    output_file = compressed_path(output_file, compress)
 
     tracker = ProgressTracker()
-    merge_txt_to_csv(target_dir, output_file, tracker)
+    merge_txt_to_csv(target_dir, output_file, tracker, compress)
     tracker.show_summary("TXT文件合并")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    run_main(main) 
\ No newline at end of file
@@ -1,34 +1,52 @@
 #!/usr/bin/env python3
 """
-Excel工作表分离工具 - 将单个Excel文件按工作表拆分为多个文件
-版本: 2.0.0
+Excel工作表分离工具 - 将单个Excel文件按工作表、按列值或按行数拆分为多个文件
+版本: 3.1.0
 作者: tianli
 更新: 2024-01-05
+
+拆分在 zip 包层面进行（见 xlsx_split.py）：工作表XML和它引用的部件原样复制，
+只裁剪样式表和共享字符串表，不解析单元格，格式、公式、列宽、合并单元格都保留。
+
+--by-column / --rows-per-file 把一个工作表按某列的值或每 N 行拆分：只读一遍工作表，
+各行经 xlsx_writer.PartitionWriter 分发到各输出文件（按值写出，不保留格式）。
 """
 
+import re
 import sys
+import datetime
 import argparse
-import pandas as pd
 from pathlib import Path
+from typing import Optional
 
 from common_utils import (
     show_success, show_error, show_warning, show_info, show_processing,
     validate_input_file, check_file_extension, get_file_basename,
-    fatal_error, check_python_packages, show_version_info
+    fatal_error, show_version_info,
+    run_batch, register_output, add_incremental_argument, open_manifest,
+    create_temp_dir, cleanup_temp_dir, resolve_jobs, phase, timed_iter, run_main
 )
+from xlsx_writer import DEFAULT_MAX_OPEN, MAX_ROWS
 
-SCRIPT_VERSION = "2.0.0"
+SCRIPT_VERSION = "3.1.0"
 SCRIPT_AUTHOR = "tianli"
 SCRIPT_UPDATED = "2024-01-05"
 
+# 文件名中不能出现的字符
+_INVALID_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+MAX_LABEL_LENGTH = 100
+EMPTY_KEY_LABEL = '空值'
+
 def check_dependencies() -> bool:
-    show_info("检查依赖项...")
-    if not check_python_packages(['pandas', 'openpyxl']):
-        return False
-    show_success("依赖检查完成")
+    # 只复制和裁剪 zip 中的部件，不需要第三方库
     return True
 
-def split_excel_file(input_file: Path) -> bool:
+def split_sheet(splitter, sheet_name: str, output_file: Path) -> int:
+    """拆出一个工作表（可在工作进程中执行），返回行数"""
+    return splitter.split(sheet_name, output_file)
+
+def split_excel_file(input_file: Path, sheet_jobs: int = 1) -> bool:
+    work_dir = None
     try:
         if not validate_input_file(input_file):
             return False
@@ -38,8 +56,11 @@ def split_excel_file(input_file: Path) -> bool:
             return False
 
         show_processing(f"正在读取Excel文件: {input_file.name}")
-        xlsx = pd.ExcelFile(input_file)
-        sheet_names = xlsx.sheet_names
+        from xlsx_split import SheetSplitter
+        work_dir = create_temp_dir()
+        with phase('read'):
+            splitter = SheetSplitter(input_file, work_dir)
+        sheet_names = splitter.sheet_names
 
         if not sheet_names:
             show_warning(f"文件 '{input_file.name}' 中没有找到工作表。")
@@ -48,22 +69,146 @@ def split_excel_file(input_file: Path) -> bool:
         show_info(f"找到 {len(sheet_names)} 个工作表: {', '.join(sheet_names)}")
         
         base_name = get_file_basename(input_file)
-        output_dir = input_file.parent
+        outputs = [(name, input_file.parent / f"{base_name}_{name}.xlsx") for name in sheet_names]
         
-        for i, sheet_name in enumerate(sheet_names, 1):
-            show_processing(f"正在处理工作表 ({i}/{len(sheet_names)}): {sheet_name}")
-            df = pd.read_excel(xlsx, sheet_name=sheet_name)
-            
-            output_file = output_dir / f"{base_name}_{sheet_name}.xlsx"
-            
-            df.to_excel(output_file, index=False)
-            show_success(f"已保存工作表 '{sheet_name}' 到 '{output_file.name}'")
+        sheet_jobs = min(resolve_jobs(sheet_jobs), len(outputs))
+        with phase('write'):
+            if sheet_jobs > 1:
+                # 各工作进程自行打开源文件，共享主进程解压好的共享字符串表
+                from concurrent.futures import ProcessPoolExecutor
+                sys.stdout.flush()
+                with ProcessPoolExecutor(max_workers=sheet_jobs) as executor:
+                    futures = [executor.submit(split_sheet, splitter, name, output_file)
+                               for name, output_file in outputs]
+                    results = []
+                    for future in futures:
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            results.append(e)
+            else:
+                results = []
+                for i, (name, output_file) in enumerate(outputs, 1):
+                    show_processing(f"正在处理工作表 ({i}/{len(outputs)}): {name}")
+                    try:
+                        results.append(split_sheet(splitter, name, output_file))
+                    except Exception as e:
+                        results.append(e)
+
+        failed = 0
+        for (name, output_file), rows in zip(outputs, results):
+            if isinstance(rows, Exception):
+                show_error(f"拆分工作表失败: '{name}' - {rows}")
+                failed += 1
+                continue
+            register_output(output_file, rows)
+            show_success(f"已保存工作表 '{name}' 到 '{output_file.name}'")
+
+        return failed == 0
+
+    except Exception as e:
+        show_error(f"处理文件 '{input_file.name}' 时发生错误: {e}")
+        return False
+    finally:
+        if work_dir is not None:
+            cleanup_temp_dir(work_dir)
+
+def key_label(value) -> str:
+    """--by-column 的列值在输出文件名中的写法"""
+    if value is None or value == '':
+        return EMPTY_KEY_LABEL
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, datetime.datetime) and value.time() == datetime.time():
+        value = value.date()
+    label = _INVALID_FILENAME_CHARS.sub('_', str(value)).strip(' .')
+    return label[:MAX_LABEL_LENGTH] or '_'
+
+def split_rows(input_file: Path, sheet_name: Optional[str] = None, by_column: Optional[str] = None,
+               rows_per_file: Optional[int] = None, max_open: Optional[int] = None) -> bool:
+    """把一个工作表按列值或每 N 行拆分为多个文件，第一行作为列名写入每个文件"""
+    work_dir = None
+    try:
+        if not validate_input_file(input_file):
+            return False
+
+        if not check_file_extension(input_file, 'xlsx'):
+            show_warning(f"跳过非XLSX文件: {input_file.name}")
+            return False
+
+        from xlsx_reader import XlsxReader, parse_columns
+        from xlsx_writer import PartitionWriter
+        with XlsxReader(input_file) as book:
+            if sheet_name is None:
+                sheet_name = book.active_sheet
+            elif sheet_name not in book.sheet_names:
+                show_error(f"工作表不存在: {sheet_name}（可选: {', '.join(book.sheet_names)}）")
+                return False
+
+            rows = timed_iter(book.iter_rows(sheet_name, pad=False))
+            header = next(rows, None)
+            if header is None:
+                show_warning(f"工作表 '{sheet_name}' 为空")
+                return True
+
+            base = f"{get_file_basename(input_file)}_{sheet_name}"
+            output_dir = input_file.parent
+            if by_column:
+                columns = parse_columns(by_column, header)
+                if len(columns) != 1:
+                    show_error(f"--by-column 只能指定一列: {by_column}")
+                    return False
+                column = columns[0]
+                show_processing(f"按列 '{by_column}' 拆分工作表: {sheet_name}")
+                used = set()
+
+                def path_for_key(key) -> Path:
+                    label = key_label(key)
+                    name, n = f"{base}_{label}", 1
+                    # 不同的值可能得到相同的文件名（大小写、非法字符替换）
+                    while name.casefold() in used:
+                        n += 1
+                        name = f"{base}_{label}({n})"
+                    used.add(name.casefold())
+                    return output_dir / f"{name}.xlsx"
+            else:
+                show_processing(f"按每 {rows_per_file} 行拆分工作表: {sheet_name}")
+
+                def path_for_key(key) -> Path:
+                    return output_dir / f"{base}_{key}.xlsx"
+
+            work_dir = create_temp_dir()
+            with PartitionWriter(work_dir, path_for_key, header, sheet_name, max_open) as parts:
+                if by_column:
+                    for row in rows:
+                        if row.count(None) == len(row):
+                            continue
+                        parts.write_row(row[column] if column < len(row) else None, row)
+                else:
+                    chunk, count = 1, 0
+                    for row in rows:
+                        if row.count(None) == len(row):
+                            continue
+                        if count == rows_per_file:
+                            # 写满一块立即生成文件，临时文件不会积累
+                            parts.finish(chunk)
+                            chunk, count = chunk + 1, 0
+                        parts.write_row(chunk, row)
+                        count += 1
 
+        outputs = parts.outputs()
+        for output_file, rows_written in outputs:
+            register_output(output_file, rows_written)
+        show_success(f"已拆分为 {len(outputs)} 个文件: {outputs[0][0].name} …" if outputs
+                     else "没有数据行，未生成文件")
         return True
 
     except Exception as e:
         show_error(f"处理文件 '{input_file.name}' 时发生错误: {e}")
         return False
+    finally:
+        if work_dir is not None:
+            cleanup_temp_dir(work_dir)
 
 def show_version() -> None:
     show_version_info(SCRIPT_VERSION, SCRIPT_AUTHOR, SCRIPT_UPDATED)
@@ -74,24 +219,40 @@ Excel工作表分离工具 - 将单个Excel文件按工作表拆分为多个文
 
 用法:
     python3 {sys.argv[0]} [选项] <输入文件>
+    python3 {sys.argv[0]} --by-column 列 [--sheet 工作表] <输入文件>
+    python3 {sys.argv[0]} --rows-per-file N [--sheet 工作表] <输入文件>
 
 参数:
     输入文件         要拆分的Excel文件 (.xlsx)
 
 选项:
+    -j, --jobs N     并行拆分的工作表数，0 表示使用全部CPU核心（默认: 1）
+    --by-column COL  按该列的值把一个工作表拆分为多个文件；COL 为列字母或第一行中的列名
+    --rows-per-file N
+                     把一个工作表按每 N 个数据行拆分为多个文件
+    --sheet NAME     --by-column/--rows-per-file 拆分的工作表（默认: 活动工作表）
+    --max-open N     --by-column 时同时打开的临时文件数上限（默认: {DEFAULT_MAX_OPEN}，
+                     且不超过文件句柄数的一半）
+    --incremental    增量模式，输入和已拆分的文件都未变化时跳过
     -h, --help       显示此帮助信息
     --version        显示版本信息
 
 示例:
     python3 {sys.argv[0]} data.xlsx
+    python3 {sys.argv[0]} --by-column 地区 data.xlsx          # data_Sheet1_华东.xlsx …
+    python3 {sys.argv[0]} --rows-per-file 50000 data.xlsx     # data_Sheet1_1.xlsx …
 
 功能:
     - 将一个包含多个工作表的Excel文件拆分为多个单独的Excel文件
     - 每个新文件以原文件名和工作表名命名
+    - 直接复制工作表的XML部件，格式、公式、列宽、合并单元格、图片和批注都保留
+    - 样式表和共享字符串表只保留该工作表用到的部分
+    - 透视表不复制；引用其他工作表的公式在拆分后无法计算
+    - --by-column/--rows-per-file 只读一遍工作表，第一行作为列名写入每个文件，
+      按值写出（不保留格式），空行跳过；列值为空的行写入 <文件名>_<工作表>_空值.xlsx
 
 依赖:
-    - pandas
-    - openpyxl
+    - 无（仅使用Python标准库）
     """)
 
 def main():
@@ -101,6 +262,14 @@ def main():
     )
     
     parser.add_argument('input_file', nargs='?', help='要拆分的Excel文件')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='并行拆分的工作表数 (0 表示使用全部CPU核心)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--by-column', metavar='COL', help='按该列的值拆分一个工作表')
+    mode.add_argument('--rows-per-file', type=int, metavar='N', help='按每 N 个数据行拆分一个工作表')
+    parser.add_argument('--sheet', help='按列值或行数拆分的工作表（默认: 活动工作表）')
+    parser.add_argument('--max-open', type=int, metavar='N', help='同时打开的临时文件数上限')
+    add_incremental_argument(parser)
     parser.add_argument('-h', '--help', action='store_true', help='显示帮助信息')
     parser.add_argument('--version', action='store_true', help='显示版本信息')
     
@@ -122,15 +291,29 @@ def main():
         sys.exit(1)
     
     input_path = Path(args.input_file)
+    if args.rows_per_file is not None and not 1 <= args.rows_per_file < MAX_ROWS:
+        fatal_error(f"--rows-per-file 应在 1-{MAX_ROWS - 1} 之间: {args.rows_per_file}")
+    if args.max_open is not None and args.max_open < 1:
+        fatal_error(f"--max-open 至少为 1: {args.max_open}")
+    if args.sheet and not (args.by_column or args.rows_per_file):
+        show_warning("--sheet 只对 --by-column/--rows-per-file 有效，将按工作表拆分整个文件")
     
-    if not split_excel_file(input_path):
+    with open_manifest(args.incremental, 'splitsheets', SCRIPT_VERSION) as manifest:
+        if args.by_column or args.rows_per_file:
+            tracker = run_batch([input_path], split_rows, manifest=manifest, sheet_name=args.sheet,
+                                by_column=args.by_column, rows_per_file=args.rows_per_file,
+                                max_open=args.max_open)
+        else:
+            tracker = run_batch([input_path], split_excel_file, manifest=manifest,
+                                sheet_jobs=args.jobs)
+    if tracker.failed_count:
         sys.exit(1)
 
     show_success("所有操作完成。")
 
 if __name__ == "__main__":
     try:
-        main()
+        run_main(main)
     except KeyboardInterrupt:
         show_warning("用户中断操作")
         sys.exit(1)
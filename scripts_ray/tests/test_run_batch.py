@@ -0,0 +1,35 @@
+"""run_batch 回归测试：工作进程崩溃时其余任务各只执行一次"""
+
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common_utils import run_batch
+
+CRASH_ITEM = 3
+
+
+def record_item(item: int, log_dir: Path) -> bool:
+    """每执行一次写一个标记文件；CRASH_ITEM 等其余任务完成后杀死自身进程"""
+    (log_dir / f"{item}-{os.getpid()}-{time.perf_counter_ns()}").touch()
+    if item == CRASH_ITEM:
+        time.sleep(0.5)
+        os.kill(os.getpid(), signal.SIGKILL)
+    return True
+
+
+def test_worker_crash_runs_other_items_once(tmp_path):
+    items = list(range(8))
+    tracker = run_batch(items, record_item, jobs=2, log_dir=tmp_path)
+    runs = {}
+    for marker in tmp_path.iterdir():
+        item = int(marker.name.split('-')[0])
+        runs[item] = runs.get(item, 0) + 1
+    assert {item: count for item, count in runs.items() if item != CRASH_ITEM} == \
+        {item: 1 for item in items if item != CRASH_ITEM}
+    assert tracker.failed_count == 1
+    assert tracker.success_count == len(items) - 1
@@ -0,0 +1,71 @@
+"""trim_rows 回归测试：边读边输出，各行补齐到预先知道的列数"""
+
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from xlsx_reader import XlsxReader, trim_rows
+
+
+def test_widening_row_pads_to_known_width():
+    rows = [(None, None), ('a', 'b', 'c'), (1, 2, 3, 4), ('x', None, None, None, None), (None,)]
+    extent = {}
+    out = list(trim_rows(rows, extent, width=4))
+    assert out == [(None,) * 4, ('a', 'b', 'c', None), (1, 2, 3, 4), ('x', None, None, None)]
+    assert extent == {'rows': 4, 'columns': 4, 'trimmed_rows': 1}
+
+
+def test_rows_are_streamed():
+    def source():
+        yield ('a', 'b')
+        yield ()
+        raise AssertionError("读取了多余的行")
+
+    rows = trim_rows(source(), width=2)
+    assert next(rows) == ('a', 'b')
+
+
+def test_trailing_blank_rows_are_dropped():
+    rows = [('a',), (), (None, ''), ('b', None), (None,), ()]
+    assert list(trim_rows(rows, width=1)) == [('a',), (None,), (None,), ('b',)]
+
+
+def test_csv_export_pads_to_dimension(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    from convert_xlsx_to_csv import sheet_rows, write_sheet_csv
+    source = tmp_path / 'widening.xlsx'
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = 'Sheet1'
+    for ref, value in (('A2', 'a'), ('B2', 'b'), ('C2', 'c'), ('A3', 1), ('B3', 2), ('C3', 3),
+                       ('D3', 4)):
+        sheet[ref] = value
+    # 只有格式的末尾行不算数据
+    sheet['A50'].number_format = '0.00'
+    book.save(source)
+    output = tmp_path / 'widening.csv'
+    with XlsxReader(source) as reader:
+        write_sheet_csv(sheet_rows(reader, 'Sheet1'), output)
+    with open(output, newline='', encoding='utf-8') as f:
+        exported = list(csv.reader(f))
+    assert exported == [['', '', '', ''], ['a', 'b', 'c', ''], ['1', '2', '3', '4']]
+
+
+def test_office_extract_trims_phantom_range(tmp_path):
+    openpyxl = pytest.importorskip('openpyxl')
+    from extract_tables_office import extract_from_xlsx
+    source = tmp_path / 'phantom.xlsx'
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.title = 'S'
+    sheet['A1'], sheet['B1'], sheet['C2'] = 'h1', 'h2', 3
+    for row in range(3, 2001):
+        sheet.cell(row, 1).number_format = '0.00'
+    book.save(source)
+    assert extract_from_xlsx(source, tmp_path) == 1
+    with open(tmp_path / 'phantom_sheet_S.csv', newline='', encoding='utf-8') as f:
+        assert list(csv.reader(f)) == [['h1', 'h2', ''], ['', '', '3']]
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+XLSX读取引擎模块 - 以统一的接口打开工作簿，可选 stream / openpyxl / calamine 引擎
+版本: 1.0.0
+作者: tianli
+
+open_workbook(path, engine) 只打开一次工作簿，各工作表都从同一个对象读取。返回的对象
+与 xlsx_reader.XlsxReader 接口相同（sheet_names、active_sheet、iter_rows、
+resolve_columns、dimension、close）：
+- stream: xlsx_reader.XlsxReader，流式解析工作表XML，只依赖标准库
+- openpyxl: openpyxl 只读模式
+- calamine: python-calamine（Rust 实现），每个工作表整体读入内存
+
+choose_engine() 为 --engine auto 选择引擎：首次使用时生成一个测试工作簿，用每个已安装的
+引擎读一遍，取最快的；结果按 Python 和各引擎的版本缓存在缓存目录的 xlsx_engines.json
+中，版本不变时不再测量。
+"""
+
+import sys
+import time
+import datetime
+from abc import ABC, abstractmethod
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+SCRIPT_VERSION = "1.0.0"
+
+ENGINES = ('stream', 'openpyxl', 'calamine')
+# 引擎 -> 需要安装的包
+ENGINE_PACKAGES = {'stream': None, 'openpyxl': 'openpyxl', 'calamine': 'python-calamine'}
+DEFAULT_ENGINE = 'stream'
+
+BENCH_ROWS = 5000
+BENCH_REPEAT = 2
+# calamine 把数字都读为浮点数；小于该值的整数值按整数输出，与 stream 引擎一致
+_EXACT_INTEGER = 2 ** 53
+
+def available_engines() -> List[str]:
+    from common_utils import is_package_available
+    return [engine for engine in ENGINES
+            if ENGINE_PACKAGES[engine] is None or is_package_available(ENGINE_PACKAGES[engine])]
+
+def stream_value(value):
+    """把其他引擎读出的单元格值统一为 stream 引擎的类型
+
+    空字符串为 None；小于 2**53 的整数值浮点数为 int；只有日期的 date 为当天零点的
+    datetime。time、timedelta 等两边一致的类型原样返回。
+    """
+    if value == '':
+        return None
+    value_type = type(value)
+    if value_type is float and value.is_integer() and -_EXACT_INTEGER < value < _EXACT_INTEGER:
+        return int(value)
+    if value_type is datetime.date:
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+def _select(rows: Iterable[Sequence], columns: Optional[List[int]], pad: bool,
+            convert: Optional[Callable] = None) -> Iterator[tuple]:
+    """按 XlsxReader.iter_rows 的约定选择列；pad 为假时去掉各行末尾的空单元格
+
+    convert 不为 None 时先对每个单元格调用（见 stream_value）。
+    """
+    for row in rows:
+        if convert is not None:
+            row = [convert(value) for value in row]
+        if columns is not None:
+            size = len(row)
+            yield tuple(row[c] if c < size else None for c in columns)
+        elif pad:
+            yield tuple(row)
+        else:
+            end = len(row)
+            while end and row[end - 1] is None:
+                end -= 1
+            yield tuple(row[:end])
+
+class _Workbook(ABC):
+    """openpyxl / calamine 引擎的公共部分"""
+
+    sheet_names: List[str] = []
+    active_sheet: Optional[str] = None
+
+    @abstractmethod
+    def iter_rows(self, sheet_name: Optional[str] = None, columns: Optional[List[int]] = None,
+                  min_row: Optional[int] = None, max_row: Optional[int] = None,
+                  pad: bool = True) -> Iterator[tuple]:
+        """与 XlsxReader.iter_rows 相同：逐行返回单元格值元组，单元格值的类型与 stream 引擎一致"""
+
+    def resolve_columns(self, spec: str, sheet_name: Optional[str] = None) -> List[int]:
+        from xlsx_reader import parse_columns
+        header = next(self.iter_rows(sheet_name, max_row=1), ())
+        return parse_columns(spec, header)
+
+    def dimension(self, sheet_name: Optional[str] = None) -> Optional[Tuple[int, int, int, int]]:
+        return None
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+class OpenpyxlWorkbook(_Workbook):
+    """openpyxl 只读模式"""
+
+    def __init__(self, file_path: Union[str, Path]):
+        import openpyxl
+        self._book = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        # 图表工作表没有单元格
+        self.sheet_names = [ws.title for ws in self._book.worksheets]
+        active = self._book.active
+        self.active_sheet = active.title if active is not None and active.title in self.sheet_names \
+            else (self.sheet_names[0] if self.sheet_names else None)
+
+    def _sheet(self, sheet_name: Optional[str]):
+        from xlsx_reader import XlsxReadError
+        name = sheet_name or self.active_sheet
+        if name not in self.sheet_names:
+            raise XlsxReadError(f"工作表不存在: {name}")
+        return self._book[name]
+
+    def iter_rows(self, sheet_name=None, columns=None, min_row=None, max_row=None, pad=True):
+        ws = self._sheet(sheet_name)
+        return _select(ws.iter_rows(min_row=min_row, max_row=max_row, values_only=True), columns, pad)
+
+    def dimension(self, sheet_name=None):
+        from xlsx_reader import parse_range
+        try:
+            return parse_range(self._sheet(sheet_name).calculate_dimension())
+        except ValueError:
+            return None
+
+    def close(self) -> None:
+        self._book.close()
+
+class CalamineWorkbook(_Workbook):
+    """python-calamine：用 Rust 解析，工作表整体读入内存"""
+
+    def __init__(self, file_path: Union[str, Path]):
+        from python_calamine import CalamineWorkbook as Book
+        self._book = Book.from_path(str(file_path))
+        self.sheet_names = list(self._book.sheet_names)
+        self.active_sheet = self.sheet_names[0] if self.sheet_names else None
+
+    def iter_rows(self, sheet_name=None, columns=None, min_row=None, max_row=None, pad=True):
+        from xlsx_reader import XlsxReadError
+        name = sheet_name or self.active_sheet
+        if name not in self.sheet_names:
+            raise XlsxReadError(f"工作表不存在: {name}")
+        # 不跳过开头的空行空列，行列与 A1 对齐
+        data = self._book.get_sheet_by_name(name).to_python(skip_empty_area=False)
+        rows = islice(data, (min_row or 1) - 1, max_row)
+        return _select(rows, columns, pad, stream_value)
+
+def open_workbook(file_path: Union[str, Path], engine: str = DEFAULT_ENGINE,
+                  strings_memory: Optional[float] = None):
+    """用指定引擎打开工作簿；strings_memory 只对 stream 引擎有效"""
+    if engine == 'stream':
+        from xlsx_reader import XlsxReader
+        return XlsxReader(file_path, strings_memory)
+    if engine == 'openpyxl':
+        return OpenpyxlWorkbook(file_path)
+    if engine == 'calamine':
+        return CalamineWorkbook(file_path)
+    raise ValueError(f"不支持的读取引擎: {engine}（可选: {', '.join(ENGINES)}）")
+
+# ===== --engine auto =====
+
+def _cache_path() -> Path:
+    from common_utils import get_cache_dir
+    return get_cache_dir() / 'xlsx_engines.json'
+
+def _engine_versions(engines: List[str]) -> Dict[str, str]:
+    from importlib import metadata
+    versions = {}
+    for engine in engines:
+        package = ENGINE_PACKAGES[engine]
+        if package is None:
+            from xlsx_reader import SCRIPT_VERSION as reader_version
+            versions[engine] = reader_version
+        else:
+            try:
+                versions[engine] = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                versions[engine] = 'unknown'
+    return versions
+
+def _write_sample(file_path: Path, rows: int) -> None:
+    """测试工作簿：文本、整数、小数、日期各占若干列"""
+    import datetime
+    from xlsx_writer import XlsxWriter
+    start = datetime.date(2024, 1, 1)
+    with XlsxWriter(file_path) as book:
+        sheet = book.add_sheet('Sheet1')
+        sheet.write_row(['站点', '编号', '水位', '流量', '日期', '备注', '等级', '比例'])
+        for i in range(rows):
+            sheet.write_row([f'站点{i % 500}', i, i * 0.25, (i * 7919) % 100003 / 7,
+                             start + datetime.timedelta(days=i % 3650), f'记录 {i}',
+                             i % 5, (i % 1000) / 1000])
+
+def benchmark_engines(engines: List[str], rows: int = BENCH_ROWS,
+                      repeat: int = BENCH_REPEAT) -> Dict[str, float]:
+    """用各引擎读完同一个测试工作簿，返回各自的最短耗时（秒）；出错的引擎不计入"""
+    import shutil
+    import tempfile
+    work = Path(tempfile.mkdtemp(prefix='xlsx_engines_'))
+    try:
+        sample = work / 'sample.xlsx'
+        _write_sample(sample, rows)
+        timings = {}
+        for engine in engines:
+            best = None
+            try:
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    with open_workbook(sample, engine) as book:
+                        for _ in book.iter_rows(book.sheet_names[0]):
+                            pass
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+            except Exception:
+                continue
+            timings[engine] = round(best, 4)
+        return timings
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def choose_engine(refresh: bool = False) -> Tuple[str, Optional[Dict[str, float]]]:
+    """--engine auto：返回 (引擎, 本次测量的耗时)；使用缓存的结果时耗时为 None"""
+    import json
+    from common_utils import write_json_atomic
+    engines = available_engines()
+    if len(engines) == 1:
+        return engines[0], None
+    versions = _engine_versions(engines)
+    key = f"python={sys.version_info[0]}.{sys.version_info[1]};" + ';'.join(
+        f"{engine}={version}" for engine, version in versions.items())
+    try:
+        with open(_cache_path(), 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if not isinstance(cache, dict):
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    entry = cache.get(key)
+    if not refresh and isinstance(entry, dict) and entry.get('engine') in engines:
+        return entry['engine'], None
+
+    timings = benchmark_engines(engines)
+    engine = min(timings, key=timings.get) if timings else DEFAULT_ENGINE
+    cache[key] = {'engine': engine, 'timings': timings,
+                  'measured': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        write_json_atomic(_cache_path(), cache)
+    except OSError:
+        pass
+    return engine, timings
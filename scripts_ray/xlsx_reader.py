@@ -0,0 +1,965 @@
+#!/usr/bin/env python3
+"""
+XLSX流式读取模块 - 直接解析 zip 中的工作表XML，逐行返回单元格值
+版本: 1.0.0
+作者: tianli
+
+不创建 openpyxl 的单元格对象：工作表XML按 </row> 边界分块，常见写法用正则直接
+匹配行和单元格，其余写法交给 expat 解析，每行以元组返回。
+单元格值与 openpyxl 只读模式 (values_only=True, data_only=True) 一致：
+数字为 int/float，日期按样式的 numFmt 转为 datetime/time/timedelta，
+布尔值为 bool，错误值 (#N/A 等) 和字符串为 str，空单元格为 None。
+"""
+
+import re
+import mmap
+import codecs
+import zipfile
+import tempfile
+import functools
+import itertools
+import datetime
+import posixpath
+from array import array
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from xml.parsers import expat
+from xml.etree import ElementTree
+
+SCRIPT_VERSION = "1.0.0"
+
+READ_CHUNK_SIZE = 1024 * 1024
+# sharedStrings.xml 解压后超过该大小时，共享字符串写入磁盘而不是全部保留在内存中
+DEFAULT_STRINGS_MEMORY_MB = 256
+# 估算 LRU 缓存条数时每个解码后字符串的平均占用
+STRING_CACHE_ENTRY_BYTES = 256
+
+NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+NS_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+
+# 内置数字格式中的日期/时间格式（含中文等东亚区域的 27-36、50-58）
+BUILTIN_DATE_FORMATS = frozenset(list(range(14, 23)) + list(range(27, 37))
+                                 + list(range(45, 48)) + list(range(50, 59)))
+BUILTIN_ELAPSED_FORMATS = frozenset([46])
+
+WINDOWS_EPOCH = datetime.datetime(1899, 12, 30)
+MAC_EPOCH = datetime.datetime(1904, 1, 1)
+SECONDS_PER_DAY = 86400
+
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\\.|_.|\*.')
+_FORMAT_ELAPSED = re.compile(r'\[(h+|m+|s+)\]', re.IGNORECASE)
+_FORMAT_BRACKETS = re.compile(r'\[[^\]]*\]')
+_FORMAT_DATE_CHARS = re.compile(r'[dmyhse]', re.IGNORECASE)
+_CELL_REF = re.compile(r'([A-Z]+)(\d+)')
+_COLUMN_LETTERS = re.compile(r'[A-Z]{1,3}')
+
+class XlsxReadError(ValueError):
+    """XLSX文件结构无法识别"""
+
+class _StopParsing(Exception):
+    pass
+
+def column_index(letters: str) -> int:
+    """列字母转为从 0 开始的列号，例如 A -> 0, AB -> 27"""
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+def column_letter(index: int) -> str:
+    """从 0 开始的列号转为列字母"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def parse_range(ref: str) -> Optional[Tuple[int, int, int, int]]:
+    """解析 A1:H20 形式的区域，返回 (起始行, 起始列, 结束行, 结束列)，行列均从 1 开始"""
+    cells = _CELL_REF.findall(ref.upper().replace('$', ''))
+    if not cells:
+        return None
+    (c1, r1), (c2, r2) = cells[0], cells[-1]
+    return int(r1), column_index(c1) + 1, int(r2), column_index(c2) + 1
+
+def parse_row_range(spec: str) -> Tuple[int, Optional[int]]:
+    """解析 START:END 形式的行范围（从 1 开始，含两端），两端都可省略，例如 100:、:500、7"""
+    start, sep, end = spec.strip().partition(':')
+    try:
+        first = int(start) if start.strip() else 1
+        last = int(end) if end.strip() else None
+        if not sep:
+            last = first
+    except ValueError:
+        raise ValueError(f"无效的行范围: {spec}") from None
+    if first < 1 or (last is not None and last < first):
+        raise ValueError(f"无效的行范围: {spec}")
+    return first, last
+
+def parse_columns(spec: str, header: Sequence = ()) -> List[int]:
+    """把 A,C:F 或 列名,列名 形式的列选择解析为从 0 开始的列号列表（保持给定顺序）
+
+    与表头某列完全相同的项按列名处理，否则按列字母或列字母区间处理。
+    """
+    names = {}
+    for index, value in enumerate(header):
+        if value is not None:
+            names.setdefault(str(value).strip(), index)
+    columns = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if item in names:
+            columns.append(names[item])
+            continue
+        first, _, last = item.upper().partition(':')
+        if not _COLUMN_LETTERS.fullmatch(first) or (last and not _COLUMN_LETTERS.fullmatch(last)):
+            raise ValueError(f"未知的列: {item}")
+        start, stop = column_index(first), column_index(last or first)
+        step = 1 if stop >= start else -1
+        columns.extend(range(start, stop + step, step))
+    if not columns:
+        raise ValueError(f"未指定任何列: {spec}")
+    return columns
+
+def date_format_kind(format_code: str) -> Optional[str]:
+    """判断数字格式是否为日期格式：返回 'elapsed'（[h]:mm 等累计时间）、'date' 或 None"""
+    code = _FORMAT_LITERALS.sub('', format_code)
+    if _FORMAT_ELAPSED.search(code):
+        return 'elapsed'
+    code = _FORMAT_BRACKETS.sub('', code).split(';')[0]
+    if code.lower() == 'general':
+        return None
+    # 科学计数法中的 E 不是日期字符
+    code = re.sub(r'[eE][+-]', '', code)
+    return 'date' if _FORMAT_DATE_CHARS.search(code) else None
+
+def from_excel(value: float, epoch: datetime.datetime = WINDOWS_EPOCH, elapsed: bool = False):
+    """Excel 序列日期转为 datetime；小于 1 的值转为 time，累计时间格式转为 timedelta"""
+    if elapsed:
+        return datetime.timedelta(milliseconds=round(value * SECONDS_PER_DAY * 1000))
+    day, fraction = divmod(value, 1)
+    diff = datetime.timedelta(milliseconds=round(fraction * SECONDS_PER_DAY * 1000))
+    if 0 <= value < 1 and diff.days == 0:
+        return (datetime.datetime.min + diff).time()
+    # 1900 日期系统把 1900-02-29 当作存在的日期
+    if 0 < value < 60 and epoch == WINDOWS_EPOCH:
+        day += 1
+    return epoch + datetime.timedelta(days=day) + diff
+
+def _local(name: str) -> str:
+    return name.rpartition(':')[2]
+
+def _part_path(base: str, target: str) -> str:
+    """把关系中的 Target 解析为 zip 内的路径"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+class SpilledStrings:
+    """写入磁盘的共享字符串表
+
+    各字符串的 UTF-8 字节依次写入临时文件并以只读方式内存映射，内存中只保留
+    偏移量索引（每个字符串 8 字节）和最近用到的解码结果（LRU，条数有上限）。
+    """
+
+    def __init__(self, cache_entries: int):
+        self._file = tempfile.TemporaryFile(prefix='xlsx_strings_')
+        self._offsets = array('Q', [0])
+        self._size = 0
+        self._buffer = None
+        self.get = functools.lru_cache(maxsize=cache_entries)(self._decode)
+
+    def extend(self, texts) -> None:
+        encoded = [text.encode('utf-8') for text in texts]
+        self._file.write(b''.join(encoded))
+        self._offsets.extend(itertools.accumulate(map(len, encoded), initial=self._size))
+        # accumulate 的第一项是写入前的偏移量，已在索引末尾
+        del self._offsets[-len(encoded) - 1]
+        self._size = self._offsets[-1]
+
+    def finish(self) -> None:
+        """写入结束后建立内存映射"""
+        self._file.flush()
+        if self._size:
+            self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _decode(self, index: int) -> str:
+        if index < 0:
+            raise IndexError(index)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._buffer[start:end].decode('utf-8') if end > start else ''
+
+    def __getitem__(self, index: int) -> str:
+        return self.get(index)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def close(self) -> None:
+        self.get.cache_clear()
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer = None
+        self._file.close()
+
+class XlsxReader:
+    """XLSX工作簿的流式读取器
+
+    用法:
+        with XlsxReader(path) as book:
+            for row in book.iter_rows(book.sheet_names[0]):
+                ...
+
+    strings_memory_mb 限制共享字符串表的内存占用：sharedStrings.xml 解压后超过
+    该大小时改用 SpilledStrings，解码结果的 LRU 缓存约占其中一半。
+    """
+
+    def __init__(self, file_path: Union[str, Path], strings_memory_mb: Optional[float] = None):
+        self.file_path = Path(file_path)
+        self.strings_memory_mb = DEFAULT_STRINGS_MEMORY_MB if strings_memory_mb is None \
+            else strings_memory_mb
+        try:
+            self.zip = zipfile.ZipFile(self.file_path)
+        except zipfile.BadZipFile as e:
+            raise XlsxReadError(f"不是有效的XLSX文件: {self.file_path.name}") from e
+        self._shared_strings = None
+        try:
+            self._read_workbook()
+            self._read_styles()
+        except BaseException:
+            self.zip.close()
+            raise
+
+    # ===== 工作簿结构 =====
+
+    def _workbook_part(self) -> str:
+        rels = self._parse_xml('_rels/.rels')
+        if rels is not None:
+            for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+                if rel.get('Type', '').endswith('/officeDocument'):
+                    return _part_path('', rel.get('Target'))
+        return 'xl/workbook.xml'
+
+    def _parse_xml(self, part: str):
+        try:
+            with self.zip.open(part) as f:
+                return ElementTree.parse(f).getroot()
+        except KeyError:
+            return None
+
+    def _read_workbook(self) -> None:
+        self.workbook_part = self._workbook_part()
+        root = self._parse_xml(self.workbook_part)
+        if root is None:
+            raise XlsxReadError(f"缺少工作簿定义: {self.workbook_part}")
+
+        rels_part = posixpath.join(posixpath.dirname(self.workbook_part), '_rels',
+                                   posixpath.basename(self.workbook_part) + '.rels')
+        rels = self._parse_xml(rels_part)
+        targets = {}
+        self.shared_strings_part = self.styles_part = None
+        if rels is not None:
+            for rel in rels.iter(f'{{{NS_PKG_REL}}}Relationship'):
+                path = _part_path(self.workbook_part, rel.get('Target', ''))
+                targets[rel.get('Id')] = path
+                rel_type = rel.get('Type', '')
+                if rel_type.endswith('/sharedStrings'):
+                    self.shared_strings_part = path
+                elif rel_type.endswith('/styles'):
+                    self.styles_part = path
+
+        properties = root.find(f'{{{NS_MAIN}}}workbookPr')
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+        self._sheet_parts = {}
+        self.sheet_names: List[str] = []
+        self.sheet_states = {}
+        for sheet in root.iter(f'{{{NS_MAIN}}}sheet'):
+            part = targets.get(sheet.get(f'{{{NS_REL}}}id'))
+            if part is None:
+                continue
+            name = sheet.get('name')
+            self.sheet_names.append(name)
+            self._sheet_parts[name] = part
+            self.sheet_states[name] = sheet.get('state', 'visible')
+
+        view = root.find(f'{{{NS_MAIN}}}bookViews/{{{NS_MAIN}}}workbookView')
+        active = int(view.get('activeTab', 0)) if view is not None else 0
+        self.active_sheet = self.sheet_names[active] if 0 <= active < len(self.sheet_names) else \
+            (self.sheet_names[0] if self.sheet_names else None)
+
+    def _read_styles(self) -> None:
+        """记录使用日期格式的样式序号（字符串形式，直接与单元格的 s 属性比较）"""
+        self.date_styles = set()
+        self.elapsed_styles = set()
+        root = self._parse_xml(self.styles_part) if self.styles_part else None
+        if root is None:
+            return
+        custom = {}
+        for fmt in root.iter(f'{{{NS_MAIN}}}numFmt'):
+            custom[int(fmt.get('numFmtId'))] = fmt.get('formatCode', '')
+        cell_xfs = root.find(f'{{{NS_MAIN}}}cellXfs')
+        if cell_xfs is None:
+            return
+        for index, xf in enumerate(cell_xfs.iter(f'{{{NS_MAIN}}}xf')):
+            fmt_id = int(xf.get('numFmtId', 0))
+            if fmt_id in custom:
+                kind = date_format_kind(custom[fmt_id])
+            elif fmt_id in BUILTIN_DATE_FORMATS:
+                kind = 'elapsed' if fmt_id in BUILTIN_ELAPSED_FORMATS else 'date'
+            else:
+                kind = None
+            if kind:
+                self.date_styles.add(str(index))
+                if kind == 'elapsed':
+                    self.elapsed_styles.add(str(index))
+
+    # ===== 共享字符串 =====
+
+    @property
+    def shared_strings(self) -> Union[list, SpilledStrings]:
+        """共享字符串表；较小时为列表，超过内存预算时为 SpilledStrings"""
+        if self._shared_strings is None:
+            self._shared_strings = self._load_shared_strings()
+        return self._shared_strings
+
+    def _shared_lookup(self):
+        strings = self.shared_strings
+        return strings.get if isinstance(strings, SpilledStrings) else strings.__getitem__
+
+    def _load_shared_strings(self) -> Union[list, SpilledStrings]:
+        info = self.zip.NameToInfo.get(self.shared_strings_part or '')
+        if info is None:
+            return []
+        budget = self.strings_memory_mb * 1024 * 1024
+        if info.file_size > budget:
+            strings = SpilledStrings(max(1024, int(budget / 2 / STRING_CACHE_ENTRY_BYTES)))
+        else:
+            strings = []
+        try:
+            with self.zip.open(self.shared_strings_part) as f:
+                _read_shared_strings(f, strings.extend)
+        except BaseException:
+            if isinstance(strings, SpilledStrings):
+                strings.close()
+            raise
+        if isinstance(strings, SpilledStrings):
+            strings.finish()
+        return strings
+
+    # ===== 工作表 =====
+
+    def dimension(self, sheet_name: Optional[str] = None) -> Optional[Tuple[int, int, int, int]]:
+        """工作表XML中 <dimension> 记录的使用区域（可能与实际数据不符）"""
+        part = self.sheet_part(sheet_name)
+        found = []
+
+        def start(name, attrs):
+            name = _local(name)
+            if name == 'dimension':
+                found.append(parse_range(attrs.get('ref', '')))
+                raise _StopParsing
+            if name == 'sheetData':
+                raise _StopParsing
+
+        parser = expat.ParserCreate()
+        parser.StartElementHandler = start
+        with self.zip.open(part) as f:
+            try:
+                while True:
+                    chunk = f.read(64 * 1024)
+                    parser.Parse(chunk, not chunk)
+                    if not chunk:
+                        break
+            except _StopParsing:
+                pass
+        return found[0] if found else None
+
+    def sheet_part(self, sheet_name: Optional[str] = None) -> str:
+        """工作表在 zip 中的部件路径，例如 xl/worksheets/sheet1.xml"""
+        if sheet_name is None:
+            sheet_name = self.active_sheet
+        try:
+            return self._sheet_parts[sheet_name]
+        except KeyError:
+            raise XlsxReadError(f"工作表不存在: {sheet_name}") from None
+
+    def iter_rows(self, sheet_name: Optional[str] = None, columns: Optional[List[int]] = None,
+                  min_row: Optional[int] = None, max_row: Optional[int] = None,
+                  pad: bool = True) -> Iterator[tuple]:
+        """逐行返回工作表的单元格值元组，行列都从 A1 开始
+
+        与 openpyxl 只读模式一致：中间缺失的行以全 None 的行补齐，各行按 <dimension>
+        记录的列数用 None 补齐。columns 为从 0 开始的列号列表，只输出这些列（按给定
+        顺序），其余单元格不做转换；min_row/max_row 为从 1 开始的行号范围（含两端），
+        读到 max_row 之后不再解析剩余的XML。pad 为假时不按 <dimension> 补齐列，
+        各行只到最后一个单元格为止（配合 trim_rows 处理虚高的使用区域）。
+        """
+        part = self.sheet_part(sheet_name)
+        parser = _SheetParser(self._shared_lookup(), self.date_styles, self.elapsed_styles, self.epoch,
+                              columns, min_row or 1, max_row, pad)
+        with self.zip.open(part) as f:
+            yield from parser.parse(f)
+
+    def resolve_columns(self, spec: str, sheet_name: Optional[str] = None) -> List[int]:
+        """把 --columns 参数解析为列号列表；与第一行表头同名的项按列名处理，其余按列字母处理"""
+        header = next(self.iter_rows(sheet_name, max_row=1), ())
+        return parse_columns(spec, header)
+
+    # ===== 资源管理 =====
+
+    def close(self) -> None:
+        if isinstance(self._shared_strings, SpilledStrings):
+            self._shared_strings.close()
+        self._shared_strings = None
+        self.zip.close()
+
+    def __enter__(self) -> 'XlsxReader':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+# ===== 工作表解析 =====
+
+# 快速路径：<sheetData> 按 </row> 边界切块，用正则逐个匹配行和单元格。
+# 块内有正则不认识的结构（单元格缺少 r 属性、带格式的换行、CDATA、扩展元素等）时，
+# 匹配数与元素数对不上，该块改用 expat 解析，结果完全相同。
+_TOKEN = re.compile(
+    r'<row\b([^>]*)>'
+    r'|<c r="([A-Z]+)\d+"([^>]*?)(?:/>|>(?:<f\b[^>]*?(?:/>|>[^<]*</f>))?'
+    r'(?:<v>([^<]*)</v>|<v/>|<is>(.*?)</is>)?</c>)', re.S)
+DATE_CACHE_SIZE = 65536
+_SHEET_DATA = re.compile(r'<(?:(\w+):)?sheetData\b[^>]*?(/?)>')
+_DIMENSION = re.compile(r'<(?:\w+:)?dimension\b[^>]*?\bref="([^"]*)"')
+_ROW_NUMBER = re.compile(r'\br="(\d+)"')
+_CELL_TYPE = re.compile(r'\bt="([^"]*)"')
+_CELL_STYLE = re.compile(r'\bs="([^"]*)"')
+_INLINE_TEXT = re.compile(r'<t\b[^>]*>([^<]*)</t>')
+_PHONETIC = re.compile(r'<rPh\b.*?</rPh>', re.S)
+
+_ENTITY = re.compile(r'&(?:#(\d+)|#x([0-9a-fA-F]+)|(amp|lt|gt|quot|apos));')
+_NAMED_ENTITIES = {'amp': '&', 'lt': '<', 'gt': '>', 'quot': '"', 'apos': "'"}
+
+def _entity(match) -> str:
+    decimal, hexadecimal, name = match.groups()
+    if name:
+        return _NAMED_ENTITIES[name]
+    return chr(int(decimal) if decimal else int(hexadecimal, 16))
+
+def _xml_text(text: str) -> str:
+    """按 XML 规范统一换行符并还原实体引用（&#13; 等字符引用保留原样的回车）"""
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if '&' in text:
+        if '&#' in text:
+            return _ENTITY.sub(_entity, text)
+        # 只有预定义实体时逐个替换，&amp; 放在最后以免重复还原
+        text = text.replace('&lt;', '<').replace('&gt;', '>').replace('&quot;', '"') \
+            .replace('&apos;', "'").replace('&amp;', '&')
+    return text
+
+def _cell_attrs(attrs: str) -> Tuple[Optional[str], Optional[str]]:
+    cell_type = _CELL_TYPE.search(attrs)
+    style = _CELL_STYLE.search(attrs)
+    return (cell_type.group(1) if cell_type else None, style.group(1) if style else None)
+
+def _xml_decoder(head: bytes):
+    """按 BOM 选择解码器；工作表XML几乎总是 UTF-8"""
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return codecs.getincrementaldecoder('utf-16')()
+    return codecs.getincrementaldecoder('utf-8-sig')()
+
+class _SheetParser:
+    """把一个工作表的XML流转换为行元组，维护补齐空行和列所需的状态
+
+    columns 为要输出的列号（从 0 开始，按给定顺序输出），其余单元格不做转换；
+    min_row/max_row 限定输出的行号范围（从 1 开始，含两端），超过 max_row 后停止解析。
+    """
+
+    def __init__(self, shared_lookup, date_styles, elapsed_styles, epoch,
+                 columns: Optional[List[int]] = None, min_row: int = 1,
+                 max_row: Optional[int] = None, pad: bool = True):
+        self.shared = shared_lookup
+        self.date_styles = date_styles
+        self.elapsed_styles = elapsed_styles
+        self.epoch = epoch
+        # 列字母 -> 输出位置；投影模式下不输出的列为 -1
+        self.slots = {}
+        self.projection = {col: pos for pos, col in reversed(list(enumerate(columns)))} \
+            if columns is not None else None
+        self.min_row = max(min_row or 1, 1)
+        self.max_row = max_row
+        self.done = False
+        self.kinds = {}
+        self.dates = {}
+        self.rows = []
+        self.row = []
+        self.row_open = False
+        self.skip_row = False
+        self.last_col = -1
+        self.next_row = 1
+        self.width = len(columns) if columns is not None else 0
+        self.pad = pad
+        self.prefix = None
+
+    def _slot(self, col: int) -> int:
+        if self.projection is None:
+            return col
+        return self.projection.get(col, -1)
+
+    def _new_row(self) -> list:
+        return [None] * self.width if self.projection is not None else []
+
+    # ----- 行状态 -----
+
+    def _open_row(self, index: Optional[int]) -> bool:
+        """开始新的一行；超过 max_row 时返回 False"""
+        self._close_row()
+        if index is None:
+            index = self.next_row
+        # 超过 max_row 时只补齐 max_row 之前缺失的行
+        stop = index if self.max_row is None else min(index, self.max_row + 1)
+        while self.next_row < stop:
+            if self.next_row >= self.min_row:
+                self.rows.append((None,) * self.width)
+            self.next_row += 1
+        if self.max_row is not None and index > self.max_row:
+            self.done = True
+            return False
+        self.row = self._new_row()
+        self.row_open = True
+        self.skip_row = index < self.min_row
+        self.last_col = -1
+        return True
+
+    def _close_row(self) -> None:
+        if not self.row_open:
+            return
+        row = self.row
+        if not self.skip_row:
+            if len(row) < self.width:
+                row.extend([None] * (self.width - len(row)))
+            self.rows.append(tuple(row))
+        self.next_row += 1
+        self.row_open = False
+
+    def _value(self, cell_type: Optional[str], style: Optional[str], text: Optional[str]):
+        if not text:
+            return None
+        if cell_type is None or cell_type == 'n':
+            if style in self.date_styles:
+                return from_excel(float(text), self.epoch, style in self.elapsed_styles)
+            if '.' in text or 'E' in text or 'e' in text:
+                return float(text)
+            try:
+                return int(text)
+            except ValueError:
+                return float(text)
+        if cell_type == 's':
+            return self.shared(int(text))
+        if cell_type == 'b':
+            return text == '1' or text == 'true'
+        if cell_type == 'd':
+            try:
+                return datetime.datetime.fromisoformat(text.rstrip('Z'))
+            except ValueError:
+                return text
+        # inlineStr、str (公式字符串) 和 e (错误值) 都按字符串返回
+        return text
+
+    # ----- 正则快速路径 -----
+
+    def _cell_kind(self, attrs: str) -> tuple:
+        """按单元格属性归类：数字、日期、共享字符串、布尔或其他，结果按属性字符串缓存"""
+        cell_type, style = _cell_attrs(attrs)
+        if cell_type is None or cell_type == 'n':
+            kind = 'date' if style in self.date_styles else 'number'
+        elif cell_type in ('s', 'b'):
+            kind = cell_type
+        else:
+            kind = 'other'
+        return kind, cell_type, style
+
+    def _fast_chunk(self, chunk: str) -> bool:
+        tokens = _TOKEN.findall(chunk)
+        # 单元格和行是 <sheetData> 中仅有的以 <c、<row 开头的元素
+        if len(tokens) != chunk.count('<c') + chunk.count('<row'):
+            return False
+        shared = self.shared
+        slots = self.slots
+        kinds = self.kinds
+        dates = self.dates
+        # 行状态放在局部变量中，块结束时写回；与 _open_row/_close_row 的逻辑相同
+        output = self.rows
+        width = self.width
+        empty = (None,) * width
+        blank = self._new_row()
+        min_row = self.min_row
+        max_row = self.max_row
+        next_row = self.next_row
+        row_open = self.row_open
+        skip_row = self.skip_row
+        row = self.row
+        for row_attrs, letters, attrs, text, inline in tokens:
+            if not letters:
+                # 自闭合的 <row/> 没有单元格，同样留到下一行开始或块结束时输出
+                if row_open:
+                    if not skip_row:
+                        if len(row) < width:
+                            row.extend([None] * (width - len(row)))
+                        output.append(tuple(row))
+                    next_row += 1
+                    row_open = False
+                number = _ROW_NUMBER.search(row_attrs)
+                index = int(number.group(1)) if number else next_row
+                stop = index if max_row is None else min(index, max_row + 1)
+                while next_row < stop:
+                    if next_row >= min_row:
+                        output.append(empty)
+                    next_row += 1
+                if max_row is not None and index > max_row:
+                    self.done = True
+                    break
+                row = blank.copy()
+                row_open = True
+                skip_row = index < min_row
+                continue
+            if skip_row:
+                continue
+
+            col = slots.get(letters)
+            if col is None:
+                col = slots[letters] = self._slot(column_index(letters))
+            if col < 0:
+                continue
+
+            cached = kinds.get(attrs)
+            if cached is None:
+                cached = kinds[attrs] = self._cell_kind(attrs)
+            kind = cached[0]
+            if inline:
+                value = _INLINE_TEXT.findall(_PHONETIC.sub('', inline) if '<rPh' in inline else inline)
+                value = _xml_text(''.join(value)) or None
+            elif not text:
+                value = None
+            elif kind == 'number':
+                if '.' in text or 'E' in text or 'e' in text:
+                    value = float(text)
+                else:
+                    value = int(text)
+            elif kind == 's':
+                value = shared(int(text))
+            elif kind == 'date':
+                # 同一列的日期大量重复，按原始文本缓存转换结果
+                value = dates.get(text)
+                if value is None:
+                    if len(dates) >= DATE_CACHE_SIZE:
+                        dates.clear()
+                    value = dates[text] = self._value(cached[1], cached[2], text)
+            elif kind == 'b':
+                value = text == '1' or text == 'true'
+            else:
+                value = self._value(cached[1], cached[2], _xml_text(text))
+
+            # 投影模式下行已按输出列数预先分配，总是走最后一个分支
+            size = len(row)
+            if col == size:
+                row.append(value)
+            elif col > size:
+                row.extend([None] * (col - size))
+                row.append(value)
+            else:
+                row[col] = value
+        self.row, self.row_open, self.skip_row, self.next_row = row, row_open, skip_row, next_row
+        self._close_row()
+        return True
+
+    def _skip_chunk(self, chunk: str) -> bool:
+        """整块都在 min_row 之前时不解析单元格，只推进行号"""
+        if self.next_row >= self.min_row or self.prefix:
+            return False
+        start = chunk.rfind('<row')
+        if start < 0:
+            return False
+        number = _ROW_NUMBER.search(chunk, start, chunk.find('>', start))
+        if number is None or int(number.group(1)) >= self.min_row:
+            return False
+        self.next_row = int(number.group(1)) + 1
+        return True
+
+    # ----- expat 解析 -----
+
+    def _expat_chunk(self, chunk: str) -> None:
+        """用 expat 解析一段 <row> 序列，处理正则快速路径不认识的写法"""
+        parts = []
+        cell = {'col': 0, 'type': None, 'style': None, 'has_value': False}
+        flags = {'collect': False, 'inline': False, 'phonetic': 0}
+
+        def start(name, attrs):
+            name = _local(name)
+            if name == 'c':
+                ref = attrs.get('r')
+                letters = ref.rstrip('0123456789') if ref else ''
+                cell['col'] = column_index(letters) if letters else self.last_col + 1
+                self.last_col = cell['col']
+                cell['type'] = attrs.get('t')
+                cell['style'] = attrs.get('s')
+                cell['has_value'] = False
+                del parts[:]
+            elif name == 'v':
+                del parts[:]
+                flags['collect'] = cell['has_value'] = True
+            elif name == 't':
+                if flags['inline'] and not flags['phonetic']:
+                    flags['collect'] = cell['has_value'] = True
+            elif name == 'row':
+                index = attrs.get('r')
+                if not self._open_row(int(index) if index else None):
+                    raise _StopParsing()
+            elif name == 'is':
+                flags['inline'] = True
+            elif name == 'rPh':
+                flags['phonetic'] += 1
+
+        def end(name):
+            name = _local(name)
+            if name == 'v' or name == 't':
+                flags['collect'] = False
+            elif name == 'c':
+                col = self._slot(cell['col'])
+                if self.skip_row or col < 0:
+                    return
+                text = ''.join(parts) if cell['has_value'] else None
+                value = self._value(cell['type'], cell['style'], text)
+                row = self.row
+                if col >= len(row):
+                    row.extend([None] * (col - len(row)))
+                    row.append(value)
+                else:
+                    row[col] = value
+            elif name == 'row':
+                self._close_row()
+            elif name == 'is':
+                flags['inline'] = False
+            elif name == 'rPh':
+                flags['phonetic'] -= 1
+
+        def text(data):
+            if flags['collect']:
+                parts.append(data)
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+        try:
+            parser.Parse('<sheetData>' + chunk + '</sheetData>', True)
+        except _StopParsing:
+            pass
+        self._close_row()
+
+    # ----- 整体流程 -----
+
+    def _parse_chunk(self, chunk: str) -> None:
+        if self._skip_chunk(chunk):
+            return
+        if self.prefix or not self._fast_chunk(chunk):
+            self._expat_chunk(chunk)
+
+    def parse(self, stream) -> Iterator[tuple]:
+        decoder = None
+        buffer = ''
+        in_body = False
+        row_close = data_close = ''
+        while True:
+            data = stream.read(READ_CHUNK_SIZE)
+            if decoder is None:
+                decoder = _xml_decoder(data)
+            buffer += decoder.decode(data, final=not data)
+
+            if not in_body:
+                match = _SHEET_DATA.search(buffer)
+                if match is None:
+                    if not data:
+                        return
+                    continue
+                dimension = _DIMENSION.search(buffer, 0, match.start())
+                extent = parse_range(dimension.group(1)) if dimension else None
+                if self.pad and self.projection is None and extent and (extent[2] > 1 or extent[3] > 1):
+                    self.width = extent[3]
+                self.prefix = match.group(1)
+                prefix = f'{self.prefix}:' if self.prefix else ''
+                row_close, data_close = f'</{prefix}row>', f'</{prefix}sheetData>'
+                if match.group(2):
+                    return
+                buffer = buffer[match.end():]
+                in_body = True
+
+            end = buffer.find(data_close)
+            if end >= 0 or not data:
+                self._parse_chunk(buffer[:end] if end >= 0 else buffer)
+                yield from self.rows
+                return
+            cut = buffer.rfind(row_close)
+            if cut < 0:
+                continue
+            cut += len(row_close)
+            self._parse_chunk(buffer[:cut])
+            buffer = buffer[cut:]
+            yield from self.rows
+            del self.rows[:]
+            if self.done:
+                return
+
+# ===== 共享字符串解析 =====
+
+# 与工作表相同：按 </si> 边界分块，纯文本字符串用正则匹配，其余块 (富文本、注音等) 交给 expat
+_SHARED_PLAIN = re.compile(r'<si><t(?: xml:space="preserve")?>([^<]*)</t></si>')
+_SST_START = re.compile(r'<(?:(\w+):)?sst\b[^>]*?(/?)>')
+
+def _expat_shared_chunk(chunk: str) -> list:
+    strings = []
+    parts = []
+    state = {'collect': False, 'phonetic': 0}
+
+    def start(name, attrs):
+        name = _local(name)
+        if name == 't':
+            state['collect'] = not state['phonetic']
+        elif name == 'si':
+            del parts[:]
+        elif name == 'rPh':
+            state['phonetic'] += 1
+
+    def end(name):
+        name = _local(name)
+        if name == 't':
+            state['collect'] = False
+        elif name == 'si':
+            strings.append(''.join(parts))
+        elif name == 'rPh':
+            state['phonetic'] -= 1
+
+    def text(data):
+        if state['collect']:
+            parts.append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    parser.Parse('<sst>' + chunk + '</sst>', True)
+    return strings
+
+def _read_shared_strings(stream, extend) -> None:
+    """按顺序把 sharedStrings.xml 中的字符串分批交给 extend"""
+    decoder = None
+    buffer = ''
+    prefix = None
+    si_close = sst_close = ''
+
+    def parse_chunk(chunk):
+        if not prefix:
+            items = _SHARED_PLAIN.findall(chunk)
+            if len(items) == chunk.count('<si'):
+                # XML 文本中不会出现 \x00，整块拼接后一次性还原实体再拆开
+                if items:
+                    extend(_xml_text('\x00'.join(items)).split('\x00'))
+                return
+        extend(_expat_shared_chunk(chunk))
+
+    while True:
+        data = stream.read(READ_CHUNK_SIZE)
+        if decoder is None:
+            decoder = _xml_decoder(data)
+        buffer += decoder.decode(data, final=not data)
+
+        if not sst_close:
+            match = _SST_START.search(buffer)
+            if match is None:
+                if not data:
+                    return
+                continue
+            if match.group(2):
+                return
+            prefix = match.group(1)
+            tag = f'{prefix}:' if prefix else ''
+            si_close, sst_close = f'</{tag}si>', f'</{tag}sst>'
+            buffer = buffer[match.end():]
+
+        end = buffer.find(sst_close)
+        if end >= 0 or not data:
+            parse_chunk(buffer[:end] if end >= 0 else buffer)
+            return
+        cut = buffer.rfind(si_close)
+        if cut < 0:
+            continue
+        cut += len(si_close)
+        parse_chunk(buffer[:cut])
+        buffer = buffer[cut:]
+
+# ===== 去掉虚高的使用区域 =====
+
+def trim_width(book, sheet_name: Optional[str] = None,
+               columns: Optional[List[int]] = None) -> Optional[int]:
+    """trim_rows 补齐到的列数：--columns 选择的列数，否则为 <dimension> 记录的最后一列"""
+    if columns is not None:
+        return len(columns)
+    dimension = book.dimension(sheet_name)
+    return dimension[3] if dimension else None
+
+def trim_rows(rows: Iterable[tuple], extent: Optional[dict] = None,
+              width: Optional[int] = None) -> Iterator[tuple]:
+    """边读边输出，去掉末尾的空行和各行末尾的空单元格
+
+    整列设置格式、残留的 <dimension> 等会让工作表的使用区域远大于实际数据。
+    连续的空行只记数，遇到非空行时才补写出来，因此末尾的空行不会输出。各行去掉末尾的
+    空单元格后补齐到 width 列（调用方预先知道的列数，见 trim_width），遇到更宽的行时
+    按该行的列数继续补齐。extent 不为 None 时写入实际的行数、列数和丢弃的末尾空行数。
+    """
+    pad_to = width or 0
+    columns = 0
+    written = 0
+    pending = 0
+    for row in rows:
+        end = len(row)
+        while end and (row[end - 1] is None or row[end - 1] == ''):
+            end -= 1
+        if not end:
+            pending += 1
+            continue
+        if end > columns:
+            columns = end
+            if end > pad_to:
+                pad_to = end
+        if pending:
+            blank = (None,) * pad_to
+            for _ in range(pending):
+                yield blank
+            written += pending
+            pending = 0
+        if end == pad_to == len(row):
+            yield row
+        else:
+            yield tuple(row[:end]) + (None,) * (pad_to - end)
+        written += 1
+    if extent is not None:
+        extent.update(rows=written, columns=columns, trimmed_rows=pending)
+
+def describe_extent(extent: dict, dimension: Optional[Tuple[int, int, int, int]] = None) -> str:
+    """trim_rows 统计结果的说明文字，附上 <dimension> 记录的区域以便对比"""
+    text = f"实际数据 {extent['rows']} 行 × {extent['columns']} 列"
+    if dimension:
+        r1, c1, r2, c2 = dimension
+        text += f"，<dimension> 记录为 {column_letter(c1 - 1)}{r1}:{column_letter(c2 - 1)}{r2}"
+    if extent['trimmed_rows']:
+        text += f"，已去掉末尾空行 {extent['trimmed_rows']} 行"
+    return text
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+XLSX包级拆分模块 - 直接复制 zip 中的部件，把工作表拆为单独的工作簿，不解析单元格
+版本: 1.0.0
+作者: tianli
+
+工作表XML、它引用的部件（绘图、图片、图表、批注、表格等）和主题原样复制；
+styles.xml 只保留该工作表用到的单元格格式 (cellXfs)，共享字符串表只保留用到的字符串，
+工作表中的样式编号和字符串编号按字节用正则改写，因此格式、公式、列宽、合并单元格、
+条件格式都保留。引用其他工作表的公式保持原样（重新计算后为 #REF!），透视表依赖
+工作簿级的数据缓存，不复制。
+
+共享字符串表在主进程中解压到临时目录一次并建立偏移量索引，各工作进程通过内存映射
+按编号取出原始XML，同时拆分多个工作表时不重复解析。
+"""
+
+import re
+import mmap
+import shutil
+import zipfile
+import posixpath
+from array import array
+from itertools import compress
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Union
+
+from xlsx_writer import COMPRESS_LEVEL
+
+SCRIPT_VERSION = "1.0.0"
+
+READ_CHUNK_SIZE = 1024 * 1024
+# 工作表单独存在时无法成立的关系类型
+DROPPED_RELATIONSHIPS = ('/pivotTable',)
+
+_RELATIONSHIP = re.compile(r'<(?:\w+:)?Relationship\b[^>]*>(?:\s*</(?:\w+:)?Relationship>)?')
+_OVERRIDE = re.compile(r'<(?:\w+:)?Override\b[^>]*>(?:\s*</(?:\w+:)?Override>)?')
+_ATTR = re.compile(r'([\w:]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+_SHEETS = re.compile(r'(<(?:\w+:)?sheets\b[^>]*>).*?(</(?:\w+:)?sheets>)', re.S)
+_SHEET = re.compile(r'<(?:\w+:)?sheet\b[^>]*>(?:\s*</(?:\w+:)?sheet>)?')
+_SHEET_STATE = re.compile(r'\sstate\s*=\s*"[^"]*"')
+_DEFINED_NAMES = re.compile(r'(<(?:\w+:)?definedNames\b[^>]*>)(.*?)(</(?:\w+:)?definedNames>)', re.S)
+_DEFINED_NAME = re.compile(r'<(?:\w+:)?definedName\b([^>]*)>(.*?)</(?:\w+:)?definedName>', re.S)
+_LOCAL_SHEET_ID = re.compile(r'\blocalSheetId\s*=\s*"(\d+)"')
+_WORKBOOK_DROPPED = re.compile(r'<(?:\w+:)?(pivotCaches|externalReferences)\b.*?</(?:\w+:)?\1>', re.S)
+_VIEW_INDEX = re.compile(r'\b(activeTab|firstSheet)\s*=\s*"\d+"')
+_CELL_XFS = re.compile(r'(<(?:\w+:)?cellXfs\b[^>]*>)(.*?)(</(?:\w+:)?cellXfs>)', re.S)
+_XF = re.compile(r'<(?:\w+:)?xf\b[^>]*/>|<(?:\w+:)?xf\b[^>]*>.*?</(?:\w+:)?xf>', re.S)
+_COUNT = re.compile(r'\bcount\s*=\s*"\d+"')
+
+# 工作表XML中样式编号（单元格和行的 s、列的 style）和共享字符串编号之前的部分
+_REFERENCES = {
+    'style': rb'<(?:\w+:)?(?:c|row)\b[^>]*?\ss="',
+    'col_style': rb'<(?:\w+:)?col\b[^>]*?\sstyle="',
+    'string': rb'<(?:\w+:)?c\b[^>]*?\st="s"[^>]*>\s*<(?:\w+:)?v>',
+}
+# 收集用：唯一的组为编号；改写用：第 1 组为编号之前的部分，第 2 组为编号
+_SCAN = {kind: re.compile(prefix + rb'(\d+)') for kind, prefix in _REFERENCES.items()}
+_REWRITE = {kind: re.compile(b'(' + prefix + rb')(\d+)') for kind, prefix in _REFERENCES.items()}
+_SST_ROOT = re.compile(rb'<(?:\w+:)?sst\b[^>]*>')
+_SST_COUNTS = re.compile(rb'(\s(?:count|uniqueCount)=")\d+"')
+_SI = re.compile(rb'<(?:\w+:)?si\b')
+
+def _attrs(element: str) -> Dict[str, str]:
+    return {name: value if value or not alt else alt for name, value, alt in _ATTR.findall(element)}
+
+def _resolve(base: str, target: str) -> str:
+    """把关系中的 Target 解析为 zip 内的路径"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+def _rels_part(part: str) -> str:
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, '_rels', name + '.rels')
+
+def _entry(src: zipfile.ZipFile, part: str) -> zipfile.ZipInfo:
+    """新包中与源文件同名部件的条目，沿用其时间和压缩方式（图片等通常不再压缩）"""
+    info = src.getinfo(part)
+    entry = zipfile.ZipInfo(part, date_time=info.date_time)
+    entry.compress_type = info.compress_type
+    return entry
+
+def _sheet_chunks(stream) -> Iterator[bytes]:
+    """按行边界分块读取工作表XML，样式和字符串编号的匹配不会跨块"""
+    pending = b''
+    while True:
+        block = stream.read(READ_CHUNK_SIZE)
+        if not block:
+            if pending:
+                yield pending
+            return
+        data = pending + block
+        cut = max(data.rfind(b'<row'), data.rfind(b':row'))
+        if data[cut:cut + 1] == b':':
+            cut = data.rfind(b'<', 0, cut)
+        if cut <= 0:
+            # 块中没有行的开始（例如超长的一行），继续累积
+            pending = data
+            continue
+        pending = data[cut:]
+        yield data[:cut]
+
+def _remapper(mapping):
+    """_REWRITE 的替换函数：把编号换成 mapping 中的新编号"""
+    def replace(match) -> bytes:
+        prefix, number = match.groups()
+        return prefix + mapping.get(number, number)
+    return replace
+
+class SheetSplitter:
+    """把一个工作簿按工作表拆分为单独工作簿的包级拆分器
+
+    用法:
+        splitter = SheetSplitter(path, work_dir)
+        for name in splitter.sheet_names:
+            splitter.split(name, output_dir / f'{name}.xlsx')
+
+    work_dir 用于存放解压后的共享字符串表，调用者负责清理。对象可以传给工作进程，
+    各进程自行打开源文件。
+    """
+
+    def __init__(self, file_path: Union[str, Path], work_dir: Union[str, Path]):
+        from xlsx_reader import XlsxReader
+
+        self.file_path = Path(file_path)
+        with XlsxReader(self.file_path) as book:
+            self.sheet_names: List[str] = list(book.sheet_names)
+            self.sheet_parts = {name: book.sheet_part(name) for name in self.sheet_names}
+            self.workbook_part = book.workbook_part
+            self.styles_part = book.styles_part
+            self.strings_part = book.shared_strings_part
+            zf = book.zip
+            names = zf.NameToInfo
+            self.workbook_xml = zf.read(self.workbook_part).decode('utf-8')
+            self.workbook_rels_part = _rels_part(self.workbook_part)
+            self.workbook_rels = zf.read(self.workbook_rels_part).decode('utf-8')
+            self.content_types = zf.read('[Content_Types].xml').decode('utf-8')
+            self.styles_xml = zf.read(self.styles_part).decode('utf-8') \
+                if self.styles_part in names else None
+            self.strings_file = self.strings_index = None
+            self.strings_count = 0
+            if self.strings_part in names:
+                self._spill_strings(zf, Path(work_dir))
+
+        relationships = [_attrs(element) for element in _RELATIONSHIP.findall(self.workbook_rels)]
+        self.sheet_rel_ids = {}
+        self.theme_part = None
+        targets = {rel.get('Id'): _resolve(self.workbook_part, rel.get('Target', ''))
+                   for rel in relationships}
+        for rel in relationships:
+            if rel.get('Type', '').endswith('/theme'):
+                self.theme_part = targets[rel.get('Id')]
+        for name, part in self.sheet_parts.items():
+            self.sheet_rel_ids[name] = next(rel_id for rel_id, target in targets.items()
+                                            if target == part)
+
+    def _spill_strings(self, zf: zipfile.ZipFile, work_dir: Path) -> None:
+        """解压共享字符串表并记录每个 <si> 的起始偏移量（最后一项为根元素结束标签的位置）"""
+        self.strings_file = str(work_dir / 'sharedStrings.xml')
+        self.strings_index = str(work_dir / 'sharedStrings.idx')
+        with zf.open(self.strings_part) as source, open(self.strings_file, 'wb') as target:
+            shutil.copyfileobj(source, target, READ_CHUNK_SIZE)
+        offsets = array('Q')
+        with open(self.strings_file, 'rb') as f:
+            if f.seek(0, 2):
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    offsets.extend(match.start() for match in _SI.finditer(data))
+                    if offsets:
+                        offsets.append(data.rfind(b'</'))
+        if not offsets:
+            # 空的共享字符串表原样复制
+            self.strings_file = self.strings_index = None
+            return
+        self.strings_count = len(offsets) - 1
+        with open(self.strings_index, 'wb') as f:
+            offsets.tofile(f)
+
+    # ===== 部件收集 =====
+
+    def _collect(self, zf: zipfile.ZipFile, part: str, parts: Dict[str, Optional[bytes]],
+                 drop_types: tuple = ()) -> None:
+        """把 part 的关系部件及其引用的部件（递归）加入 parts；值为 None 表示原样复制"""
+        rels_part = _rels_part(part)
+        if rels_part not in zf.NameToInfo or rels_part in parts:
+            return
+        text = zf.read(rels_part).decode('utf-8')
+        dropped = False
+        for element in _RELATIONSHIP.findall(text):
+            rel = _attrs(element)
+            if drop_types and rel.get('Type', '').endswith(drop_types):
+                text = text.replace(element, '')
+                dropped = True
+                continue
+            if rel.get('TargetMode') == 'External':
+                continue
+            target = _resolve(part, rel.get('Target', ''))
+            if target in zf.NameToInfo and target not in parts:
+                parts[target] = None
+                self._collect(zf, target, parts)
+        parts[rels_part] = text.encode('utf-8') if dropped else None
+
+    def _workbook(self, sheet_name: str) -> bytes:
+        """只含一个工作表的 workbook.xml"""
+        index = self.sheet_names.index(sheet_name)
+        rel_id = self.sheet_rel_ids[sheet_name]
+        xml = self.workbook_xml
+
+        def keep_sheet(match) -> str:
+            sheets = [element for element in _SHEET.findall(match.group(0))
+                      if rel_id in _attrs(element).values()]
+            # 唯一的工作表不能是隐藏的
+            return match.group(1) + ''.join(_SHEET_STATE.sub('', s) for s in sheets) + match.group(2)
+
+        quoted = "'" + sheet_name.replace("'", "''") + "'!"
+
+        def keep_name(match) -> str:
+            local = _LOCAL_SHEET_ID.search(match.group(1))
+            if local:
+                if int(local.group(1)) != index:
+                    return ''
+                return _LOCAL_SHEET_ID.sub('localSheetId="0"', match.group(0))
+            # 全局名称只保留引用本工作表的
+            text = match.group(2)
+            return match.group(0) if quoted in text or f"{sheet_name}!" in text else ''
+
+        def keep_names(match) -> str:
+            names = _DEFINED_NAME.sub(keep_name, match.group(2))
+            return match.group(1) + names + match.group(3) if names.strip() else ''
+
+        xml = _SHEETS.sub(keep_sheet, xml, count=1)
+        xml = _DEFINED_NAMES.sub(keep_names, xml, count=1)
+        xml = _WORKBOOK_DROPPED.sub('', xml)
+        xml = _VIEW_INDEX.sub(lambda m: f'{m.group(1)}="0"', xml)
+        return xml.encode('utf-8')
+
+    def _workbook_rels(self, sheet_name: str) -> bytes:
+        rel_id = self.sheet_rel_ids[sheet_name]
+
+        def keep(match) -> str:
+            rel = _attrs(match.group(0))
+            if rel.get('Id') == rel_id or rel.get('Type', '').endswith(
+                    ('/styles', '/theme', '/sharedStrings')):
+                return match.group(0)
+            return ''
+        return _RELATIONSHIP.sub(keep, self.workbook_rels).encode('utf-8')
+
+    def _styles(self, used: Set[bytes]) -> tuple:
+        """只保留用到的 cellXfs，返回 (新 styles.xml, 旧编号 -> 新编号)"""
+        match = _CELL_XFS.search(self.styles_xml)
+        if match is None:
+            return self.styles_xml.encode('utf-8'), {}
+        xfs = _XF.findall(match.group(2))
+        kept = sorted({0} | {int(i) for i in used if int(i) < len(xfs)})
+        mapping = {str(old).encode(): str(new).encode() for new, old in enumerate(kept)
+                   if old != new}
+        head = _COUNT.sub(f'count="{len(kept)}"', match.group(1), count=1)
+        body = ''.join(xfs[i] for i in kept)
+        xml = self.styles_xml[:match.start()] + head + body + match.group(3) \
+            + self.styles_xml[match.end():]
+        # 不在 cellXfs 范围内的编号（损坏的文件）改为默认格式
+        mapping.update({i: b'0' for i in used if int(i) >= len(xfs)})
+        return xml.encode('utf-8'), mapping
+
+    def _content_types(self, written: Set[str]) -> bytes:
+        def keep(match) -> str:
+            part = _attrs(match.group(0)).get('PartName', '').lstrip('/')
+            return match.group(0) if part in written else ''
+        return _OVERRIDE.sub(keep, self.content_types).encode('utf-8')
+
+    # ===== 拆分 =====
+
+    def _scan(self, zf: zipfile.ZipFile, sheet_part: str) -> tuple:
+        """第一遍：收集工作表用到的样式编号、共享字符串编号和行数"""
+        styles: Set[bytes] = set()
+        strings = bytearray(self.strings_count)
+        rows = 0
+        with zf.open(sheet_part) as stream:
+            for chunk in _sheet_chunks(stream):
+                styles.update(_SCAN['style'].findall(chunk))
+                styles.update(_SCAN['col_style'].findall(chunk))
+                for key in set(_SCAN['string'].findall(chunk)):
+                    index = int(key)
+                    if index < self.strings_count:
+                        strings[index] = 1
+                rows += chunk.count(b'<row ') + chunk.count(b'<row>')
+        return styles, strings, rows
+
+    def _write_strings(self, src: zipfile.ZipFile, dst: zipfile.ZipFile, used: List[int]) -> None:
+        offsets = array('Q')
+        with open(self.strings_index, 'rb') as f:
+            offsets.fromfile(f, self.strings_count + 1)
+        with open(self.strings_file, 'rb') as f, \
+             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+             dst.open(_entry(src, self.strings_part), 'w', force_zip64=True) as out:
+            root = _SST_ROOT.search(data, 0, offsets[0])
+            count = str(len(used)).encode()
+            out.write(_SST_COUNTS.sub(lambda m: m.group(1) + count + b'"', data[:root.end()]))
+            parts = []
+            size = 0
+            for index in used:
+                piece = data[offsets[index]:offsets[index + 1]]
+                parts.append(piece)
+                size += len(piece)
+                if size >= READ_CHUNK_SIZE:
+                    out.write(b''.join(parts))
+                    parts, size = [], 0
+            out.write(b''.join(parts))
+            out.write(data[offsets[-1]:])
+
+    def split(self, sheet_name: str, output_file: Union[str, Path]) -> int:
+        """把一个工作表写为单独的工作簿，返回工作表的行数"""
+        output_file = Path(output_file)
+        sheet_part = self.sheet_parts[sheet_name]
+        temp_file = output_file.with_name(f".{output_file.name}.tmp")
+        try:
+            with zipfile.ZipFile(self.file_path) as src:
+                styles_used, strings_used, rows = self._scan(src, sheet_part)
+                styles_xml, style_map = self._styles(styles_used) if self.styles_xml else (None, {})
+                used = list(compress(range(len(strings_used)), strings_used))
+                string_map = {str(old).encode(): str(new).encode()
+                              for new, old in enumerate(used) if old != new}
+
+                # 原样复制的部件：根关系引用的文档属性、主题、工作表引用的部件
+                parts: Dict[str, Optional[bytes]] = {}
+                root_rels = src.read('_rels/.rels').decode('utf-8')
+                for element in _RELATIONSHIP.findall(root_rels):
+                    rel = _attrs(element)
+                    target = _resolve('', rel.get('Target', ''))
+                    if target != self.workbook_part and target in src.NameToInfo:
+                        parts[target] = None
+                        self._collect(src, target, parts)
+                parts['_rels/.rels'] = None
+                if self.theme_part in src.NameToInfo:
+                    parts[self.theme_part] = None
+                    self._collect(src, self.theme_part, parts)
+                self._collect(src, sheet_part, parts, DROPPED_RELATIONSHIPS)
+                if self.strings_file is None and self.strings_part in src.NameToInfo:
+                    parts[self.strings_part] = None
+
+                generated = {
+                    self.workbook_part: self._workbook(sheet_name),
+                    self.workbook_rels_part: self._workbook_rels(sheet_name),
+                }
+                if styles_xml is not None:
+                    generated[self.styles_part] = styles_xml
+                written = set(parts) | set(generated) | {sheet_part}
+                if self.strings_file:
+                    written.add(self.strings_part)
+
+                with zipfile.ZipFile(temp_file, 'w', zipfile.ZIP_DEFLATED,
+                                     compresslevel=COMPRESS_LEVEL) as dst:
+                    dst.writestr('[Content_Types].xml', self._content_types(written))
+                    for part, data in generated.items():
+                        dst.writestr(part, data)
+                    for part, data in parts.items():
+                        if data is not None:
+                            dst.writestr(part, data)
+                            continue
+                        with src.open(part) as source, \
+                             dst.open(_entry(src, part), 'w', force_zip64=True) as out:
+                            shutil.copyfileobj(source, out, READ_CHUNK_SIZE)
+                    if self.strings_file:
+                        self._write_strings(src, dst, used)
+                    self._write_sheet(src, dst, sheet_part, style_map, string_map)
+            temp_file.replace(output_file)
+            return rows
+        finally:
+            if temp_file.exists():
+                temp_file.unlink()
+
+    def _write_sheet(self, src: zipfile.ZipFile, dst: zipfile.ZipFile, sheet_part: str,
+                     style_map: Dict[bytes, bytes], string_map: Dict[bytes, bytes]) -> None:
+        """第二遍：复制工作表XML，只在编号变化时改写"""
+        replace_style = _remapper(style_map)
+        replace_string = _remapper(string_map)
+        with src.open(sheet_part) as stream, \
+             dst.open(_entry(src, sheet_part), 'w', force_zip64=True) as out:
+            for chunk in _sheet_chunks(stream):
+                if style_map:
+                    chunk = _REWRITE['style'].sub(replace_style, chunk)
+                    chunk = _REWRITE['col_style'].sub(replace_style, chunk)
+                if string_map:
+                    chunk = _REWRITE['string'].sub(replace_string, chunk)
+                out.write(chunk)
@@ -0,0 +1,714 @@
+#!/usr/bin/env python3
+"""
+XLSX流式写入模块 - 边生成边把工作表XML写入 zip，内存占用与行数无关
+版本: 1.0.0
+作者: tianli
+
+每行直接拼接为 <row> XML，攒够一块后压缩写入 zip 中的工作表条目，不创建单元格
+对象，也不建立共享字符串表（字符串按内联字符串写出）。同一时间只能写一个工作表；
+workbook.xml、styles.xml 等其余部分在关闭时写出。RollingSheetWriter 在写满
+1048576 行后自动续写到新的工作表或分卷文件；PartitionWriter 按键把行分发到多个文件。
+"""
+
+import re
+import math
+import shutil
+import zipfile
+import datetime
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+from xml.sax.saxutils import escape, quoteattr, unescape
+
+SCRIPT_VERSION = "1.0.0"
+
+MAX_ROWS = 1048576
+MAX_COLUMNS = 16384
+MAX_SHEET_NAME = 31
+# 攒够该大小的XML后再写入 zip 条目
+FLUSH_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+# 超过行数上限时的续写方式：同一工作簿的新工作表，或新的分卷文件
+OVERFLOW_MODES = ('sheets', 'files')
+# PartitionWriter 同时打开的临时文件数上限（另受进程文件句柄数限制）
+DEFAULT_MAX_OPEN = 256
+
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+SECONDS_PER_DAY = 86400
+DEFAULT_DATE_FORMAT = 'yyyy-mm-dd'
+DEFAULT_DATETIME_FORMAT = 'yyyy-mm-dd hh:mm:ss'
+DEFAULT_TIME_FORMAT = 'hh:mm:ss'
+# 内置数字格式不需要写入 <numFmts>；内置日期格式 14 随系统区域显示，日期格式一律自定义
+BUILTIN_FORMATS = {'General': 0, '0': 1, '0.00': 2, '#,##0': 3, '#,##0.00': 4,
+                   '0%': 9, '0.00%': 10, '0.00E+00': 11}
+# 自定义格式编号从 164 开始
+FIRST_CUSTOM_FORMAT = 164
+
+# XML 1.0 不允许的控制字符，按 Excel 的写法转义为 _xHHHH_
+_ILLEGAL_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+_INVALID_SHEET_CHARS = re.compile(r'[\\/?*\[\]:]')
+# 合并其他 XlsxWriter 写出的工作簿时用到的 styles.xml、workbook.xml 片段和单元格样式属性
+_NUM_FMT = re.compile(r'<numFmt numFmtId="(\d+)" formatCode=("[^"]*"|\'[^\']*\')/>')
+_CELL_XF = re.compile(r'<xf numFmtId="(\d+)"')
+_SHEET_ENTRY = re.compile(r'<sheet name=')
+_CELL_STYLE = re.compile(rb'(<c r="[A-Z]+\d+" s=")(\d+)"')
+
+CONTENT_TYPES_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '<Override PartName="/docProps/app.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+    '<Override PartName="/docProps/core.xml" '
+    'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>')
+SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" '
+    'Target="docProps/core.xml"/>'
+    '<Relationship Id="rId3" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties" '
+    'Target="docProps/app.xml"/></Relationships>')
+APP_PROPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+    '<Application>Microsoft Excel</Application></Properties>')
+CORE_PROPS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<cp:coreProperties '
+    'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{created}</dcterms:created></cp:coreProperties>')
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>')
+SHEET_TAIL = '</sheetData></worksheet>'
+
+class XlsxWriteError(ValueError):
+    """写入的数据超出XLSX格式的限制"""
+
+def column_letter(index: int) -> str:
+    """从 0 开始的列号转为列字母"""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def _escape_illegal(match) -> str:
+    return f'_x{ord(match.group(0)):04X}_'
+
+def _string_cell(ref: str, text: str) -> str:
+    if _ILLEGAL_CHARS.search(text):
+        text = _ILLEGAL_CHARS.sub(_escape_illegal, text)
+    text = escape(text)
+    if text[:1].isspace() or text[-1:].isspace():
+        return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+    return f'<c r="{ref}" t="inlineStr"><is><t>{text}</t></is></c>'
+
+def to_excel(value: Union[datetime.datetime, datetime.date, datetime.time]) -> float:
+    """datetime/date/time 转为 Excel 序列日期（1900 日期系统）"""
+    if isinstance(value, datetime.time):
+        return (value.hour * 3600 + value.minute * 60 + value.second
+                + value.microsecond / 1e6) / SECONDS_PER_DAY
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime(value.year, value.month, value.day)
+    delta = value.replace(tzinfo=None) - EXCEL_EPOCH
+    serial = delta.days + delta.seconds / SECONDS_PER_DAY + delta.microseconds / (SECONDS_PER_DAY * 1e6)
+    # 1900 日期系统把 1900-02-29 当作存在的日期
+    return serial - 1 if serial < 61 else serial
+
+def _part_formats(styles_xml: str) -> List[str]:
+    """XlsxWriter 写出的 styles.xml 中各样式编号对应的数字格式"""
+    builtin = {fmt_id: code for code, fmt_id in BUILTIN_FORMATS.items()}
+    custom = {int(fmt_id): unescape(code[1:-1], {'&quot;': '"', '&apos;': "'"})
+              for fmt_id, code in _NUM_FMT.findall(styles_xml)}
+    xfs = styles_xml[styles_xml.index('<cellXfs'):styles_xml.index('</cellXfs>')]
+    return [custom.get(int(fmt_id)) or builtin.get(int(fmt_id), 'General')
+            for fmt_id in _CELL_XF.findall(xfs)]
+
+def safe_sheet_name(name: str, used: Iterable[str] = ()) -> str:
+    """去掉工作表名称中不允许的字符并截断到 31 个字符，与已有名称重复时追加序号"""
+    name = _INVALID_SHEET_CHARS.sub('_', str(name)).strip("'") or 'Sheet'
+    name = name[:MAX_SHEET_NAME]
+    taken = {n.lower() for n in used}
+    base, n = name, 2
+    while name.lower() in taken:
+        suffix = f'_{n}'
+        name = base[:MAX_SHEET_NAME - len(suffix)] + suffix
+        n += 1
+    return name
+
+class SheetWriter:
+    """一个工作表的流式写入器，由 XlsxWriter.add_sheet 或 PartitionWriter 创建"""
+
+    def __init__(self, book: 'WorkbookStyles', stream, name: str):
+        self.book = book
+        self.name = name
+        self._stream = stream
+        self._parts: List[str] = []
+        self._size = 0
+        self.rows = 0
+        self.closed = False
+        self._date_style = book.number_format(DEFAULT_DATE_FORMAT)
+        self._datetime_style = book.number_format(DEFAULT_DATETIME_FORMAT)
+        self._time_style = book.number_format(DEFAULT_TIME_FORMAT)
+        self._stream.write(SHEET_HEAD.encode('utf-8'))
+
+    def _cell(self, ref: str, value, style: int) -> str:
+        """非字符串、非整数的单元格"""
+        style_attr = f' s="{style}"' if style else ''
+        if isinstance(value, bool):
+            return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, float):
+            if math.isnan(value) or math.isinf(value):
+                return _string_cell(ref, str(value))
+            return f'<c r="{ref}"{style_attr}><v>{value!r}</v></c>'
+        if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+            if not style:
+                if isinstance(value, datetime.datetime):
+                    style = self._datetime_style
+                elif isinstance(value, datetime.date):
+                    style = self._date_style
+                else:
+                    style = self._time_style
+            return f'<c r="{ref}" s="{style}"><v>{to_excel(value)!r}</v></c>'
+        return _string_cell(ref, str(value))
+
+    def write_row(self, values: Sequence, styles: Optional[Sequence[int]] = None) -> None:
+        """写出一行；None 和空字符串为空单元格，styles 为各列的样式编号（见 XlsxWriter.number_format）"""
+        if self.rows >= MAX_ROWS:
+            raise XlsxWriteError(f"工作表 '{self.name}' 超过 {MAX_ROWS} 行的上限")
+        if len(values) > MAX_COLUMNS:
+            raise XlsxWriteError(f"工作表 '{self.name}' 超过 {MAX_COLUMNS} 列的上限")
+        self.rows += 1
+        number = str(self.rows)
+        letters = self.book.letters(len(values))
+        cells = []
+        for col, value in enumerate(values):
+            if value is None or value == '':
+                continue
+            ref = letters[col] + number
+            style = styles[col] if styles else 0
+            if type(value) is str:
+                if style:
+                    # 带格式的文本列（例如保留前导零的编号）
+                    cells.append(_string_cell(ref, value).replace(' t="inlineStr"',
+                                                                  f' s="{style}" t="inlineStr"', 1))
+                else:
+                    cells.append(_string_cell(ref, value))
+            elif type(value) is int:
+                if style:
+                    cells.append(f'<c r="{ref}" s="{style}"><v>{value}</v></c>')
+                else:
+                    cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+            else:
+                cells.append(self._cell(ref, value, style))
+        row = f'<row r="{number}">{"".join(cells)}</row>'
+        self._parts.append(row)
+        self._size += len(row)
+        if self._size >= FLUSH_SIZE:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Sequence], styles: Optional[Sequence[int]] = None) -> int:
+        count = 0
+        for row in rows:
+            self.write_row(row, styles)
+            count += 1
+        return count
+
+    def flush(self) -> None:
+        if self._parts:
+            self._stream.write(''.join(self._parts).encode('utf-8'))
+            self._parts = []
+            self._size = 0
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.flush()
+        self._stream.write(SHEET_TAIL.encode('utf-8'))
+        self._stream.close()
+        self.closed = True
+        self.book._sheet_closed(self)
+
+class WorkbookStyles:
+    """SheetWriter 所需的工作簿级状态：列字母缓存和数字格式登记"""
+
+    def __init__(self):
+        self._formats: Dict[str, int] = {}
+        self._styles: List[int] = [0]
+        self._letters: List[str] = []
+
+    def letters(self, count: int) -> List[str]:
+        """前 count 列的列字母，按需扩展并缓存"""
+        while len(self._letters) < count:
+            self._letters.append(column_letter(len(self._letters)))
+        return self._letters
+
+    def number_format(self, format_code: str) -> int:
+        """登记数字格式，返回写单元格时使用的样式编号（General 为 0）"""
+        if format_code == 'General':
+            return 0
+        fmt_id = BUILTIN_FORMATS.get(format_code)
+        if fmt_id is None:
+            fmt_id = self._formats.get(format_code)
+            if fmt_id is None:
+                fmt_id = self._formats[format_code] = FIRST_CUSTOM_FORMAT + len(self._formats)
+        if fmt_id not in self._styles:
+            self._styles.append(fmt_id)
+        return self._styles.index(fmt_id)
+
+    def copy_formats(self, other: 'WorkbookStyles') -> None:
+        """沿用另一个工作簿已登记的数字格式，使两者的样式编号一致"""
+        self._formats = dict(other._formats)
+        self._styles = list(other._styles)
+
+    def _sheet_closed(self, sheet: SheetWriter) -> None:
+        pass
+
+class XlsxWriter(WorkbookStyles):
+    """流式XLSX工作簿写入器
+
+    用法:
+        with XlsxWriter(path) as book:
+            sheet = book.add_sheet('数据')
+            sheet.write_rows(rows)
+
+    先写入同目录下的临时文件，正常关闭后才替换目标文件；出错时删除临时文件。
+    """
+
+    def __init__(self, file_path: Union[str, Path], compresslevel: int = COMPRESS_LEVEL):
+        super().__init__()
+        self.file_path = Path(file_path)
+        self._temp_path = self.file_path.with_name(f".{self.file_path.name}.tmp")
+        self._zip = zipfile.ZipFile(self._temp_path, 'w', zipfile.ZIP_DEFLATED,
+                                    compresslevel=compresslevel)
+        self.sheet_names: List[str] = []
+        self._current: Optional[SheetWriter] = None
+        self.closed = False
+
+    def _open_sheet_part(self, name: str):
+        if self._current is not None:
+            self._current.close()
+        name = safe_sheet_name(name, self.sheet_names)
+        self.sheet_names.append(name)
+        part = f'xl/worksheets/sheet{len(self.sheet_names)}.xml'
+        return name, self._zip.open(part, 'w', force_zip64=True)
+
+    def add_sheet(self, name: str) -> SheetWriter:
+        """开始写一个新工作表；上一个工作表会先被关闭"""
+        name, stream = self._open_sheet_part(name)
+        self._current = SheetWriter(self, stream, name)
+        return self._current
+
+    def add_sheet_file(self, file_path: Union[str, Path], name: str) -> str:
+        """把已写好的工作表XML文件原样复制为新工作表（样式编号须与本工作簿一致），返回工作表名称"""
+        name, stream = self._open_sheet_part(name)
+        with open(file_path, 'rb') as source, stream:
+            shutil.copyfileobj(source, stream, FLUSH_SIZE)
+        return name
+
+    def append_workbook(self, file_path: Union[str, Path], name: str) -> List[str]:
+        """把另一个 XlsxWriter 写出的工作簿中的工作表依次追加到本工作簿，返回新工作表名称
+
+        工作表XML只解压、改写样式编号后重新压缩，不解析单元格。第一个工作表命名为 name，
+        其余为 name_2、name_3…（例如超过行数上限后续写的工作表）。
+        """
+        names = []
+        with zipfile.ZipFile(file_path) as part:
+            formats = _part_formats(part.read('xl/styles.xml').decode('utf-8'))
+            style_map = {index: self.number_format(code) for index, code in enumerate(formats)}
+            identity = all(index == style for index, style in style_map.items())
+            count = len(_SHEET_ENTRY.findall(part.read('xl/workbook.xml').decode('utf-8')))
+
+            def remap(match) -> bytes:
+                return match.group(1) + str(style_map[int(match.group(2))]).encode() + b'"'
+
+            for index in range(1, count + 1):
+                sheet_name, stream = self._open_sheet_part(names[0] + f"_{index}" if names else name)
+                with part.open(f'xl/worksheets/sheet{index}.xml') as source, stream:
+                    pending = b''
+                    while True:
+                        block = source.read(FLUSH_SIZE)
+                        data = pending + block
+                        # 在标签结束处切开，单元格的样式属性不会跨块
+                        cut = data.rfind(b'>') + 1 if block else len(data)
+                        data, pending = data[:cut], data[cut:]
+                        stream.write(data if identity else _CELL_STYLE.sub(remap, data))
+                        if not block:
+                            break
+                names.append(sheet_name)
+        return names
+
+    def _sheet_closed(self, sheet: SheetWriter) -> None:
+        if self._current is sheet:
+            self._current = None
+
+    def _styles_xml(self) -> str:
+        num_fmts = ''.join(f'<numFmt numFmtId="{fmt_id}" formatCode={quoteattr(code)}/>'
+                           for code, fmt_id in self._formats.items())
+        xfs = ''.join(
+            f'<xf numFmtId="{fmt_id}" fontId="0" fillId="0" borderId="0" xfId="0"'
+            + (' applyNumberFormat="1"/>' if fmt_id else '/>')
+            for fmt_id in self._styles)
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            + (f'<numFmts count="{len(self._formats)}">{num_fmts}</numFmts>' if self._formats else '')
+            + '<fonts count="1"><font><sz val="11"/><name val="Calibri"/><family val="2"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="{len(self._styles)}">{xfs}</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>')
+
+    def _write_package(self) -> None:
+        if not self.sheet_names:
+            # XLSX 至少要有一个工作表
+            self.add_sheet('Sheet').close()
+        count = len(self.sheet_names)
+        sheets = ''.join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                         for i, name in enumerate(self.sheet_names, 1))
+        rels = ''.join(
+            f'<Relationship Id="rId{i}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, count + 1))
+        created = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        zf = self._zip
+        zf.writestr('[Content_Types].xml', CONTENT_TYPES_HEAD + ''.join(
+            SHEET_CONTENT_TYPE.format(index=i) for i in range(1, count + 1)) + '</Types>')
+        zf.writestr('_rels/.rels', ROOT_RELS)
+        zf.writestr('docProps/app.xml', APP_PROPS)
+        zf.writestr('docProps/core.xml', CORE_PROPS.format(created=created))
+        zf.writestr('xl/workbook.xml',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                    f'<bookViews><workbookView activeTab="0"/></bookViews><sheets>{sheets}</sheets></workbook>')
+        zf.writestr('xl/_rels/workbook.xml.rels',
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                    + rels + f'<Relationship Id="rId{count + 1}" '
+                    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+                    'Target="styles.xml"/></Relationships>')
+        zf.writestr('xl/styles.xml', self._styles_xml())
+
+    def close(self) -> None:
+        """写出其余部分并替换目标文件"""
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            if self._current is not None:
+                self._current.close()
+            self._write_package()
+            self._zip.close()
+            self._temp_path.replace(self.file_path)
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """放弃写入并删除临时文件"""
+        self.closed = True
+        try:
+            if self._current is not None:
+                self._current._stream.close()
+            self._zip.close()
+        except Exception:
+            pass
+        if self._temp_path.exists():
+            self._temp_path.unlink()
+
+    def __enter__(self) -> 'XlsxWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def part_path(file_path: Union[str, Path], index: int) -> Path:
+    """第 index 个分卷的文件名：data.xlsx、data_2.xlsx、data_3.xlsx…"""
+    file_path = Path(file_path)
+    if index <= 1:
+        return file_path
+    return file_path.with_name(f"{file_path.stem}_{index}{file_path.suffix}")
+
+class RollingSheetWriter:
+    """写满 Excel 行数上限后自动续写的工作表
+
+    overflow 为 'sheets' 时在同一工作簿中依次写 Sheet、Sheet_2、Sheet_3…；
+    为 'files' 时依次写 data.xlsx、data_2.xlsx…，每个文件一个工作表。
+    header 为真时第一行作为列名，在每个续写的工作表开头重复一次。
+    接口与 SheetWriter 相同（write_row、write_rows、number_format），可以直接替换。
+    """
+
+    def __init__(self, file_path: Union[str, Path], sheet_name: str = 'Sheet',
+                 overflow: str = 'sheets', header: bool = True, max_rows: int = MAX_ROWS,
+                 compresslevel: int = COMPRESS_LEVEL):
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"不支持的续写方式: {overflow}（可选: {', '.join(OVERFLOW_MODES)}）")
+        # 每个工作表至少要能放下列名行和一行数据
+        minimum = 2 if header else 1
+        if not minimum <= max_rows <= MAX_ROWS:
+            raise ValueError(f"每个工作表的行数应在 {minimum}-{MAX_ROWS} 之间: {max_rows}")
+        self.file_path = Path(file_path)
+        self.sheet_name = sheet_name
+        self.overflow = overflow
+        self.header = header
+        self.max_rows = max_rows
+        self.compresslevel = compresslevel
+        self._header_row: Optional[Tuple[Sequence, Optional[Sequence[int]]]] = None
+        self._book = XlsxWriter(self.file_path, compresslevel)
+        self._books = [self._book]
+        self._sheet = self._book.add_sheet(sheet_name)
+        self._sheets = [self._sheet]
+
+    @property
+    def rows(self) -> int:
+        """已写出的总行数（含每个工作表开头的列名行）"""
+        return sum(sheet.rows for sheet in self._sheets)
+
+    @property
+    def sheet_count(self) -> int:
+        return len(self._sheets)
+
+    def outputs(self) -> List[Tuple[Path, int]]:
+        """各输出文件及其行数"""
+        return [(book.file_path, sum(sheet.rows for sheet in self._sheets if sheet.book is book))
+                for book in self._books]
+
+    def number_format(self, format_code: str) -> int:
+        return self._book.number_format(format_code)
+
+    def _roll(self) -> None:
+        index = len(self._sheets) + 1
+        if self.overflow == 'sheets':
+            sheet = self._book.add_sheet(f"{self.sheet_name}_{index}")
+        else:
+            book = XlsxWriter(part_path(self.file_path, index), self.compresslevel)
+            book.copy_formats(self._book)
+            self._book.close()
+            self._book = book
+            self._books.append(book)
+            sheet = book.add_sheet(self.sheet_name)
+        self._sheet = sheet
+        self._sheets.append(sheet)
+        if self._header_row is not None:
+            sheet.write_row(*self._header_row)
+
+    def write_row(self, values: Sequence, styles: Optional[Sequence[int]] = None) -> None:
+        if self.header and self._header_row is None:
+            self._header_row = (values, styles)
+        elif self._sheet.rows >= self.max_rows:
+            self._roll()
+        self._sheet.write_row(values, styles)
+
+    def write_rows(self, rows: Sequence[Sequence], styles: Optional[Sequence[int]] = None) -> int:
+        """写出一组行（列表），在工作表写满处切开"""
+        start = 0
+        if rows and self.header and self._header_row is None:
+            self.write_row(rows[0], styles)
+            start = 1
+        while start < len(rows):
+            if self._sheet.rows >= self.max_rows:
+                self._roll()
+            end = start + self.max_rows - self._sheet.rows
+            self._sheet.write_rows(rows[start:end], styles)
+            start = end
+        return len(rows)
+
+    def close(self) -> None:
+        self._book.close()
+
+    def abort(self) -> None:
+        """放弃写入；已完成的分卷不完整，一并删除"""
+        self._book.abort()
+        for book in self._books[:-1]:
+            if book.file_path.exists():
+                book.file_path.unlink()
+
+    def __enter__(self) -> 'RollingSheetWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+def _open_file_limit() -> int:
+    """同时打开的临时文件数上限：DEFAULT_MAX_OPEN 与进程文件句柄数的一半中较小者"""
+    try:
+        import resource
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    except (ImportError, OSError, ValueError):
+        return DEFAULT_MAX_OPEN
+    if soft == resource.RLIM_INFINITY:
+        return DEFAULT_MAX_OPEN
+    return max(1, min(DEFAULT_MAX_OPEN, soft // 2))
+
+class PartitionWriter(WorkbookStyles):
+    """按键把行分发到多个XLSX文件，输入只读一遍
+
+    用法:
+        with PartitionWriter(work_dir, lambda key: out_dir / f'{key}.xlsx', header=row) as parts:
+            for row in rows:
+                parts.write_row(row[0], row)
+        for path, rows in parts.outputs(): ...
+
+    每个键的行先由 SheetWriter 写为 work_dir 中的临时工作表XML。同时打开的临时文件
+    不超过 max_open 个（默认受进程文件句柄数限制），超过时关闭最久未写入的文件，
+    之后再遇到该键时以追加方式重新打开，因此键的数量不受限制。header 在每个文件
+    （以及超过行数上限后的续写分卷 data_2.xlsx…）开头写出。finish(key) 或 close()
+    时把临时文件复制为工作簿，只压缩不再处理行。
+    """
+
+    def __init__(self, work_dir: Union[str, Path], path_for_key: Callable[[Hashable], Path],
+                 header: Optional[Sequence] = None, sheet_name: str = 'Sheet',
+                 max_open: Optional[int] = None, compresslevel: int = COMPRESS_LEVEL):
+        super().__init__()
+        self.work_dir = Path(work_dir)
+        self.path_for_key = path_for_key
+        self.header = header
+        self.sheet_name = sheet_name
+        self.max_open = max_open or _open_file_limit()
+        self.compresslevel = compresslevel
+        # 键 -> 正在写的分卷；_pending 按创建顺序记录尚未写为工作簿的 (键, 输出文件, 临时文件, 分卷)
+        self._sheets: Dict[Hashable, SheetWriter] = {}
+        self._volumes: Dict[Hashable, int] = {}
+        self._paths: Dict[Hashable, Path] = {}
+        self._pending: List[Tuple[Hashable, Path, Path, SheetWriter]] = []
+        self._open: 'OrderedDict[Hashable, SheetWriter]' = OrderedDict()
+        self._outputs: List[Tuple[Path, int]] = []
+        self._spools = 0
+        self.closed = False
+
+    @property
+    def key_count(self) -> int:
+        return len(self._volumes)
+
+    def outputs(self) -> List[Tuple[Path, int]]:
+        """已写出的文件及其行数（含列名行）"""
+        return list(self._outputs)
+
+    def _make_room(self) -> None:
+        """关闭最久未写入的临时文件，直到可以再打开一个"""
+        while len(self._open) >= self.max_open:
+            _, idle = self._open.popitem(last=False)
+            idle.flush()
+            idle._stream.close()
+
+    def _new_sheet(self, key: Hashable) -> SheetWriter:
+        """为 key 开始一个新分卷；写满的上一个分卷先结束"""
+        previous = self._open.pop(key, None)
+        if previous is not None:
+            previous.close()
+        self._make_room()
+        self._spools += 1
+        spool = self.work_dir / f"part_{self._spools}.xml"
+        sheet = SheetWriter(self, open(spool, 'wb'), self.sheet_name)
+        self._sheets[key] = self._open[key] = sheet
+        volume = self._volumes[key] = self._volumes.get(key, 0) + 1
+        if volume == 1:
+            self._paths[key] = Path(self.path_for_key(key))
+        self._pending.append((key, part_path(self._paths[key], volume), spool, sheet))
+        if self.header is not None:
+            sheet.write_row(self.header)
+        return sheet
+
+    def write_row(self, key: Hashable, values: Sequence, styles: Optional[Sequence[int]] = None) -> None:
+        sheet = self._open.get(key)
+        if sheet is not None:
+            self._open.move_to_end(key)
+        else:
+            sheet = self._sheets.get(key)
+            if sheet is None:
+                sheet = self._new_sheet(key)
+            else:
+                # 句柄已被关闭，以追加方式重新打开
+                self._make_room()
+                sheet._stream = open(sheet._stream.name, 'ab')
+                self._open[key] = sheet
+        if sheet.rows >= MAX_ROWS:
+            sheet = self._new_sheet(key)
+        sheet.write_row(values, styles)
+
+    def _build(self, output: Path, spool: Path, sheet: SheetWriter) -> None:
+        if not sheet.closed and sheet._stream.closed:
+            sheet._stream = open(spool, 'ab')
+        sheet.close()
+        with XlsxWriter(output, self.compresslevel) as book:
+            book.copy_formats(self)
+            book.add_sheet_file(spool, self.sheet_name)
+        spool.unlink()
+        self._outputs.append((output, sheet.rows))
+
+    def finish(self, key: Hashable) -> None:
+        """提前把 key 的临时文件写为工作簿（例如按行数分块时写完一块）；之后再写入该键会开始新的分卷"""
+        self._open.pop(key, None)
+        self._sheets.pop(key, None)
+        remaining = []
+        for entry in self._pending:
+            if entry[0] == key:
+                self._build(*entry[1:])
+            else:
+                remaining.append(entry)
+        self._pending = remaining
+
+    def close(self) -> None:
+        """把其余临时文件写为工作簿"""
+        if self.closed:
+            return
+        self.closed = True
+        self._open.clear()
+        try:
+            for _, output, spool, sheet in self._pending:
+                self._build(output, spool, sheet)
+            self._pending = []
+        except BaseException:
+            self.abort()
+            raise
+
+    def abort(self) -> None:
+        """放弃写入，删除临时文件和已写出的工作簿"""
+        self.closed = True
+        for _, _, spool, sheet in self._pending:
+            if not sheet._stream.closed:
+                sheet._stream.close()
+            if spool.exists():
+                spool.unlink()
+        self._pending = []
+        for output, _ in self._outputs:
+            if output.exists():
+                output.unlink()
+        self._outputs = []
+
+    def __enter__(self) -> 'PartitionWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()